@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Copyright 2020 The PsiZ Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmark XLA-compiled train, test and predict steps on CPU.
+
+Random observations are fit by a `Rank` and a `Rate` model, once with
+the default steps and once with `jit_compile=True`. The first epoch
+(which includes tracing and compilation) is excluded from the timing.
+The batch size does not evenly divide the number of trials, so the
+last batch of every epoch has a different size.
+
+"""
+
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+import psiz
+
+# Modify the following to control GPU visibility.
+os.environ["CUDA_DEVICE_ORDER"] = "PCI_BUS_ID"
+os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+
+def main():
+    """Run script."""
+    # Settings.
+    n_stimuli = 1000
+    n_dim = 10
+    n_trial = 20000
+    batch_size = 500
+    epochs = 5
+
+    np.random.seed(252)
+    ds_rank = rank_dataset(n_stimuli, n_trial, batch_size)
+    ds_rate = rate_dataset(n_stimuli, n_trial, batch_size)
+
+    for model_name, build_fn, ds, loss in [
+        (
+            'Rank', build_rank, ds_rank,
+            tf.keras.losses.CategoricalCrossentropy()
+        ),
+        (
+            'Rate', build_rate, ds_rate,
+            tf.keras.losses.MeanSquaredError()
+        ),
+    ]:
+        elapsed = {}
+        for jit_compile in [False, True]:
+            model = build_fn(n_stimuli, n_dim, jit_compile)
+            model.compile(
+                loss=loss, optimizer=tf.keras.optimizers.Adam(lr=.001)
+            )
+            # Warm up (tracing and compilation).
+            model.fit(ds, epochs=1, verbose=0)
+            model.evaluate(ds, verbose=0)
+            model.predict(ds)
+
+            start = time.perf_counter()
+            model.fit(ds, epochs=epochs, verbose=0)
+            fit_s = (time.perf_counter() - start) / epochs
+            start = time.perf_counter()
+            model.evaluate(ds, verbose=0)
+            evaluate_s = time.perf_counter() - start
+            start = time.perf_counter()
+            model.predict(ds)
+            predict_s = time.perf_counter() - start
+            elapsed[jit_compile] = np.array([fit_s, evaluate_s, predict_s])
+
+        speedup = elapsed[False] / elapsed[True]
+        print(
+            '{0}\n'
+            '    fit (s/epoch): {1:.3f} -> {2:.3f} ({3:.2f}x)\n'
+            '    evaluate (s): {4:.3f} -> {5:.3f} ({6:.2f}x)\n'
+            '    predict (s): {7:.3f} -> {8:.3f} ({9:.2f}x)'.format(
+                model_name,
+                elapsed[False][0], elapsed[True][0], speedup[0],
+                elapsed[False][1], elapsed[True][1], speedup[1],
+                elapsed[False][2], elapsed[True][2], speedup[2]
+            )
+        )
+
+
+def rank_dataset(n_stimuli, n_trial, batch_size):
+    """Return a dataset of random 8-choose-2 rank observations."""
+    stimulus_set = np.stack([
+        np.random.choice(n_stimuli, 9, replace=False)
+        for _ in range(n_trial)
+    ])
+    obs = psiz.trials.RankObservations(
+        stimulus_set, n_select=2 * np.ones([n_trial], dtype=np.int32)
+    )
+    return obs.as_dataset().batch(batch_size, drop_remainder=False)
+
+
+def rate_dataset(n_stimuli, n_trial, batch_size):
+    """Return a dataset of random rate observations."""
+    stimulus_set = np.stack([
+        np.random.choice(n_stimuli, 2, replace=False)
+        for _ in range(n_trial)
+    ])
+    obs = psiz.trials.RateObservations(
+        stimulus_set, np.random.uniform(size=[n_trial])
+    )
+    return obs.as_dataset().batch(batch_size, drop_remainder=False)
+
+
+def build_stimuli_kernel(n_stimuli, n_dim):
+    """Return a stimuli and kernel layer."""
+    stimuli = psiz.keras.layers.Stimuli(
+        embedding=tf.keras.layers.Embedding(
+            n_stimuli+1, n_dim, mask_zero=True
+        )
+    )
+    kernel = psiz.keras.layers.Kernel(
+        similarity=psiz.keras.layers.ExponentialSimilarity()
+    )
+    return stimuli, kernel
+
+
+def build_rank(n_stimuli, n_dim, jit_compile):
+    """Return a Rank model."""
+    stimuli, kernel = build_stimuli_kernel(n_stimuli, n_dim)
+    return psiz.models.Rank(
+        stimuli=stimuli, kernel=kernel, jit_compile=jit_compile
+    )
+
+
+def build_rate(n_stimuli, n_dim, jit_compile):
+    """Return a Rate model."""
+    stimuli, kernel = build_stimuli_kernel(n_stimuli, n_dim)
+    return psiz.models.Rate(
+        stimuli=stimuli, kernel=kernel, jit_compile=jit_compile
+    )
+
+
+if __name__ == "__main__":
+    main()
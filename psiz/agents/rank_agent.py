@@ -102,7 +102,8 @@ class RankAgent(Agent):
             x, _, _ = data_adapter.unpack_x_y_sample_weight(data)
 
             batch_stimulus_set = _rank_sample(
-                x['stimulus_set'], self.model(x, training=False)
+                _outcome_stimulus_set(x['stimulus_set'], x['outcome_idx']),
+                self.model(x, training=False)
             )
             if stimulus_set is None:
                 stimulus_set = [batch_stimulus_set]
@@ -110,11 +111,21 @@ class RankAgent(Agent):
                 stimulus_set.append(batch_stimulus_set)
         stimulus_set = tf.concat(stimulus_set, axis=0).numpy() - 1
 
-        obs = RankObservations(
+        if session_id is not None:
+            session_id = np.asarray(session_id, dtype=np.int32)
+
+        # The simulated trials share the configurations of the docket,
+        # so the configuration data is reused rather than re-derived.
+        config_list = docket.config_list.copy()
+        config_list.insert(3, 'group_id', self.group_id)
+        config_list.insert(4, 'session_id', 0)
+        obs = RankObservations.from_arrays(
             stimulus_set,
             n_select=docket.n_select,
             is_ranked=docket.is_ranked,
-            group_id=group_id, agent_id=agent_id, session_id=session_id
+            group_id=group_id, agent_id=agent_id, session_id=session_id,
+            config_idx=docket.config_idx, config_list=config_list,
+            outcome_idx_list=docket.outcome_idx_list
         )
         return obs
 
@@ -145,3 +156,23 @@ def _rank_sample(stimulus_set, probs):
     stimulus_set = tf.transpose(stimulus_set, perm=[0, 2, 1])
     stimulus_set_selected = tf.gather_nd(stimulus_set, idx_batch_sample)
     return stimulus_set_selected
+
+
+def _outcome_stimulus_set(stimulus_set, outcome_idx):
+    """Inflate stimulus set for all possible outcomes.
+
+    Arguments:
+        stimulus_set:
+            shape=(batch_size, n_reference + 1)
+        outcome_idx: Column indices of `stimulus_set` for each
+            outcome. The index `n_reference + 1` refers to a
+            placeholder.
+            shape=(batch_size, n_reference + 1, n_outcome)
+
+    Returns:
+        stimulus_set:
+            shape=(batch_size, n_reference + 1, n_outcome)
+
+    """
+    stimulus_set = tf.pad(stimulus_set, [[0, 0], [0, 1]])
+    return tf.gather(stimulus_set, outcome_idx, batch_dims=1)
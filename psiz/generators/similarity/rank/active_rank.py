@@ -28,6 +28,7 @@ Functions:
 import time
 
 import numpy as np
+from scipy import sparse
 import tensorflow as tf
 
 from psiz.generators.similarity.base import DocketGenerator
@@ -85,7 +86,7 @@ class ActiveRank(DocketGenerator):
 
     def generate(
             self, n_trial, model_list, q_priority=None, r_priority=None,
-            group_id=0, verbose=0):
+            r_priority_fill=0., group_id=0, verbose=0):
         """Return a docket of trials based on provided arguments.
 
         Trials are selected in order to maximize expected information
@@ -116,8 +117,17 @@ class ActiveRank(DocketGenerator):
                 the priority of sampling stimulus `j` as a reference
                 given query stimulus `i`. All elements should be
                 non-negative. Values on the diagonal elements are
-                ignored.
+                ignored. May also be a scipy.sparse matrix, in which
+                case implicit (unstored) elements have the priority
+                `r_priority_fill`. Sparse rows are only densified for
+                the selected queries.
                 shape=[n_stimuli, n_stimuli]
+            r_priority_fill (optional): A non-negative scalar
+                indicating the priority of the implicit elements of a
+                sparse `r_priority`. Ignored if `r_priority` is not
+                sparse. The default follows the usual sparse semantics
+                (i.e., implicit elements are zero). Use one for the
+                output of `RankObservations.coverage().r_priority()`.
             group_id (optional): An integer indicating the group ID to
                 target for active selection.
             verbose (optional): An integer specifying the verbosity of
@@ -136,7 +146,7 @@ class ActiveRank(DocketGenerator):
         """
         # Normalize priorities.
         if q_priority is None:
-            q_priority = np.ones([n_stimuli]) / self.n_stimuli
+            q_priority = np.ones([self.n_stimuli]) / self.n_stimuli
 
         # Check that `q_priority` is non-negative.
         if np.sum(np.less(q_priority, 0)) > 0:
@@ -151,16 +161,28 @@ class ActiveRank(DocketGenerator):
             # NOTE: We divide by `n_stimuli - 1` because we will set the
             # diagonal element in each row to zero.
             r_priority = np.ones(
-                [n_stimuli, n_stimuli], dtype=np.float32
+                [self.n_stimuli, self.n_stimuli], dtype=np.float32
             ) / (self.n_stimuli - 1)
+        elif sparse.issparse(r_priority):
+            r_priority = sparse.csr_matrix(r_priority, dtype=np.float32)
+            if r_priority_fill < 0:
+                raise ValueError(
+                    "The `r_priority_fill` argument must be non-negative."
+                )
         else:
             r_priority = r_priority.astype(np.float32)
 
         # Set diagonal to zero to prohibit sampling query as reference.
-        r_priority[np.eye(self.n_stimuli, dtype=bool)] = 0
+        if sparse.issparse(r_priority):
+            # NOTE: Stores explicit zeros.
+            r_priority.setdiag(0)
+            r_priority_values = r_priority.data
+        else:
+            r_priority[np.eye(self.n_stimuli, dtype=bool)] = 0
+            r_priority_values = r_priority
 
         # Check that `r_priority` is non-negative.
-        if np.sum(np.less(r_priority, 0)) > 0:
+        if np.sum(np.less(r_priority_values, 0)) > 0:
             raise ValueError(
                 "The `r_priority` argument must only contain non-negative"
                 " values."
@@ -175,7 +197,7 @@ class ActiveRank(DocketGenerator):
         )
         (docket, expected_ig) = self._select_references(
             model_list, group_id, query_idx_arr, query_idx_count_arr,
-            q_priority, r_priority, verbose
+            q_priority, r_priority, r_priority_fill, verbose
         )
         data = {
             'docket': {'expected_ig': expected_ig},
@@ -223,7 +245,7 @@ class ActiveRank(DocketGenerator):
 
     def _select_references(
             self, model_list, group_id, query_idx_arr, query_idx_count_arr,
-            q_priority, r_priority, verbose):
+            q_priority, r_priority, r_priority_fill, verbose):
         """Determine references for all requested query stimuli."""
         n_query = query_idx_arr.shape[0]
 
@@ -233,10 +255,12 @@ class ActiveRank(DocketGenerator):
             )
             progbar.update(0)
 
-        docket = None
-        expected_ig = None
+        docket_list = []
+        expected_ig_list = []
         for i_query in range(n_query):
-            r_priority_q = r_priority[query_idx_arr[i_query]]
+            r_priority_q = _priority_row(
+                r_priority, query_idx_arr[i_query], r_priority_fill
+            )
             docket_q, expected_ig_q = _select_query_references(
                 i_query, model_list, group_id, query_idx_arr,
                 query_idx_count_arr,
@@ -248,19 +272,40 @@ class ActiveRank(DocketGenerator):
                 progbar.update(i_query + 1)
 
             # Add to dynamic list.
-            if expected_ig is None:
-                expected_ig = expected_ig_q
-            else:
-                expected_ig = np.hstack((expected_ig, expected_ig_q))
+            docket_list.append(docket_q)
+            expected_ig_list.append(expected_ig_q)
 
-            if docket is None:
-                docket = docket_q
-            else:
-                docket = stack((docket, docket_q))
+        # Stack all queries at once.
+        docket = stack(docket_list)
+        expected_ig = np.hstack(expected_ig_list)
 
         return docket, expected_ig
 
 
+def _priority_row(r_priority, query_idx, fill):
+    """Return the (dense) reference priorities of a query.
+
+    Arguments:
+        r_priority: A 2D array or a scipy.sparse CSR matrix. See
+            `ActiveRank.generate`.
+        query_idx: Integer indicating the query stimulus.
+        fill: Scalar indicating the priority of implicit elements of
+            a sparse `r_priority`.
+
+    Returns:
+        r_priority_q: A 1D array of reference priorities.
+            shape=[n_stimuli,]
+
+    """
+    if not sparse.issparse(r_priority):
+        return r_priority[query_idx]
+    start = r_priority.indptr[query_idx]
+    stop = r_priority.indptr[query_idx + 1]
+    r_priority_q = np.full([r_priority.shape[1]], fill, dtype=np.float32)
+    r_priority_q[r_priority.indices[start:stop]] = r_priority.data[start:stop]
+    return r_priority_q
+
+
 def _select_query_references(
         i_query, model_list, group_id, query_idx_arr, query_idx_count_arr,
         n_reference, n_select, n_candidate, r_priority_q, batch_size):
@@ -283,7 +328,7 @@ def _select_query_references(
     stimulus_set[:, 1:] = choice_wo_replace(
         ref_idx_eligable, (n_candidate, n_reference), ref_prob
     )
-    docket = RankDocket(stimulus_set, n_select=n_select)
+    docket = RankDocket.from_arrays(stimulus_set, n_select=n_select)
     group = group_id * np.ones(n_candidate)
     ds_docket = docket.as_dataset(group).batch(
         batch_size, drop_remainder=False
@@ -22,6 +22,7 @@ Modules:
     layers
     losses
     metrics
+    optimizers
     regularizers
 """
 
@@ -31,4 +32,5 @@ import psiz.keras.initializers
 import psiz.keras.layers
 import psiz.keras.losses
 import psiz.keras.metrics
+import psiz.keras.optimizers
 import psiz.keras.regularizers
@@ -18,10 +18,12 @@
 Classes:
     EarlyStoppingRe:
     TensorBoardRe:
+    Throughput:
 
 """
 
 import os
+import time
 
 from tensorflow.keras import callbacks
 
@@ -84,3 +86,55 @@ class TensorBoardRe(callbacks.TensorBoard):
         if restart is not None:
             # Distinguish between restart by setting log_dir for TensorBoard.
             self.log_dir = os.path.join(self.log_dir_init, str(restart))
+
+
+class Throughput(callbacks.Callback):
+    """Log the number of training trials processed per second.
+
+    The throughput of every epoch is added to the epoch logs under the
+    key `trials_per_s`. The duration of an epoch excludes the time
+    spent on validation.
+
+    """
+
+    def __init__(self, n_trial):
+        """Initialize.
+
+        Arguments:
+            n_trial: Integer indicating the number of training trials
+                per epoch.
+
+        """
+        super().__init__()
+        self.n_trial = n_trial
+        self._epoch_start_s = None
+        self._epoch_stop_s = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        """Start epoch timer."""
+        self._epoch_start_s = time.time()
+        self._epoch_stop_s = None
+
+    def on_test_begin(self, logs=None):
+        """Stop epoch timer before validation."""
+        if self._epoch_start_s is not None and self._epoch_stop_s is None:
+            self._epoch_stop_s = time.time()
+
+    def on_epoch_end(self, epoch, logs=None):
+        """Add throughput to logs."""
+        if self._epoch_stop_s is None:
+            self._epoch_stop_s = time.time()
+        duration_s = max(self._epoch_stop_s - self._epoch_start_s, 1e-9)
+        if logs is not None:
+            logs['trials_per_s'] = self.n_trial / duration_s
+
+    def reset(self, restart=None):
+        """Reset callback.
+
+        Arguments:
+            restart (optional): An integer indicating the restart
+                number. This argument is not currently used.
+
+        """
+        self._epoch_start_s = None
+        self._epoch_stop_s = None
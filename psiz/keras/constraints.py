@@ -24,6 +24,12 @@ Classes:
     Center:
     NonNegNorm:
 
+Notes:
+    Constraints whose method `is_rowwise` returns True can be applied
+    to the rows of a weight matrix that were updated by a sparse
+    gradient using the method `call_rows`. See the `sparse_update`
+    option of `psiz.models.PsychologicalEmbedding`.
+
 """
 
 import numpy as np
@@ -160,6 +166,25 @@ class MinMax(constraints.Constraint):
 
         return w
 
+    def is_rowwise(self, rank):
+        """Return if the constraint can be applied to a subset of rows.
+
+        Arguments:
+            rank: The rank of the weights.
+
+        """
+        return True
+
+    def call_rows(self, w, w_old):
+        """Constrain the updated rows of the weights.
+
+        Arguments:
+            w: The updated rows.
+            w_old: The rows before the update.
+
+        """
+        return self(w)
+
     def get_config(self):
         """Return configuration."""
         return {'min_value': self.min_value, 'max_value': self.max_value}
@@ -172,6 +197,12 @@ class Center(constraints.Constraint):
     This constraint can be used to improve the numerical stability of
     an embedding.
 
+    When applied to the updated rows only (see `call_rows`), the
+    weights remain centered if they were centered before the update.
+    The sparse update path of `psiz.models.PsychologicalEmbedding`
+    therefore applies the full constraint once at the start of every
+    call to `fit`.
+
     """
 
     def __init__(self, axis=0):
@@ -188,6 +219,33 @@ class Center(constraints.Constraint):
         """Call."""
         return w - tf.reduce_mean(w, axis=self.axis, keepdims=True)
 
+    def is_rowwise(self, rank):
+        """Return if the constraint can be applied to a subset of rows.
+
+        Arguments:
+            rank: The rank of the weights.
+
+        """
+        return True
+
+    def call_rows(self, w, w_old):
+        """Constrain the updated rows of the weights.
+
+        If the weights are centered along the first axis, the summed
+        change of the updated rows is subtracted evenly from the
+        updated rows. Weights that were centered before the update
+        therefore remain centered without touching the other rows.
+
+        Arguments:
+            w: The updated rows.
+            w_old: The rows before the update.
+
+        """
+        if _normalize_axis(self.axis, w.shape.rank) != 0:
+            return self(w)
+        delta = tf.reduce_sum(w - w_old, axis=0, keepdims=True)
+        return w - delta / tf.cast(tf.shape(w)[0], w.dtype)
+
     def get_config(self):
         """Return configuration."""
         return {'axis': self.axis}
@@ -231,6 +289,44 @@ class NonNegNorm(constraints.Constraint):
             )
         )
 
+    def is_rowwise(self, rank):
+        """Return if the constraint can be applied to a subset of rows.
+
+        Only norms that do not reduce over the first axis are local to
+        a row.
+
+        Arguments:
+            rank: The rank of the weights.
+
+        """
+        return _normalize_axis(self.axis, rank) != 0
+
+    def call_rows(self, w, w_old):
+        """Constrain the updated rows of the weights.
+
+        Arguments:
+            w: The updated rows.
+            w_old: The rows before the update.
+
+        """
+        return self(w)
+
     def get_config(self):
         """Return configuration."""
         return {'scale': self.scale, 'p': self.p, 'axis': self.axis}
+
+
+def _normalize_axis(axis, rank):
+    """Return a non-negative axis.
+
+    Arguments:
+        axis: An integer indicating an axis, possibly negative.
+        rank: The rank of the weights.
+
+    Returns:
+        The equivalent non-negative axis.
+
+    """
+    if axis < 0:
+        axis = axis + rank
+    return axis
@@ -31,7 +31,15 @@ from psiz.models.base import GroupLevel
 
 
 class Behavior(GroupLevel):
-    """An abstract behavior layer."""
+    """An abstract behavior layer.
+
+    Unless a `dtype` is explicitly provided, a behavior layer computes
+    at full precision (i.e., `K.floatx()`) regardless of the global
+    mixed precision policy. Similarities computed at reduced precision
+    are therefore cast up before the (log-)probabilities are
+    accumulated.
+
+    """
 
     def __init__(self, **kwargs):
         """Initialize.
@@ -40,6 +48,7 @@ class Behavior(GroupLevel):
             kwargs (optional): Additional keyword arguments.
 
         """
+        kwargs.setdefault('dtype', K.floatx())
         super(Behavior, self).__init__(**kwargs)
 
         self._n_sample = 0
@@ -103,6 +112,25 @@ class RankBehavior(Behavior):
                 is_select: A Boolean tensor indicating if a reference
                     was selected.
                     shape = (batch_size, n_max_reference, n_outcome)
+                is_outcome: A float tensor indicating if an outcome is
+                    real or a placeholder.
+                    shape = (sample_size, batch_size, n_outcome)
+                is_ranked (optional): A Boolean tensor indicating if
+                    the selections of a trial are ranked. If not
+                    provided, all trials are assumed to be ranked. For
+                    unranked trials, the probability of the (unordered)
+                    set of selected references is returned.
+                    shape = (batch_size, 1)
+
+        Returns:
+            seq_prob: The probability of each outcome. If `n_outcome`
+                is greater than one, the probabilities are normalized
+                across all outcomes. If only the observed outcome is
+                provided (i.e., `n_outcome` is one), the probability
+                of the observed ranking is returned as is, since
+                Luce's choice rule already yields a normalized
+                probability.
+                shape = (sample_size, batch_size, n_outcome)
 
         """
         sim_qr = inputs[0]
@@ -132,12 +160,13 @@ class RankBehavior(Behavior):
         # Compute sequence log-probability
         seq_log_prob = tf.reduce_sum(log_prob, axis=2)
         seq_prob = tf.math.exp(seq_log_prob)
-        seq_prob = is_outcome * seq_prob
 
-        # Clean up probabilities
-        total = tf.reduce_sum(seq_prob, axis=2, keepdims=True)
-        seq_prob = seq_prob / total
-        return seq_prob
+        if len(inputs) > 3:
+            is_ranked = tf.expand_dims(inputs[3], axis=0)
+            set_prob = _tf_unranked_set_probability(inputs[0], is_select)
+            seq_prob = tf.where(is_ranked, seq_prob, set_prob)
+
+        return _tf_outcome_probability(seq_prob, is_outcome)
 
     def get_config(self):
         """Return layer configuration."""
@@ -145,6 +174,105 @@ class RankBehavior(Behavior):
         return config
 
 
+def _tf_outcome_probability(seq_prob, is_outcome):
+    """Return the probabilities normalized across outcomes.
+
+    Arguments:
+        seq_prob: The (unnormalized) probability of each outcome.
+            shape = (sample_size, batch_size, n_outcome)
+        is_outcome: A float tensor indicating if an outcome is real
+            or a placeholder.
+            shape = (sample_size, batch_size, n_outcome)
+
+    Returns:
+        seq_prob: The probability of each outcome.
+            shape = (sample_size, batch_size, n_outcome)
+
+    """
+    seq_prob = is_outcome * seq_prob
+
+    # Clean up probabilities
+    total = tf.reduce_sum(seq_prob, axis=2, keepdims=True)
+    # NOTE: When only the observed outcome is provided, renormalizing
+    # would trivially yield a probability of one.
+    is_observed_only = tf.math.equal(tf.shape(seq_prob)[2], 1)
+    total = tf.where(is_observed_only, tf.ones_like(total), total)
+    seq_prob = seq_prob / total
+    return seq_prob
+
+
+def _tf_unranked_set_probability(sim_qr, is_select):
+    """Return probability of an unranked set of selections.
+
+    The probability of selecting a set of references (in any order) is
+    the sum of the ranked sequence probabilities of all orderings of
+    the set. Rather than enumerating the orderings, the equivalent
+    closed form
+
+        p(S) = sum_{A subset S} (-1)^|A| s_R / (s_R + s_A)
+
+    is used, where s_A denotes the summed similarity of the references
+    in A and s_R denotes the summed similarity of the references that
+    were not selected. For example, given query Q, references A, B,
+    and C, and the unranked selection {A, B}:
+
+    p({A, B}) = 1 - s_QC/(s_QC + s_QA) - s_QC/(s_QC + s_QB) + s_QC/s_Q,
+
+    where s_Q = s_QA + s_QB + s_QC.
+
+    Arguments:
+        sim_qr: A tensor containing the precomputed similarities
+            between the query stimuli and corresponding reference
+            stimuli. Placeholder references must have a similarity
+            of zero.
+            shape=(sample_size, batch_size, n_max_reference, n_outcome)
+        is_select: A float tensor indicating if a reference was
+            selected. Selected references must precede unselected
+            references.
+            shape=(1, batch_size, n_max_reference, 1 or n_outcome)
+
+    Returns:
+        set_prob: The probability of each (unranked) outcome.
+            shape=(sample_size, batch_size, n_outcome)
+
+    """
+    sim_select = is_select * sim_qr
+    sim_rest = tf.reduce_sum(sim_qr - sim_select, axis=2, keepdims=True)
+
+    # Only the leading references can be selected.
+    max_n_select = tf.cast(
+        tf.reduce_max(tf.reduce_sum(is_select, axis=2)), dtype=tf.int32
+    )
+    sim_select = sim_select[:, :, 0:max_n_select, :]
+    is_unselect = 1. - is_select[:, :, 0:max_n_select, :]
+
+    # Enumerate all subsets of the (leading) references.
+    subset_id = tf.range(tf.bitwise.left_shift(1, max_n_select))
+    is_member = tf.bitwise.bitwise_and(
+        tf.bitwise.right_shift(
+            tf.expand_dims(subset_id, axis=1),
+            tf.expand_dims(tf.range(max_n_select), axis=0)
+        ), 1
+    )
+    sign = 1 - 2 * tf.math.floormod(tf.reduce_sum(is_member, axis=1), 2)
+    is_member = tf.cast(is_member, dtype=sim_qr.dtype)
+    sign = tf.cast(sign, dtype=sim_qr.dtype)
+
+    # Summed similarity of each subset.
+    # TensorShape([sample_size, batch_size, n_subset, n_outcome])
+    sim_subset = tf.einsum('ij,sbjo->sbio', is_member, sim_select)
+    # Only subsets of the selected references contribute.
+    is_subset = tf.math.equal(
+        tf.einsum('ij,sbjo->sbio', is_member, is_unselect), 0.
+    )
+
+    sim_rest = tf.maximum(sim_rest, tf.keras.backend.epsilon())
+    term = sim_rest / (sim_rest + sim_subset)
+    term = term * tf.cast(is_subset, dtype=sim_qr.dtype)
+    set_prob = tf.einsum('i,sbio->sbo', sign, term)
+    return tf.maximum(set_prob, 0.)
+
+
 @tf.keras.utils.register_keras_serializable(
     package='psiz.keras.layers', name='RateBehavior'
 )
@@ -25,6 +25,9 @@ import tensorflow as tf
 from tensorflow.python.keras import backend as K
 
 import psiz.keras.constraints as pk_constraints
+from psiz.keras.layers.ops.core import pairwise_wl2norm
+from psiz.keras.layers.ops.core import wl1norm
+from psiz.keras.layers.ops.core import wl2norm
 from psiz.keras.layers.ops.core import wpnorm
 
 
@@ -32,7 +35,16 @@ from psiz.keras.layers.ops.core import wpnorm
     package='psiz.keras.layers', name='WeightedMinkowski'
 )
 class WeightedMinkowski(tf.keras.layers.Layer):
-    """Weighted Minkowski distance."""
+    """Weighted Minkowski distance.
+
+    If `rho` is not trainable, specialized ops are used when `rho` is
+    one (city-block distance) or two (Euclidean distance). Euclidean
+    distances between all pairs of two sets of vectors, i.e., inputs
+    `z_0` and `z_1` with shape=(batch_size, [...] n, 1, n_dim) and
+    shape=(batch_size, [...] 1, m, n_dim) and weights that are shared
+    by all pairs, are computed with a matrix multiplication.
+
+    """
 
     def __init__(self, rho_initializer=None, **kwargs):
         """Initialize.
@@ -75,15 +87,50 @@ class WeightedMinkowski(tf.keras.layers.Layer):
         z_1 = inputs[1]  # References.
         w = inputs[2]    # Dimension weights.
 
+        if self.trainable and self.rho.trainable:
+            return self._minkowski(z_0, z_1, w)
+
+        # NOTE: The branch is selected at run time, so assigning a new
+        # value to a non-trainable `rho` remains valid.
+        branch_index = tf.where(
+            tf.math.equal(self.rho, 1.), 0,
+            tf.where(tf.math.equal(self.rho, 2.), 1, 2)
+        )
+        return tf.switch_case(branch_index, [
+            lambda: self._cityblock(z_0, z_1, w),
+            lambda: self._euclidean(z_0, z_1, w),
+            lambda: self._minkowski(z_0, z_1, w),
+        ])
+
+    def _minkowski(self, z_0, z_1, w):
+        """Return weighted Minkowski distance."""
+        x = z_0 - z_1
+
         # Expand rho to shape=(sample_size, batch_size, [n, m, ...]).
-        rho = self.rho * tf.ones(tf.shape(z_0)[0:-1])
+        # NOTE: The shape is taken from the broadcast difference (rather
+        # than `z_0`) so that the gradient of rho has a static shape that
+        # is consistent across the branches of `tf.switch_case`.
+        rho = self.rho * tf.ones(tf.shape(x)[0:-1], dtype=x.dtype)
 
         # Weighted Minkowski distance.
-        x = z_0 - z_1
         d_qr = wpnorm(x, w, rho)
         d_qr = tf.squeeze(d_qr, [-1])
         return d_qr
 
+    def _cityblock(self, z_0, z_1, w):
+        """Return weighted city-block distance."""
+        d_qr = wl1norm(z_0 - z_1, w)
+        return tf.squeeze(d_qr, [-1])
+
+    def _euclidean(self, z_0, z_1, w):
+        """Return weighted Euclidean distance."""
+        if _is_pairwise(z_0, z_1, w):
+            return pairwise_wl2norm(
+                z_0[..., 0, :], z_1[..., 0, :, :], w[..., 0, :]
+            )
+        d_qr = wl2norm(z_0 - z_1, w)
+        return tf.squeeze(d_qr, [-1])
+
     def get_config(self):
         """Return layer configuration."""
         config = super().get_config()
@@ -93,3 +140,29 @@ class WeightedMinkowski(tf.keras.layers.Layer):
             )
         })
         return config
+
+
+def _is_pairwise(z_0, z_1, w):
+    """Return if inputs compare all pairs of two sets of vectors.
+
+    Arguments:
+        z_0: A tf.Tensor denoting a set of vectors.
+            shape = (batch_size, [...] n, 1, n_dim)
+        z_1: A tf.Tensor denoting a set of vectors.
+            shape = (batch_size, [...] 1, m, n_dim)
+        w: The weights allocated to each dimension.
+            shape = (batch_size, [...] 1, 1, n_dim)
+
+    Returns:
+        Boolean indicating if the (static) shapes satisfy the above.
+
+    """
+    rank = z_0.shape.rank
+    if rank is None or rank < 4:
+        return False
+    if z_1.shape.rank != rank or w.shape.rank != rank:
+        return False
+    return (
+        z_0.shape[-2] == 1 and z_1.shape[-3] == 1 and
+        w.shape[-2] == 1 and w.shape[-3] == 1
+    )
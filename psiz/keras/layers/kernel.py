@@ -158,18 +158,43 @@ class GroupAttention(tf.keras.layers.Layer):
     package='psiz.keras.layers', name='Kernel'
 )
 class Kernel(GroupLevel):
-    """A basic population-wide kernel."""
+    """A basic population-wide kernel.
+
+    The specialized city-block and Euclidean ops of a
+    `WeightedMinkowski` distance with a non-trainable `rho` are
+    selected automatically (see `WeightedMinkowski`). The same holds
+    for `AttentionKernel`.
+
+    The kernel can compute at reduced precision by providing a mixed
+    precision `dtype` policy, e.g.,
+    `tf.keras.mixed_precision.experimental.Policy('mixed_bfloat16')`.
+    The variables are kept at full precision. The default distance and
+    similarity layers inherit the policy, user-provided layers should
+    be given the same policy. The returned similarities are cast up by
+    the behavior layer, which always accumulates at full precision.
+    A 'mixed_float16' policy requires wrapping the optimizer with a
+    `tf.keras.mixed_precision.experimental.LossScaleOptimizer`.
+
+    """
 
     def __init__(self, distance=None, similarity=None, **kwargs):
-        """Initialize."""
+        """Initialize.
+
+        Arguments:
+            distance (optional): A distance layer.
+            similarity (optional): A similarity layer.
+            kwargs (optional): Additional keyword arguments.
+
+        """
         super(Kernel, self).__init__(**kwargs)
 
+        dtype = kwargs.get('dtype', None)
         if distance is None:
-            distance = WeightedMinkowski()
+            distance = WeightedMinkowski(dtype=dtype)
         self.distance = distance
 
         if similarity is None:
-            similarity = ExponentialSimilarity()
+            similarity = ExponentialSimilarity(dtype=dtype)
         self.similarity = similarity
 
         # Gather all pointers to theta-associated variables.
@@ -222,7 +247,7 @@ class Kernel(GroupLevel):
         # group = inputs[-1][:, self.group_level]
 
         # Create identity attention weights.
-        attention = tf.ones_like(z_0)
+        attention = self._attention_weights(z_0, inputs[-1])
 
         # Compute distance between query and references.
         dist_qr = self.distance([z_0, z_1, attention])
@@ -230,6 +255,32 @@ class Kernel(GroupLevel):
         sim_qr = self.similarity(dist_qr)
         return sim_qr
 
+    def _attention_weights(self, z_0, group):
+        """Return identity attention weights.
+
+        Arguments:
+            z_0: A tf.Tensor denoting a set of vectors.
+                shape = (batch_size, [n, m, ...] n_dim)
+            group: A tf.Tensor denoting group assignments.
+                shape = (batch_size, k)
+
+        Returns:
+            The attention weights with singleton inner dimensions.
+                shape = (sample_size, batch_size, [1, 1, ...] n_dim)
+
+        """
+        # NOTE: Singleton inner dimensions avoid materializing a tensor
+        # the size of `z_0` and allow the distance layer to detect
+        # weights that are shared by all pairs.
+        rank = z_0.shape.rank
+        if rank is None or rank <= 3:
+            return tf.ones_like(z_0)
+        idx = (
+            (slice(None), slice(None)) + (slice(0, 1),) * (rank - 3) +
+            (slice(None),)
+        )
+        return tf.ones_like(z_0[idx])
+
     def get_config(self):
         """Return layer configuration."""
         config = super().get_config()
@@ -255,7 +306,13 @@ class Kernel(GroupLevel):
     package='psiz.keras.layers', name='AttentionKernel'
 )
 class AttentionKernel(GroupLevel):
-    """Attention kernel container."""
+    """Attention kernel container.
+
+    Supports a mixed precision `dtype` policy, see `Kernel`. The
+    attention weights are kept at full precision and cast down by the
+    distance layer.
+
+    """
 
     def __init__(
             self, n_dim=None, attention=None, distance=None, similarity=None,
@@ -269,6 +326,7 @@ class AttentionKernel(GroupLevel):
                 argument `n_dim` is ignored.
             distance: A distance layer.
             similarity: A similarity layer.
+            kwargs (optional): Additional keyword arguments.
 
         """
         super(AttentionKernel, self).__init__(**kwargs)
@@ -277,12 +335,13 @@ class AttentionKernel(GroupLevel):
             attention = GroupAttention(n_dim=n_dim, n_group=1)
         self.attention = attention
 
+        dtype = kwargs.get('dtype', None)
         if distance is None:
-            distance = WeightedMinkowski()
+            distance = WeightedMinkowski(dtype=dtype)
         self.distance = distance
 
         if similarity is None:
-            similarity = ExponentialSimilarity()
+            similarity = ExponentialSimilarity(dtype=dtype)
         self.similarity = similarity
 
         # Gather all pointers to theta-associated variables.
@@ -315,6 +374,28 @@ class AttentionKernel(GroupLevel):
         z_1 = inputs[1]
         group = inputs[-1]
 
+        attention = self._attention_weights(z_0, group)
+
+        # Compute distance between query and references.
+        dist_qr = self.distance([z_0, z_1, attention])
+        # Compute similarity.
+        sim_qr = self.similarity(dist_qr)
+        return sim_qr
+
+    def _attention_weights(self, z_0, group):
+        """Return group-specific attention weights.
+
+        Arguments:
+            z_0: A tf.Tensor denoting a set of vectors.
+                shape = (batch_size, [n, m, ...] n_dim)
+            group: A tf.Tensor denoting group assignments.
+                shape = (batch_size, k)
+
+        Returns:
+            The attention weights with singleton inner dimensions.
+                shape = (sample_size, batch_size, [1, 1, ...] n_dim)
+
+        """
         # Expand attention weights.
         attention = self.attention(group[:, self.group_level])
 
@@ -330,13 +411,7 @@ class AttentionKernel(GroupLevel):
         shape_exp = tf.concat(
             (sample_size, batch_size, shape_exp, dim_size), axis=0
         )
-        attention = tf.reshape(attention, shape_exp)
-
-        # Compute distance between query and references.
-        dist_qr = self.distance([z_0, z_1, attention])
-        # Compute similarity.
-        sim_qr = self.similarity(dist_qr)
-        return sim_qr
+        return tf.reshape(attention, shape_exp)
 
     # @property
     # def n_dim(self):
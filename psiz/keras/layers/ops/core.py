@@ -17,6 +17,13 @@
 
 Functions:
     wpnorm: Weighted p-norm.
+    wl1norm: Weighted city-block norm.
+    wl2norm: Weighted Euclidean norm.
+    pairwise_wl2norm: Weighted Euclidean norm of all pairwise
+        differences.
+    exponential_rank_log_prob: Fused log-probability of ranked
+        selections under a weighted Minkowski distance and an
+        exponential similarity.
 
 """
 
@@ -75,3 +82,254 @@ def wpnorm(x, w, p):
         return dydx, dydw, dydp
 
     return y, grad
+
+
+@tf.custom_gradient
+def wl1norm(x, w):
+    """Weighted city-block norm.
+
+    ||x||_{w,1} = sum_i w_i abs(x_i)
+
+    Equivalent to `wpnorm` with p=1.
+
+    Arguments:
+        x: A tf.Tensor indicating the vectors.
+            shape=(sample_size, batch_size, [n, m, ...] n_dim)
+        w: A tf.Tensor indicating the dimension weights. Must be
+            broadcastable to the shape of `x`.
+
+    Returns:
+        shape=(sample_size, batch_size, [n, m, ...] 1)
+
+    """
+    abs_x = tf.abs(x)
+    y = tf.reduce_sum(w * abs_x, axis=-1, keepdims=True)
+
+    def grad(dy):
+        dydx = dy * w * tf.sign(x)
+        dydw = _unbroadcast(dy * abs_x, tf.shape(w))
+        return dydx, dydw
+
+    return y, grad
+
+
+@tf.custom_gradient
+def wl2norm(x, w):
+    """Weighted Euclidean norm.
+
+    ||x||_{w,2} = [sum_i w_i x_i^2]^(1/2)
+
+    Equivalent to `wpnorm` with p=2.
+
+    Arguments:
+        x: A tf.Tensor indicating the vectors.
+            shape=(sample_size, batch_size, [n, m, ...] n_dim)
+        w: A tf.Tensor indicating the dimension weights. Must be
+            broadcastable to the shape of `x`.
+
+    Returns:
+        shape=(sample_size, batch_size, [n, m, ...] 1)
+
+    """
+    x_2 = tf.square(x)
+    y = tf.sqrt(tf.reduce_sum(w * x_2, axis=-1, keepdims=True))
+
+    def grad(dy):
+        dydx = dy * (w * x / (y + tf.keras.backend.epsilon()))
+        dydw = dy * (x_2 / (2. * y + tf.keras.backend.epsilon()))
+        dydw = _unbroadcast(dydw, tf.shape(w))
+        return dydx, dydw
+
+    return y, grad
+
+
+def pairwise_wl2norm(x_0, x_1, w):
+    """Weighted Euclidean norm of all pairwise differences.
+
+    The squared norms are computed with the expansion
+        ||x_0 - x_1||^2 = ||x_0||^2 + ||x_1||^2 - 2 <x_0, x_1>
+    so that the pairwise differences are never materialized and the
+    cross term is a single matrix multiplication.
+
+    Arguments:
+        x_0: A tf.Tensor indicating the first set of vectors.
+            shape=(sample_size, batch_size, [...] n, n_dim)
+        x_1: A tf.Tensor indicating the second set of vectors.
+            shape=(sample_size, batch_size, [...] m, n_dim)
+        w: A tf.Tensor indicating the dimension weights, which are
+            shared by all pairs.
+            shape=(sample_size, batch_size, [...] 1, n_dim)
+
+    Returns:
+        shape=(sample_size, batch_size, [...] n, m)
+
+    """
+    sq_0 = tf.reduce_sum(w * tf.square(x_0), axis=-1)
+    sq_1 = tf.reduce_sum(w * tf.square(x_1), axis=-1)
+    cross = tf.linalg.matmul(w * x_0, x_1, transpose_b=True)
+    y_2 = (
+        tf.expand_dims(sq_0, axis=-1) + tf.expand_dims(sq_1, axis=-2) -
+        2. * cross
+    )
+    # NOTE: Cancellation can yield slightly negative values.
+    return _sqrt(tf.maximum(y_2, 0.))
+
+
+@tf.custom_gradient
+def _sqrt(x):
+    """Square root with a finite gradient at zero."""
+    y = tf.sqrt(x)
+
+    def grad(dy):
+        return dy * (.5 / (y + tf.keras.backend.epsilon()))
+
+    return y, grad
+
+
+@tf.custom_gradient
+def exponential_rank_log_prob(
+        z_q, z_r, w, rho, tau, beta, gamma, is_present, is_select):
+    """Fused log-probability of ranked selections.
+
+    Fuses a weighted Minkowski distance (see `wpnorm`), the
+    exponential similarity
+        s = exp(-beta .* d.^tau) + gamma,
+    the masking of non-existent references and Luce's choice rule into
+    a single op. Only the inputs are retained for the backward pass,
+    where the intermediates are recomputed, so that none of the
+    full-size intermediates (e.g., distances, similarities, choice
+    denominators) are kept alive between the forward and backward
+    pass.
+
+    Arguments:
+        z_q: A tf.Tensor indicating the query coordinates.
+            shape=(sample_size, batch_size, 1, n_outcome, n_dim)
+        z_r: A tf.Tensor indicating the reference coordinates.
+            shape=(sample_size, batch_size, n_max_reference, n_outcome,
+            n_dim)
+        w: A tf.Tensor indicating the dimension weights. Must be
+            broadcastable to the shape of `z_r`.
+        rho: A scalar controlling the weighted Minkowski metric.
+        tau: A scalar exponent of the similarity function.
+        beta: A scalar (inverse) scale of the similarity function.
+        gamma: A scalar offset of the similarity function.
+        is_present: A float tensor indicating if a reference exists.
+            shape=(batch_size, n_max_reference, n_outcome)
+        is_select: A float tensor indicating if a reference was
+            selected.
+            shape=(batch_size, n_max_reference, n_outcome)
+
+    Returns:
+        seq_log_prob: The log-probability of each (ranked) outcome.
+            shape=(sample_size, batch_size, n_outcome)
+
+    """
+    _, _, _, _, _, _, _, sim_qr, denom = _exponential_rank_forward(
+        z_q, z_r, w, rho, tau, beta, gamma, is_present
+    )
+    # Add fuzz factor to avoid log(0).
+    log_prob = (
+        tf.math.log(tf.maximum(sim_qr, tf.keras.backend.epsilon())) -
+        tf.math.log(tf.maximum(denom, tf.keras.backend.epsilon()))
+    )
+    seq_log_prob = tf.reduce_sum(is_select * log_prob, axis=2)
+
+    def grad(dy):
+        (
+            x, abs_x, abs_x_p, sum_x, d_qr, d_qr_tau, e_qr, sim_qr, denom
+        ) = _exponential_rank_forward(
+            z_q, z_r, w, rho, tau, beta, gamma, is_present
+        )
+        dtype = x.dtype
+
+        # Gradients of similarities (Luce's choice rule).
+        dy = tf.expand_dims(dy, axis=2) * is_select
+        dyds = dy * tf.math.divide_no_nan(
+            tf.cast(sim_qr >= tf.keras.backend.epsilon(), dtype), sim_qr
+        )
+        dydc = -dy * tf.math.divide_no_nan(
+            tf.cast(denom >= tf.keras.backend.epsilon(), dtype), denom
+        )
+        # A reference contributes to the denominators of all selections
+        # up to and including its own position.
+        dyds = (dyds + tf.cumsum(dydc, axis=2)) * is_present
+
+        # Gradients of similarity parameters.
+        dyds_e = dyds * e_qr
+        log_d = tf.where(
+            d_qr > 0., tf.math.log(d_qr), tf.zeros_like(d_qr)
+        )
+        dydtau = -beta * tf.reduce_sum(dyds_e * d_qr_tau * log_d)
+        dydbeta = -tf.reduce_sum(dyds_e * d_qr_tau)
+        dydgamma = tf.reduce_sum(dyds)
+
+        # Gradients of distances.
+        dydd = -beta * tau * dyds_e * tf.pow(d_qr, tau - 1.)
+        dydd_exp = tf.expand_dims(dydd, axis=-1)
+        d_exp = tf.expand_dims(d_qr, axis=-1)
+
+        # Gradients of coordinates.
+        dydx = dydd_exp * (
+            (w * x * tf.math.divide_no_nan(abs_x_p, abs_x**2)) /
+            (d_exp**(rho - 1.) + tf.keras.backend.epsilon())
+        )
+        dydz_q = _unbroadcast(dydx, tf.shape(z_q))
+        dydz_r = _unbroadcast(-dydx, tf.shape(z_r))
+
+        # Gradients of weights.
+        dydw = dydd_exp * (
+            abs_x_p / (rho * d_exp**(rho - 1.) + tf.keras.backend.epsilon())
+        )
+        dydw = _unbroadcast(dydw, tf.shape(w))
+
+        # Gradients of `rho`.
+        p_0 = (1. / rho) * tf.math.divide_no_nan(d_qr, sum_x) * tf.reduce_sum(
+            w * abs_x_p * tf.math.log(abs_x + tf.keras.backend.epsilon()),
+            axis=-1
+        )
+        p_1 = (1. / rho**2) * d_qr * tf.math.log(
+            sum_x + tf.keras.backend.epsilon()
+        )
+        dydrho = tf.reduce_sum(dydd * (p_0 - p_1))
+
+        return (
+            dydz_q, dydz_r, dydw,
+            _unbroadcast(dydrho, tf.shape(rho)),
+            _unbroadcast(dydtau, tf.shape(tau)),
+            _unbroadcast(dydbeta, tf.shape(beta)),
+            _unbroadcast(dydgamma, tf.shape(gamma)),
+            None, None
+        )
+
+    return seq_log_prob, grad
+
+
+def _exponential_rank_forward(z_q, z_r, w, rho, tau, beta, gamma, is_present):
+    """Return the intermediates of `exponential_rank_log_prob`."""
+    x = z_q - z_r
+    abs_x = tf.abs(x)
+    abs_x_p = tf.pow(abs_x, rho)
+    sum_x = tf.reduce_sum(w * abs_x_p, axis=-1)
+    d_qr = tf.pow(sum_x, 1. / rho)
+    d_qr_tau = tf.pow(d_qr, tau)
+    e_qr = tf.exp(-beta * d_qr_tau)
+    # Zero out similarities of non-existent references.
+    sim_qr = (e_qr + gamma) * is_present
+    # Denominator of Luce's choice rule.
+    denom = tf.cumsum(sim_qr, axis=2, reverse=True)
+    return x, abs_x, abs_x_p, sum_x, d_qr, d_qr_tau, e_qr, sim_qr, denom
+
+
+def _unbroadcast(grad, shape):
+    """Sum a gradient over the axes along which an input was broadcast.
+
+    Arguments:
+        grad: A tf.Tensor of gradients with the broadcast shape.
+        shape: A 1D tf.Tensor indicating the shape of the input.
+
+    Returns:
+        A tf.Tensor of gradients with shape `shape`.
+
+    """
+    _, axis = tf.raw_ops.BroadcastGradientArgs(s0=tf.shape(grad), s1=shape)
+    return tf.reshape(tf.reduce_sum(grad, axis=axis), shape)
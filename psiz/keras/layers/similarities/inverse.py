@@ -68,10 +68,10 @@ class InverseSimilarity(tf.keras.layers.Layer):
         self.fit_mu = fit_mu
         if mu_initializer is None:
             mu_initializer = tf.random_uniform_initializer(0.0000000001, .001)
-        self.mu_initializer = tf.keras.initializers.get(tau_initializer)
+        self.mu_initializer = tf.keras.initializers.get(mu_initializer)
         mu_trainable = self.trainable and self.fit_mu
         self.mu = self.add_weight(
-            shape=[], initializer=self.tau_int, trainable=mu_trainable,
+            shape=[], initializer=self.mu_initializer, trainable=mu_trainable,
             name="mu", dtype=K.floatx(),
             constraint=pk_constraints.GreaterEqualThan(min_value=2.2204e-16)
         )
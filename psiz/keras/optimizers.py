@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright 2020 The PsiZ Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Module of custom TensorFlow optimizers.
+
+Classes:
+    LazyAdam: Adam optimizer that only updates the rows of sparse
+        gradients.
+
+"""
+
+import tensorflow as tf
+
+
+@tf.keras.utils.register_keras_serializable(package='psiz.keras.optimizers')
+class LazyAdam(tf.keras.optimizers.Adam):
+    """Adam optimizer that only updates the rows of sparse gradients.
+
+    Dense gradients are handled identically to Adam. For sparse
+    gradients (e.g., the gradients of an embedding), the moment
+    estimates (slots) and the weights are only updated for the rows
+    that occur in the gradient. The cost of an update is therefore
+    proportional to the number of rows in a batch rather than the
+    total number of rows. Rows that do not occur in a batch are not
+    decayed, which differs slightly from the dense Adam update.
+
+    """
+
+    def __init__(
+            self, learning_rate=0.001, beta_1=0.9, beta_2=0.999,
+            epsilon=1e-7, name='LazyAdam', **kwargs):
+        """Initialize.
+
+        Arguments:
+            learning_rate (optional): See tf.keras.optimizers.Adam.
+            beta_1 (optional): See tf.keras.optimizers.Adam.
+            beta_2 (optional): See tf.keras.optimizers.Adam.
+            epsilon (optional): See tf.keras.optimizers.Adam.
+            name (optional): See tf.keras.optimizers.Adam.
+            kwargs: See tf.keras.optimizers.Adam.
+
+        """
+        kwargs.pop('amsgrad', None)
+        super(LazyAdam, self).__init__(
+            learning_rate=learning_rate, beta_1=beta_1, beta_2=beta_2,
+            epsilon=epsilon, amsgrad=False, name=name, **kwargs
+        )
+
+    def _resource_apply_sparse(self, grad, var, indices, apply_state=None):
+        """Apply a sparse gradient to the rows `indices` of `var`."""
+        var_dtype = var.dtype.base_dtype
+        lr_t = self._decayed_lr(var_dtype)
+        beta_1_t = self._get_hyper('beta_1', var_dtype)
+        beta_2_t = self._get_hyper('beta_2', var_dtype)
+        local_step = tf.cast(self.iterations + 1, var_dtype)
+        beta_1_power = tf.math.pow(beta_1_t, local_step)
+        beta_2_power = tf.math.pow(beta_2_t, local_step)
+        epsilon_t = tf.convert_to_tensor(self.epsilon, var_dtype)
+        lr = lr_t * tf.math.sqrt(1 - beta_2_power) / (1 - beta_1_power)
+
+        # Update the first moment of the rows.
+        m = self.get_slot(var, 'm')
+        m_t_slice = beta_1_t * tf.gather(m, indices) + (1 - beta_1_t) * grad
+        m_update_op = m.scatter_update(tf.IndexedSlices(m_t_slice, indices))
+
+        # Update the second moment of the rows.
+        v = self.get_slot(var, 'v')
+        v_t_slice = (
+            beta_2_t * tf.gather(v, indices) +
+            (1 - beta_2_t) * tf.math.square(grad)
+        )
+        v_update_op = v.scatter_update(tf.IndexedSlices(v_t_slice, indices))
+
+        # Update the rows.
+        var_slice = lr * m_t_slice / (tf.math.sqrt(v_t_slice) + epsilon_t)
+        var_update_op = var.scatter_sub(tf.IndexedSlices(var_slice, indices))
+
+        return tf.group(*[var_update_op, m_update_op, v_update_op])
+
+    def get_config(self):
+        """Return configuration."""
+        config = super(LazyAdam, self).get_config()
+        config.pop('amsgrad', None)
+        return config
@@ -26,7 +26,9 @@ Functions:
 
 """
 
+import contextlib
 import copy
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -38,10 +40,14 @@ import tensorflow as tf
 from tensorflow.keras import backend as K
 from tensorflow.python.keras.engine import data_adapter
 from tensorflow.python.eager import backprop
+from tensorflow.python.training.tracking import data_structures
+from tensorflow.python.util import nest
 import tensorflow_probability as tfp
 
+import psiz.keras.callbacks
 import psiz.keras.layers
 import psiz.trials
+import psiz.trials.similarity.base
 
 
 class Proxy(object):
@@ -312,7 +318,8 @@ class Proxy(object):
     def fit(
             self, obs_train, batch_size=None, validation_data=None,
             n_restart=3, n_record=1, do_init=False, monitor='loss',
-            compile_kwargs={}, **kwargs):
+            compile_kwargs={}, dataset_kwargs={}, shuffle_buffer_size=None,
+            bucket_by_config=False, seed=None, cache=None, **kwargs):
         """Fit the free parameters of the embedding model.
 
         This convenience function formats the observations as
@@ -333,11 +340,47 @@ class Proxy(object):
                 to record.
             monitor (optional): The value to monitor and select
                 restarts.
+            compile_kwargs (optional): Key-word arguments passed to
+                the model's `compile` method.
+            dataset_kwargs (optional): Key-word arguments passed to
+                the `as_dataset` method of the observations. For
+                example, `{'all_outcomes': False}` trains on the
+                observed outcome of each Rank trial only. Use
+                `{'chunk_size': 2**16}` to stream the observations in
+                chunks (e.g., for memory-mapped observations).
+            shuffle_buffer_size (optional): Integer indicating the
+                size of the shuffle buffer. If None, the buffer holds
+                all training observations. Use a smaller buffer to
+                bound memory when streaming large data sets.
+            bucket_by_config (optional): Boolean indicating whether
+                batches should be bucketed by trial configuration. If
+                True, each batch only contains trials with the same
+                configuration shape and is padded to that shape rather
+                than the maximum shape of all trials. This is much
+                faster for data sets that mix trial configurations.
+                The shuffle buffer is ignored, since all trials in a
+                bucket are shuffled.
+            seed (optional): Integer used to seed the shuffling of the
+                training observations.
+            cache (optional): If True, the formatted observations are
+                cached in memory. If a string, the formatted
+                observations are cached in files that use the string
+                as a filename prefix. The prefix is extended with a
+                key derived from the number of trials, the stimulus
+                set and `dataset_kwargs`, so existing cache files are
+                only reused for the same data. Other trial variables
+                (e.g., `weight`) are not part of the key; remove stale
+                cache files after modifying them. The training and
+                validation datasets are built once and shared by all
+                restarts, so with a cache the observations are only
+                formatted during the first epoch of the first restart.
             kwargs (optional): Additional key-word arguments to be
                 passed to the model's `fit` method.
 
         Returns:
-            restart_record: A psiz.restart.FitTracker object.
+            restart_record: A psiz.restart.FitTracker object. The
+                training throughput of each restart is recorded under
+                the key `trials_per_s`.
 
         """
         # Determine batch size.
@@ -350,39 +393,70 @@ class Proxy(object):
         # Create TensorFlow training Dataset.
         # self._check_obs(obs_train)
         # Format as TensorFlow dataset.
-        ds_obs_train = obs_train.as_dataset()
-        ds_obs_train = ds_obs_train.shuffle(
-            buffer_size=n_obs_train, reshuffle_each_iteration=True
-        )
-        ds_obs_train = ds_obs_train.batch(
-            batch_size_train, drop_remainder=False
-        )
+        cache_train = _cache_prefix(cache, 'train', obs_train, dataset_kwargs)
+        if bucket_by_config:
+            ds_obs_train = obs_train.as_dataset(
+                bucket_size=batch_size_train, shuffle=True, seed=seed,
+                cache=cache_train, **dataset_kwargs
+            )
+        else:
+            ds_obs_train = psiz.trials.similarity.base.cache_dataset(
+                obs_train.as_dataset(**dataset_kwargs), cache_train
+            )
+            if shuffle_buffer_size is None:
+                shuffle_buffer_size = n_obs_train
+            ds_obs_train = ds_obs_train.shuffle(
+                buffer_size=np.minimum(shuffle_buffer_size, n_obs_train),
+                seed=seed, reshuffle_each_iteration=True
+            )
+            ds_obs_train = ds_obs_train.batch(
+                batch_size_train, drop_remainder=False
+            )
+        ds_obs_train = ds_obs_train.prefetch(tf.data.experimental.AUTOTUNE)
 
         # Create TensorFlow validation Dataset (if necessary).
         if validation_data is not None:
             # self._check_obs(validation_data)
-            ds_obs_val = validation_data.as_dataset()
             n_obs_val = validation_data.n_trial
             # Format as TensorFlow dataset.
-            ds_obs_val = ds_obs_val.batch(
-                n_obs_val, drop_remainder=False
+            cache_val = _cache_prefix(
+                cache, 'val', validation_data, dataset_kwargs
             )
+            if bucket_by_config:
+                ds_obs_val = validation_data.as_dataset(
+                    bucket_size=n_obs_val, cache=cache_val, **dataset_kwargs
+                )
+            else:
+                ds_obs_val = psiz.trials.similarity.base.cache_dataset(
+                    validation_data.as_dataset(**dataset_kwargs), cache_val
+                )
+                ds_obs_val = ds_obs_val.batch(
+                    n_obs_val, drop_remainder=False
+                )
+            ds_obs_val = ds_obs_val.prefetch(tf.data.experimental.AUTOTUNE)
         else:
             ds_obs_val = None
 
+        # Report the throughput of the input pipeline.
+        callbacks = list(kwargs.pop('callbacks', []))
+        callbacks.append(psiz.keras.callbacks.Throughput(n_obs_train))
+
         # Handle restarts.
         restarter = psiz.restart.Restarter(
             self.model, compile_kwargs=compile_kwargs, monitor=monitor,
             n_restart=n_restart, n_record=n_record, do_init=do_init
         )
         restart_record = restarter.fit(
-            x=ds_obs_train, validation_data=ds_obs_val, **kwargs
+            x=ds_obs_train, validation_data=ds_obs_val, callbacks=callbacks,
+            **kwargs
         )
         self.model = restarter.model
 
         return restart_record
 
-    def evaluate(self, obs, batch_size=None, **kwargs):
+    def evaluate(
+            self, obs, batch_size=None, dataset_kwargs={},
+            bucket_by_config=False, cache=None, **kwargs):
         """Evaluate observations using the current state of the model.
 
         This convenience function formats the observations as
@@ -394,6 +468,14 @@ class Proxy(object):
             obs: A RankObservations object representing the observed
                 data.
             batch_size (optional): Integer indicating the batch size.
+            dataset_kwargs (optional): Key-word arguments passed to
+                the `as_dataset` method of the observations.
+            bucket_by_config (optional): Boolean indicating whether
+                batches should be bucketed by trial configuration. See
+                `fit`.
+            cache (optional): If True or a string, the formatted
+                observations are cached in memory or on disk,
+                respectively. See `fit`.
             kwargs (optional): Additional key-word arguments for
                 evaluate.
 
@@ -403,12 +485,20 @@ class Proxy(object):
 
         """
         # self._check_obs(obs)
-        ds_obs = obs.as_dataset()
-
         if batch_size is None:
             batch_size = obs.n_trial
 
-        ds_obs = ds_obs.batch(batch_size, drop_remainder=False)
+        cache = _cache_prefix(cache, 'eval', obs, dataset_kwargs)
+        if bucket_by_config:
+            ds_obs = obs.as_dataset(
+                bucket_size=batch_size, cache=cache, **dataset_kwargs
+            )
+        else:
+            ds_obs = psiz.trials.similarity.base.cache_dataset(
+                obs.as_dataset(**dataset_kwargs), cache
+            )
+            ds_obs = ds_obs.batch(batch_size, drop_remainder=False)
+        ds_obs = ds_obs.prefetch(tf.data.experimental.AUTOTUNE)
         metrics = self.model.evaluate(x=ds_obs, **kwargs)
         # TODO First call to evaluate isn't correct. Work-around is to
         # call it twice.
@@ -485,12 +575,16 @@ class PsychologicalEmbedding(tf.keras.Model):
             This attribute is only relevant if using probabilistic
             layers, otherwise it should be kept at the default
             value of 1.
+        jit_compile: Boolean indicating if the train, test and
+            predict steps are compiled with XLA.
+        sparse_update: Boolean indicating if sparse gradients are
+            applied without densifying them.
 
     """
 
     def __init__(
             self, stimuli=None, kernel=None, behavior=None, n_sample=1,
-            **kwargs):
+            jit_compile=False, sparse_update=False, **kwargs):
         """Initialize.
 
         Arguments:
@@ -504,6 +598,29 @@ class PsychologicalEmbedding(tf.keras.Model):
                 number of samples to use on the forward pass. This
                 argument is only relevant for stochastic models (e.g.,
                 variational models).
+            jit_compile (optional): Boolean indicating if the
+                computations of the train, test and predict steps
+                should be compiled with XLA. The compiled functions use
+                an input signature with an unknown batch size, so
+                batches of different size do not trigger retracing.
+                A separate function is compiled for inputs of a
+                different shape (e.g., a different maximum number of
+                references). Ragged inputs are not supported.
+            sparse_update (optional): Boolean indicating if sparse
+                gradients (e.g., of an embedding) should be applied
+                without densifying them, so that the cost of a step
+                scales with the number of stimuli in a batch rather
+                than `n_stimuli`. Constraints are then only applied to
+                the updated rows, which requires a constraint that
+                supports row-wise application (see
+                `psiz.keras.constraints`). The full constraint is
+                applied once at the first step of every call to `fit`,
+                e.g., to center an embedding that was not centered
+                initially. The gradients of variables
+                with other constraints are densified as usual. Use a
+                sparse-aware optimizer (e.g.,
+                `psiz.keras.optimizers.LazyAdam`) to also restrict the
+                update of the optimizer slots to the updated rows.
             kwargs:  Additional key-word arguments.
 
         Raises:
@@ -522,6 +639,8 @@ class PsychologicalEmbedding(tf.keras.Model):
 
         self._kl_weight = 0.
         self.n_sample = n_sample
+        self.jit_compile = jit_compile
+        self.sparse_update = sparse_update
 
     @property
     def n_stimuli(self):
@@ -553,6 +672,70 @@ class PsychologicalEmbedding(tf.keras.Model):
         for layer in self.layers:
             layer.n_sample = n_sample
 
+    @property
+    def sparse_update(self):
+        return self._sparse_update
+
+    @sparse_update.setter
+    def sparse_update(self, sparse_update):
+        self._sparse_update = sparse_update
+        # The step functions depend on the update path.
+        self._step_functions = data_structures.NoDependency({})
+        self.train_function = None
+
+    @property
+    def jit_compile(self):
+        return self._jit_compile
+
+    @jit_compile.setter
+    def jit_compile(self, jit_compile):
+        self._jit_compile = jit_compile
+        # Compiled step functions are created on first use.
+        self._step_functions = data_structures.NoDependency({})
+        self.train_function = None
+        self.test_function = None
+        self.predict_function = None
+
+    def _step_function(self, name, fn, inputs):
+        """Return a (possibly) XLA-compiled step function.
+
+        Arguments:
+            name: String identifying the step.
+            fn: The step function. Called with the elements of
+                `inputs` as positional arguments.
+            inputs: A tuple of the (nested) inputs of `fn`. None
+                elements are bound and excluded from the signature.
+
+        Returns:
+            A callable that takes the non-None elements of `inputs`.
+
+        """
+        is_none = tuple(arg is None for arg in inputs)
+
+        def _fn(*args):
+            args = iter(args)
+            return fn(*[
+                None if i_none else next(args) for i_none in is_none
+            ])
+
+        if not self._jit_compile:
+            return _fn
+        signature = [
+            tf.nest.map_structure(_batch_spec, arg)
+            for arg in inputs if arg is not None
+        ]
+        # NOTE: The signature fixes all but the batch dimension, so a
+        # distinct function is compiled for every distinct structure and
+        # shape (e.g., the number of references of a dataset).
+        key = (
+            name, is_none, tuple(nest.flatten_with_tuple_paths(signature))
+        )
+        if key not in self._step_functions:
+            self._step_functions[key] = tf.function(
+                _fn, input_signature=signature, experimental_compile=True
+            )
+        return self._step_functions[key]
+
     @property
     def kl_weight(self):
         return self._kl_weight
@@ -645,6 +828,75 @@ class PsychologicalEmbedding(tf.keras.Model):
         data = data_adapter.expand_1d(data)
         x, y, sample_weight = data_adapter.unpack_x_y_sample_weight(data)
 
+        # NOTE: The optimizer update and the metrics are kept outside of
+        # the (possibly) compiled function.
+        y_pred, gradients = self._step_function(
+            'train', self._train_gradients, (x, y, sample_weight)
+        )(*[arg for arg in (x, y, sample_weight) if arg is not None])
+
+        self._apply_gradients(gradients, self.trainable_variables)
+
+        self.compiled_metrics.update_state(y, y_pred, sample_weight)
+        return {m.name: m.result() for m in self.metrics}
+
+    def _apply_gradients(self, gradients, variables):
+        """Apply gradients using the optimizer.
+
+        Sparse gradients (see `sparse_update`) are applied by the
+        optimizer without their constraint. Afterwards, the constraint
+        is applied to the updated rows only. Since row-wise constraints
+        (e.g., `psiz.keras.constraints.Center`) assume the constraint
+        is satisfied before the update, the full constraint is applied
+        once at the first step of every call to `fit`.
+
+        Arguments:
+            gradients: A list of gradients.
+            variables: A list of the corresponding variables.
+
+        """
+        constrained = [
+            var for grad, var in zip(gradients, variables)
+            if isinstance(grad, tf.IndexedSlices) and var.constraint
+        ]
+        if constrained:
+            # NOTE: Keras resets `_train_counter` at the start of `fit`.
+            tf.cond(
+                tf.math.equal(self._train_counter, 0),
+                lambda: _apply_constraints(constrained),
+                lambda: tf.constant(False)
+            )
+
+        row_update = []
+        for grad, var in zip(gradients, variables):
+            if isinstance(grad, tf.IndexedSlices) and var.constraint:
+                # NOTE: The rows are read before the optimizer update.
+                row_update.append(
+                    (var, grad.indices, tf.gather(var, grad.indices))
+                )
+
+        with _detached_constraints([var for var, _, _ in row_update]):
+            self.optimizer.apply_gradients(zip(gradients, variables))
+
+        for var, indices, rows_old in row_update:
+            rows = var.constraint.call_rows(
+                tf.gather(var, indices), rows_old
+            )
+            var.scatter_update(tf.IndexedSlices(rows, indices))
+
+    def _train_gradients(self, x, y, sample_weight):
+        """Return the predictions and gradients of a training step.
+
+        Arguments:
+            x: The model inputs.
+            y: The model outputs.
+            sample_weight: The observation weights (or None).
+
+        Returns:
+            y_pred: The predictions averaged over samples.
+            gradients: A list of gradients, one for each trainable
+                variable.
+
+        """
         # NOTE: During computation of gradients, IndexedSlices are
         # created which generates a TensorFlow warning. I cannot
         # find an implementation that avoids IndexedSlices. The
@@ -660,10 +912,20 @@ class PsychologicalEmbedding(tf.keras.Model):
                 loss = self.compiled_loss(
                     y, y_pred, sample_weight, regularization_losses=self.losses
                 )
+                # NOTE: A float16 kernel (see `psiz.keras.layers.Kernel`)
+                # requires loss scaling to avoid underflowing gradients.
+                is_scaled = isinstance(
+                    self.optimizer,
+                    tf.keras.mixed_precision.experimental.LossScaleOptimizer
+                )
+                if is_scaled:
+                    loss = self.optimizer.get_scaled_loss(loss)
 
             # Custom training steps:
             trainable_variables = self.trainable_variables
             gradients = tape.gradient(loss, trainable_variables)
+            if is_scaled:
+                gradients = self.optimizer.get_unscaled_gradients(gradients)
             # NOTE: There is an open issue for using constraints with
             # embedding-like layers (e.g., tf.keras.layers.Embedding,
             # psiz.keras.layers.GroupAttention), see
@@ -671,18 +933,23 @@ class PsychologicalEmbedding(tf.keras.Model):
             # There are also issues when using Eager Execution. A
             # work-around is to convert the problematic gradients, which
             # are returned as tf.IndexedSlices, into dense tensors.
+            # If `sparse_update` is enabled, sparse gradients are kept
+            # where the constraint (if any) can be applied row-wise.
             for idx, grad in enumerate(gradients):
-                if gradients[idx].__class__.__name__ == 'IndexedSlices':
-                    gradients[idx] = tf.convert_to_tensor(
-                        gradients[idx]
+                if not isinstance(grad, tf.IndexedSlices):
+                    continue
+                var = trainable_variables[idx]
+                constraint = var.constraint
+                if self._sparse_update and (
+                    constraint is None or (
+                        hasattr(constraint, 'is_rowwise') and
+                        constraint.is_rowwise(var.shape.rank)
                     )
-
-        self.optimizer.apply_gradients(zip(
-            gradients, trainable_variables)
-        )
-
-        self.compiled_metrics.update_state(y, y_pred, sample_weight)
-        return {m.name: m.result() for m in self.metrics}
+                ):
+                    gradients[idx] = _deduplicate(grad)
+                else:
+                    gradients[idx] = tf.convert_to_tensor(grad)
+        return y_pred, gradients
 
     def test_step(self, data):
         """The logic for one evaluation step.
@@ -706,6 +973,24 @@ class PsychologicalEmbedding(tf.keras.Model):
         """
         data = data_adapter.expand_1d(data)
         x, y, sample_weight = data_adapter.unpack_x_y_sample_weight(data)
+        y_pred = self._step_function(
+            'test', self._test_predictions, (x, y, sample_weight)
+        )(*[arg for arg in (x, y, sample_weight) if arg is not None])
+        self.compiled_metrics.update_state(y, y_pred, sample_weight)
+        return {m.name: m.result() for m in self.metrics}
+
+    def _test_predictions(self, x, y, sample_weight):
+        """Return the predictions of an evaluation step.
+
+        Arguments:
+            x: The model inputs.
+            y: The model outputs.
+            sample_weight: The observation weights (or None).
+
+        Returns:
+            y_pred: The predictions averaged over samples.
+
+        """
         # NOTE The first dimension of the Tensor returned from calling the
         # model is assumed to be `sample_size`. If this is a singleton
         # dimension, taking the mean is equivalent to a squeeze
@@ -714,8 +999,7 @@ class PsychologicalEmbedding(tf.keras.Model):
         self.compiled_loss(
             y, y_pred, sample_weight, regularization_losses=self.losses
         )
-        self.compiled_metrics.update_state(y, y_pred, sample_weight)
-        return {m.name: m.result() for m in self.metrics}
+        return y_pred
 
     def predict_step(self, data):
         """The logic for one inference step.
@@ -734,9 +1018,15 @@ class PsychologicalEmbedding(tf.keras.Model):
         """
         data = data_adapter.expand_1d(data)
         x, _, _ = data_adapter.unpack_x_y_sample_weight(data)
-        y_pred = tf.reduce_mean(self(x, training=False), axis=0)
+        y_pred = self._step_function(
+            'predict', self._predictions, (x,)
+        )(x)
         return y_pred
 
+    def _predictions(self, x):
+        """Return the predictions averaged over samples."""
+        return tf.reduce_mean(self(x, training=False), axis=0)
+
     def get_config(self):
         """Return model configuration."""
         layer_configs = {
@@ -753,6 +1043,8 @@ class PsychologicalEmbedding(tf.keras.Model):
             'name': self.name,
             'class_name': self.__class__.__name__,
             'n_sample': self.n_sample,
+            'jit_compile': self.jit_compile,
+            'sparse_update': self.sparse_update,
             'layers': copy.deepcopy(layer_configs)
         }
         return config
@@ -892,6 +1184,104 @@ class GroupLevel(tf.keras.layers.Layer):
         raise NotImplementedError
 
 
+def _apply_constraints(variables):
+    """Apply the full constraint of each variable.
+
+    Arguments:
+        variables: A list of variables with a constraint.
+
+    Returns:
+        A Boolean tensor (True).
+
+    """
+    for var in variables:
+        var.assign(var.constraint(var))
+    return tf.constant(True)
+
+
+def _deduplicate(grad):
+    """Sum the values of duplicate indices of a sparse gradient.
+
+    Arguments:
+        grad: A tf.IndexedSlices object.
+
+    Returns:
+        A tf.IndexedSlices object with unique indices.
+
+    """
+    indices, position = tf.unique(grad.indices)
+    values = tf.math.unsorted_segment_sum(
+        grad.values, position, tf.size(indices)
+    )
+    return tf.IndexedSlices(values, indices, grad.dense_shape)
+
+
+@contextlib.contextmanager
+def _detached_constraints(variables):
+    """Temporarily detach the constraints of variables.
+
+    Keras optimizers apply the constraint of a variable to the entire
+    variable after every update. Detaching the constraint allows the
+    constraint to be applied to the updated rows only.
+
+    Arguments:
+        variables: A list of variables.
+
+    """
+    constraint_list = [var._constraint for var in variables]
+    for var in variables:
+        var._constraint = None
+    try:
+        yield
+    finally:
+        for var, constraint in zip(variables, constraint_list):
+            var._constraint = constraint
+
+
+def _batch_spec(value):
+    """Return the type spec of a batched value with unknown batch size.
+
+    Arguments:
+        value: A Tensor.
+
+    Returns:
+        A tf.TensorSpec whose first dimension is None.
+
+    """
+    shape = value.shape
+    if shape.rank:
+        shape = tf.TensorShape([None]).concatenate(shape[1:])
+    return tf.TensorSpec(shape, dtype=value.dtype)
+
+
+def _cache_prefix(cache, name, obs, dataset_kwargs):
+    """Return a distinct cache argument for a named dataset.
+
+    A string `cache` is extended with a key derived from the
+    observations, so that cache files written for different data are
+    not reused. The key is determined by the number of trials, the
+    stimulus set and the dataset arguments.
+
+    Arguments:
+        cache: See `Proxy.fit`.
+        name: String identifying the dataset.
+        obs: The observations of the dataset.
+        dataset_kwargs: The key-word arguments used to format the
+            observations.
+
+    Returns:
+        cache: The cache argument of the named dataset.
+
+    """
+    if cache is None or isinstance(cache, bool):
+        return cache
+    key = hashlib.sha1(np.ascontiguousarray(obs.stimulus_set).tobytes())
+    key.update(repr(sorted(dataset_kwargs.items())).encode())
+    return '{0}_{1}_{2}_{3}'.format(
+        cache, name, obs.n_trial, key.hexdigest()[0:16]
+    )
+
+
 def load_model(filepath, custom_objects={}, compile=False):
     """Load embedding model saved via the save method.
 
@@ -27,9 +27,12 @@ import warnings
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import backend as K
+from tensorflow.python.training.tracking import data_structures
 
 from psiz.models.base import PsychologicalEmbedding
 import psiz.keras.layers
+from psiz.keras.layers.behavior import _tf_outcome_probability
+from psiz.keras.layers.ops.core import exponential_rank_log_prob
 
 
 class Rank(PsychologicalEmbedding):
@@ -37,14 +40,27 @@ class Rank(PsychologicalEmbedding):
 
     Attributes:
         See PsychologicalEmbedding.
+        fused: Boolean indicating if the kernel and behavior are
+            computed with a single fused op.
 
     """
 
-    def __init__(self, behavior=None, **kwargs):
+    def __init__(self, behavior=None, fused=False, **kwargs):
         """Initialize.
 
         Arguments:
             See PschologicalEmbedding.
+            fused (optional): Boolean indicating if the distance,
+                similarity and behavior should be computed with a
+                single fused op (see
+                `psiz.keras.layers.ops.core.exponential_rank_log_prob`)
+                that does not retain full-size intermediates for the
+                backward pass. Requires a `Kernel` or `AttentionKernel`
+                composed of a `WeightedMinkowski` distance and an
+                `ExponentialSimilarity`, and a `RankBehavior`. The
+                fused op computes at full precision. Batches that
+                contain unranked trials (see `is_ranked`) and ragged
+                inputs use the unfused computation.
 
         Raises:
             ValueError: If arguments are invalid.
@@ -56,6 +72,40 @@ class Rank(PsychologicalEmbedding):
         kwargs.update({'behavior': behavior})
 
         super().__init__(**kwargs)
+        self.fused = fused
+
+    @property
+    def fused(self):
+        return self._fused
+
+    @fused.setter
+    def fused(self, fused):
+        if fused and not self._is_fusable():
+            raise ValueError(
+                'The argument `fused` requires a `Kernel` or '
+                '`AttentionKernel` composed of a `WeightedMinkowski` '
+                'distance and an `ExponentialSimilarity`, and a '
+                '`RankBehavior`.'
+            )
+        self._fused = fused
+        # The step functions depend on the forward pass.
+        self._step_functions = data_structures.NoDependency({})
+        self.train_function = None
+        self.test_function = None
+        self.predict_function = None
+
+    def _is_fusable(self):
+        """Return if the layers are supported by the fused op."""
+        return (
+            type(self.kernel) in [
+                psiz.keras.layers.Kernel, psiz.keras.layers.AttentionKernel
+            ] and
+            type(self.kernel.distance) is psiz.keras.layers.WeightedMinkowski
+            and type(self.kernel.similarity) is (
+                psiz.keras.layers.ExponentialSimilarity
+            ) and
+            type(self.behavior) is psiz.keras.layers.RankBehavior
+        )
 
     def call(self, inputs):
         """Call.
@@ -65,9 +115,27 @@ class Rank(PsychologicalEmbedding):
                 stimulus_set: dtype=tf.int32, consisting of the
                     integers on the interval [0, n_stimuli[
                     shape=(batch_size, n_max_reference + 1, n_outcome)
+                    or shape=(batch_size, n_max_reference + 1) if
+                    `outcome_idx` is provided. May also be a
+                    RaggedTensor without placeholders, in which case
+                    absent references are never embedded or passed
+                    through the kernel.
+                    shape=(batch_size, [n_reference + 1])
+                outcome_idx (optional): dtype=tf.int32, the column
+                    indices of `stimulus_set` that yield each possible
+                    outcome. The index `n_max_reference + 1` refers to
+                    a placeholder (i.e., non-existent outcome). If
+                    provided, the stimulus set is only embedded once
+                    and the embeddings are permuted to yield all
+                    outcomes.
+                    shape=(batch_size, n_max_reference + 1, n_outcome)
                 is_select: dtype=tf.bool, the shape implies the
                     maximum number of selected stimuli in the data
                     shape=(batch_size, n_max_select, n_outcome)
+                is_ranked (optional): dtype=tf.bool, indicating if
+                    the selections of a trial are ranked. If not
+                    provided, all trials are assumed to be ranked.
+                    shape=(batch_size, 1)
                 group: dtype=tf.int32, Integers indicating the
                     group membership of a trial.
                     shape=(batch_size, k)
@@ -78,16 +146,40 @@ class Rank(PsychologicalEmbedding):
         is_select = inputs['is_select'][:, 1:, :]
         group = inputs['group']
 
-        # Inflate coordinates.
-        z = self.stimuli([stimulus_set, group])
-
-        # Check `z` shape is:
-        # TensorShape([sample_size, batch_size, n_ref + 1, n_outcome, n_dim])
-        if tf.math.equal(tf.rank(z), 4):
-            z = tf.expand_dims(z, axis=0)
+        if isinstance(stimulus_set, tf.RaggedTensor):
+            sim_qr, is_outcome = self._ragged_similarity(inputs)
+            return self._behavior(inputs, sim_qr, is_select, is_outcome)
+
+        if 'outcome_idx' in inputs:
+            outcome_idx = inputs['outcome_idx']
+            # Append placeholder column referenced by non-existent outcomes.
+            stimulus_set = tf.pad(stimulus_set, [[0, 0], [0, 1]])
+
+            # Inflate coordinates once per stimulus.
+            z = self.stimuli([stimulus_set, group])
+            # TensorShape([sample_size, batch_size, n_ref + 2, n_dim])
+            if z.shape.rank == 3:
+                z = tf.expand_dims(z, axis=0)
+
+            # Permute coordinates to yield all outcomes.
+            z = _gather_outcomes(z, outcome_idx)
+            stimulus_set = tf.gather(stimulus_set, outcome_idx, batch_dims=1)
+        else:
+            # Inflate coordinates.
+            z = self.stimuli([stimulus_set, group])
+
+            # Check `z` shape is:
+            # TensorShape([sample_size, batch_size, n_ref + 1, n_outcome, n_dim])
+            if tf.math.equal(tf.rank(z), 4):
+                z = tf.expand_dims(z, axis=0)
         max_n_reference = tf.shape(z)[-3] - 1
         z_q, z_r = tf.split(z, [1, max_n_reference], -3)
 
+        if self._fused:
+            return self._fused_behavior(
+                inputs, z_q, z_r, stimulus_set, is_select
+            )
+
         # Pass through similarity kernel.
         sim_qr = self.kernel([z_q, z_r, group])
         # TensorShape([sample_size, batch_size, n_ref, n_outcome])
@@ -95,19 +187,195 @@ class Rank(PsychologicalEmbedding):
         # Zero out similarities involving placeholder IDs.
         is_present = tf.math.not_equal(stimulus_set, 0)
         is_present = tf.expand_dims(
-            tf.cast(is_present[:, 1:, :], dtype=K.floatx()), axis=0
+            tf.cast(is_present[:, 1:, :], dtype=sim_qr.dtype), axis=0
         )
         sim_qr = sim_qr * is_present
+        is_outcome = is_present[:, :, 0, :]
+        return self._behavior(inputs, sim_qr, is_select, is_outcome)
+
+    def _ragged_similarity(self, inputs):
+        """Return query-reference similarities of ragged stimulus sets.
+
+        Only the stimuli that are present are embedded and passed
+        through the kernel. The similarity of each reference is
+        computed once and then permuted to yield all outcomes.
+
+        Arguments:
+            inputs: A dictionary of inputs. See `call`. The
+                `stimulus_set` is a RaggedTensor.
+                shape=(batch_size, [n_reference + 1])
+
+        Returns:
+            sim_qr: The similarity between the query and the
+                references of every outcome. Non-existent references
+                have zero similarity.
+                shape=(sample_size, batch_size, n_max_reference,
+                n_outcome)
+            is_outcome: Indicates the outcomes that exist.
+                shape=(1, batch_size, n_outcome)
+
+        """
+        stimulus_set = inputs['stimulus_set']
+        group = inputs['group']
+
+        # Embed present stimuli only.
+        row_idx = stimulus_set.value_rowids()
+        group_flat = tf.gather(group, row_idx)
+        z = self.stimuli([stimulus_set.flat_values, group_flat])
+        # TensorShape([sample_size, n_present, n_dim])
+        if z.shape.rank == 2:
+            z = tf.expand_dims(z, axis=0)
+
+        # Pair every stimulus with the query of its trial.
+        query_idx = tf.gather(stimulus_set.row_starts(), row_idx)
+        z_q = tf.gather(z, query_idx, axis=1)
+        sim_flat = self.kernel([z_q, z, group_flat])
+        # TensorShape([sample_size, n_present])
+        # Zero out the similarity of the query with itself.
+        is_reference = tf.math.not_equal(
+            tf.range(tf.shape(row_idx, out_type=row_idx.dtype)[0]),
+            query_idx
+        )
+        sim_flat = sim_flat * tf.cast(is_reference, dtype=sim_flat.dtype)
+
+        # Scatter to a zero-padded tensor with one column per stimulus set
+        # column and an additional placeholder column.
+        sim = stimulus_set.with_flat_values(
+            tf.transpose(sim_flat)
+        ).to_tensor(default_value=0.)
+        # TensorShape([batch_size, max_n_present, sample_size])
+        if 'outcome_idx' in inputs:
+            outcome_idx = inputs['outcome_idx']
+        else:
+            # The observed outcome only.
+            outcome_idx = tf.expand_dims(
+                tf.range(tf.shape(inputs['is_select'])[1]), axis=-1
+            )
+            outcome_idx = tf.broadcast_to(
+                outcome_idx, [tf.shape(sim)[0], tf.shape(outcome_idx)[0], 1]
+            )
+        n_column = tf.shape(outcome_idx)[1] + 1
+        sim = tf.pad(sim, [[0, 0], [0, n_column - tf.shape(sim)[1]], [0, 0]])
+
+        # Permute similarities to yield all outcomes.
+        sim_qr = tf.gather(sim, outcome_idx[:, 1:, :], axis=1, batch_dims=1)
+        sim_qr = tf.transpose(sim_qr, perm=[3, 0, 1, 2])
+
+        is_outcome = tf.math.not_equal(outcome_idx[:, 1, :], n_column - 1)
+        is_outcome = tf.expand_dims(
+            tf.cast(is_outcome, dtype=K.floatx()), axis=0
+        )
+        return sim_qr, is_outcome
+
+    def _fused_behavior(self, inputs, z_q, z_r, stimulus_set, is_select):
+        """Compute probability of outcomes with a single fused op.
+
+        If a batch contains unranked trials (see `is_ranked`), the
+        probabilities are computed from the similarities instead,
+        since the probability of an unranked set of selections is not
+        covered by the fused op.
+
+        Arguments:
+            inputs: A dictionary of inputs. See `call`.
+            z_q: The query coordinates.
+                shape=(sample_size, batch_size, 1, n_outcome, n_dim)
+            z_r: The reference coordinates.
+                shape=(sample_size, batch_size, n_max_reference,
+                n_outcome, n_dim)
+            stimulus_set: The (permuted) stimulus set.
+                shape=(batch_size, n_max_reference + 1, n_outcome)
+            is_select: A Boolean tensor indicating if a reference was
+                selected.
+                shape=(batch_size, n_max_reference, n_outcome)
+
+        Returns:
+            The probability of each outcome.
+                shape=(sample_size, batch_size, n_outcome)
+
+        """
+        distance = self.kernel.distance
+        similarity = self.kernel.similarity
+        dtype = z_q.dtype
+
+        # NOTE: The attention weights are computed outside of the
+        # conditional below, so that any losses they add (e.g., of a
+        # variational attention layer) are added exactly once.
+        w = self.kernel._attention_weights(z_q, inputs['group'])
+        is_present = tf.cast(
+            tf.math.not_equal(stimulus_set[:, 1:, :], 0), dtype=dtype
+        )
+        is_outcome = tf.expand_dims(is_present[:, 0, :], axis=0)
+
+        def _ranked():
+            seq_log_prob = exponential_rank_log_prob(
+                z_q, z_r, tf.cast(w, dtype=dtype),
+                tf.cast(distance.rho, dtype=dtype),
+                tf.cast(similarity.tau, dtype=dtype),
+                tf.cast(similarity.beta, dtype=dtype),
+                tf.cast(similarity.gamma, dtype=dtype),
+                is_present, tf.cast(is_select, dtype=dtype)
+            )
+            return _tf_outcome_probability(
+                tf.math.exp(seq_log_prob), is_outcome
+            )
+
+        def _unranked():
+            sim_qr = similarity(distance([z_q, z_r, w]))
+            sim_qr = sim_qr * tf.cast(
+                tf.expand_dims(is_present, axis=0), dtype=sim_qr.dtype
+            )
+            return self._behavior(inputs, sim_qr, is_select, is_outcome)
+
+        if 'is_ranked' not in inputs:
+            return _ranked()
+        return tf.cond(
+            tf.math.reduce_all(inputs['is_ranked']), _ranked, _unranked
+        )
 
-        # Compute probability of different behavioral outcomes.
+    def get_config(self):
+        """Return model configuration."""
+        config = super().get_config()
+        config.update({'fused': self.fused})
+        return config
+
+    def _behavior(self, inputs, sim_qr, is_select, is_outcome):
+        """Compute probability of different behavioral outcomes."""
+        # NOTE: The kernel may compute similarities at reduced precision,
+        # but the log-probabilities are accumulated at full precision.
+        sim_qr = tf.cast(sim_qr, dtype=K.floatx())
         is_select = tf.expand_dims(
             tf.cast(is_select, dtype=K.floatx()), axis=0
         )
-        is_outcome = tf.cast(is_present[:, :, 0, :], dtype=K.floatx())
-        probs = self.behavior([sim_qr, is_select, is_outcome])
+        is_outcome = tf.cast(is_outcome, dtype=K.floatx())
+        if 'is_ranked' in inputs:
+            probs = self.behavior(
+                [sim_qr, is_select, is_outcome, inputs['is_ranked']]
+            )
+        else:
+            probs = self.behavior([sim_qr, is_select, is_outcome])
         return probs
 
 
+def _gather_outcomes(z, outcome_idx):
+    """Permute embedded stimulus sets to yield all possible outcomes.
+
+    Arguments:
+        z: A tensor of embedding coordinates.
+            shape=(sample_size, batch_size, n_column, n_dim)
+        outcome_idx: An integer tensor of column indices.
+            shape=(batch_size, n_max_reference + 1, n_outcome)
+
+    Returns:
+        z: A tensor of permuted embedding coordinates.
+            shape=(sample_size, batch_size, n_max_reference + 1,
+            n_outcome, n_dim)
+
+    """
+    z = tf.transpose(z, perm=[1, 0, 2, 3])
+    z = tf.gather(z, outcome_idx, axis=2, batch_dims=1)
+    return tf.transpose(z, perm=[1, 0, 2, 3, 4])
+
+
 def _ranked_sequence_probability(sim_qr, n_select):
     """Return probability of a ranked selection sequence.
 
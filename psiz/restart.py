@@ -181,6 +181,10 @@ class Restarter(object):
             logs['epoch'] = n_epoch
             logs['total_duration_s'] = int(total_duration)
             logs['ms_per_epoch'] = int(1000 * total_duration / n_epoch)
+            if 'trials_per_s' in history.history:
+                logs['trials_per_s'] = np.mean(
+                    history.history['trials_per_s']
+                )
             train_metrics = model_re.evaluate(
                 x=x, verbose=0, return_dict=True
             )
@@ -241,6 +245,13 @@ class Restarter(object):
                     summary_mean['ms_per_epoch'], summary_std['ms_per_epoch']
                 )
             )
+            if 'trials_per_s' in summary_mean:
+                print(
+                    '    throughput | {0:.0f} \u00B1{1:.0f} trials/s'.format(
+                        summary_mean['trials_per_s'],
+                        summary_std['trials_per_s']
+                    )
+                )
 
         return tracker
 
@@ -17,6 +17,7 @@
 
 from psiz.trials.core import stack
 from psiz.trials.core import load_trials
+from psiz.trials.core import iter_trials
 from psiz.trials.similarity.rank import RankDocket
 from psiz.trials.similarity.rank import RankObservations
 from psiz.trials.similarity.rate import RateDocket
@@ -18,26 +18,40 @@
 Functions:
     load_trials: Load a hdf5 file that was saved using the `save` class
         method.
+    iter_trials: Iterate over the row groups of a Parquet file that
+        was saved using the `save_parquet` class method.
     stack: Combine a list of multiple SimilarityTrial objects into one.
 
 """
 import h5py
+import numpy as np
 
+from psiz.trials.similarity.base import check_mmap_mode
+from psiz.trials.similarity.base import import_pyarrow
 from psiz.trials.similarity.rank import RankDocket
 from psiz.trials.similarity.rank import RankObservations
 from psiz.trials.similarity.rate import RateDocket
 from psiz.trials.similarity.rate import RateObservations
 
 
-def load_trials(filepath, verbose=0):
+def load_trials(filepath, verbose=0, index=None, mmap_mode=None):
     """Load data saved via the save method.
 
     The loaded data is instantiated as a concrete class of
     psiz.trials.SimilarityTrials.
 
     Arguments:
-        filepath: The location of the hdf5 file to load.
+        filepath: The location of the hdf5 file to load. Parquet files
+            saved using the `save_parquet` class method are also
+            supported (requires the optional dependency `pyarrow`).
         verbose (optional): Controls the verbosity of printed summary.
+        index (optional): An integer (or Boolean) array indicating the
+            subset of trials to load.
+        mmap_mode (optional): Either 'r' (read-only) or 'c'
+            (copy-on-write). If not None, contiguous datasets of an
+            HDF5 file are memory-mapped. Datasets saved with
+            `compression` (or chunking) are read into memory
+            regardless. See `numpy.memmap`.
 
     Returns:
         Loaded trials.
@@ -46,17 +60,37 @@ def load_trials(filepath, verbose=0):
         ValueError
 
     """
+    check_mmap_mode(mmap_mode)
+    if _is_parquet(filepath):
+        pq = import_pyarrow().parquet
+        table = pq.read_table(str(filepath), memory_map=True)
+        trial_class = _arrow_trial_class(table.schema)
+        if index is not None:
+            index = np.arange(table.num_rows)[index]
+            table = table.take(index)
+        trials = trial_class.from_arrow(table)
+        class_name = trial_class.__name__
+        if verbose > 0:
+            print("Trial Summary")
+            print('  class_name: {0}'.format(class_name))
+            print('  n_trial: {0}'.format(trials.n_trial))
+        return trials
+
     f = h5py.File(filepath, "r")
     # Retrieve trial class name.
     class_name = f["trial_type"][()]
     f.close()
+    if isinstance(class_name, bytes):
+        class_name = class_name.decode()
 
     # Handle legacy.
     if class_name == "Docket":
         class_name = "RankDocket"
     elif class_name == "Observations":
         class_name = "RankObservations"
-    
+    elif class_name == "RateObservatiosn":
+        class_name = "RateObservations"
+
     # Route to appropriate class.
     custom_objects = {
         'RankDocket': RankDocket,
@@ -69,15 +103,79 @@ def load_trials(filepath, verbose=0):
     else:
         raise NotImplementedError
 
-    trials = trial_class.load(filepath)
+    trials = trial_class.load(filepath, index=index, mmap_mode=mmap_mode)
 
     if verbose > 0:
         print("Trial Summary")
         print('  class_name: {0}'.format(class_name))
-        print('  n_trial: {0}'.format(loaded_trials.n_trial))
+        print('  n_trial: {0}'.format(trials.n_trial))
     return trials
 
 
+def iter_trials(filepath, batch_size=None):
+    """Iterate over the trials of a Parquet file.
+
+    Only one row group (or batch) of trials is held in memory at a
+    time, which allows processing files that do not fit in memory.
+    Requires the optional dependency `pyarrow`.
+
+    Arguments:
+        filepath: The location of a Parquet file that was saved using
+            the `save_parquet` class method.
+        batch_size (optional): Integer indicating the maximum number
+            of trials per yielded object. If None, one object is
+            yielded per row group.
+
+    Yields:
+        trials: A SimilarityTrials object.
+
+    """
+    pq = import_pyarrow().parquet
+    parquet_file = pq.ParquetFile(str(filepath), memory_map=True)
+    trial_class = _arrow_trial_class(parquet_file.schema_arrow)
+    if batch_size is None:
+        for i_group in range(parquet_file.num_row_groups):
+            yield trial_class.from_arrow(parquet_file.read_row_group(i_group))
+    else:
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield trial_class.from_arrow(batch)
+
+
+def _is_parquet(filepath):
+    """Return True if the file is a Parquet file."""
+    with open(filepath, "rb") as f:
+        return f.read(4) == b"PAR1"
+
+
+def _arrow_trial_class(schema):
+    """Return the trial class stored in the metadata of an Arrow schema.
+
+    Arguments:
+        schema: A pyarrow.Schema.
+
+    Returns:
+        trial_class: A concrete class of psiz.trials.SimilarityTrials.
+
+    Raises:
+        ValueError: If the schema does not identify a trial class.
+
+    """
+    custom_objects = {
+        'RankDocket': RankDocket,
+        'RankObservations': RankObservations,
+        'RateDocket': RateDocket,
+        'RateObservations': RateObservations,
+    }
+    metadata = schema.metadata or {}
+    class_name = metadata.get(b"trial_type", b"").decode()
+    if class_name not in custom_objects:
+        raise ValueError(
+            "The schema does not identify a trial class. Found "
+            "trial_type '{0}'.".format(class_name)
+        )
+    return custom_objects[class_name]
+
+
 def stack(trials_list):
     """Return an instance of a SimilarityTrials object of all trials.
 
@@ -17,8 +17,39 @@
 
 Classes:
     SimilarityTrials: Abstract class for similarity judgment trials.
+    SubsetView: Mixin for a lazily materialized subset of trials.
+    SharedTrials: A picklable handle of trials that reside in shared
+        memory.
+    StimulusCoverage: Per-stimulus and per-pair coverage statistics of
+        trials.
 
 Functions:
+    compact_dtype: Return the narrowest signed integer dtype for a
+        range of values.
+    widen_dataset: Widen compact integer inputs inside the graph.
+    unique_configurations: Determine the unique trial configurations
+        and the configuration index of every trial.
+    subset_configurations: Determine the unique trial configurations
+        of a subset of trials.
+    merge_configurations: Merge the unique trial configurations of
+        two sets of trials.
+    stack_configurations: Merge the unique trial configurations of
+        multiple sets of trials.
+    stack_stimulus_set: Stack and pad multiple stimulus sets.
+    save_column: Save a trial variable to an HDF5 file.
+    append_column: Append trials to a trial variable of an HDF5 file.
+    load_column: Load a trial variable from an HDF5 file.
+    check_mmap_mode: Check the memory-map mode of `load_column`.
+    chunked_dataset: Return a dataset that streams chunks of trials.
+    cache_dataset: Cache the elements of a dataset in memory or on
+        disk.
+    arrow_table: Return trial variables as a pyarrow.Table.
+    arrow_columns: Return the trial variables of a pyarrow.Table.
+    import_pyarrow: Import the optional pyarrow dependency.
+    compress_trials: Determine the unique trials and aggregate their
+        weights.
+    expand_weight: Split the weight of compressed trials among their
+        copies.
 
 Notes:
     A `stimulus_id` of `-1` is a reserved value to be used as a
@@ -44,14 +75,20 @@ TODO:
 from abc import ABCMeta, abstractmethod
 from itertools import permutations
 import copy
+import os
 import warnings
 
 import h5py
 import numpy as np
 import pandas as pd
+from scipy import sparse
 import tensorflow as tf
 from tensorflow.keras import backend as K
 
+# The number of trials per HDF5 chunk (and per block when reading a
+# subset of trials).
+CHUNK_SIZE = 2**14
+
 
 class SimilarityTrials(metaclass=ABCMeta):
     """Abstract base class for similarity judgment trials.
@@ -82,7 +119,10 @@ class SimilarityTrials(metaclass=ABCMeta):
     Methods:
         subset: Return a subset of similarity trials given an index.
         save: Save the object to disk.
+        save_parquet: Save the object as a Parquet file.
+        share: Place the trial variables in shared memory.
         is_present: Indicate if a stimulus is present.
+        compact: Convert trial variables to compact dtypes.
 
     """
 
@@ -108,6 +148,30 @@ class SimilarityTrials(metaclass=ABCMeta):
         self.config_list = None
         self.outcome_idx_list = None
 
+    def _init_trusted(self, stimulus_set):
+        """Initialize from a stimulus set that is known to be valid.
+
+        Counterpart of `__init__` that skips all checks. Used by the
+        `from_arrays` method of the concrete classes.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+
+        """
+        stimulus_set = np.asarray(stimulus_set)
+        if not (
+            issubclass(stimulus_set.dtype.type, np.signedinteger) and
+            stimulus_set.dtype.itemsize < 4
+        ):
+            stimulus_set = stimulus_set.astype(np.int32, copy=False)
+        self.stimulus_set = stimulus_set
+        self.n_trial = stimulus_set.shape[0]
+
+        # Attributes determined by concrete class.
+        self.config_idx = None
+        self.config_list = None
+        self.outcome_idx_list = None
+
     def _check_stimulus_set(self, stimulus_set):
         """Check the argument `stimulus_set`.
 
@@ -137,7 +201,14 @@ class SimilarityTrials(metaclass=ABCMeta):
                 "The argument `stimulus_set` must only contain integers "
                 "in the int32 range."
             ))
-        return stimulus_set.astype(np.int32)
+        # NOTE: Avoid a copy if possible (e.g., memory-mapped data). Compact
+        # (narrower) signed dtypes are preserved.
+        if (
+            issubclass(stimulus_set.dtype.type, np.signedinteger) and
+            stimulus_set.dtype.itemsize < 4
+        ):
+            return stimulus_set
+        return stimulus_set.astype(np.int32, copy=False)
 
     @abstractmethod
     def _set_configuration_data(self, *args):
@@ -181,10 +252,123 @@ class SimilarityTrials(metaclass=ABCMeta):
         """
         pass
 
+    def save_parquet(
+            self, filepath, row_group_size=None, compression='snappy'):
+        """Save the SimilarityTrials object as a Parquet file.
+
+        Requires the optional dependency `pyarrow`. The file can be
+        loaded using `psiz.trials.load_trials` or streamed one row
+        group at a time using `psiz.trials.iter_trials`.
+
+        Arguments:
+            filepath: String specifying the path to save the data.
+            row_group_size (optional): Integer indicating the maximum
+                number of trials per row group.
+            compression (optional): String indicating the Parquet
+                compression codec.
+
+        """
+        pq = import_pyarrow().parquet
+        pq.write_table(
+            self.to_arrow(), str(filepath), row_group_size=row_group_size,
+            compression=compression
+        )
+
+    def share(self, filepath=None):
+        """Place the trial variables in shared memory.
+
+        Arguments:
+            filepath (optional): String indicating a file that backs
+                the shared trial variables. If None, the trial
+                variables are placed in a
+                `multiprocessing.shared_memory` block, which requires
+                Python 3.8 or newer.
+
+        Returns:
+            handle: A SharedTrials object. The handle is cheap to
+                pickle and rebuilds the trials in a worker process
+                without copying the trial variables.
+
+        Raises:
+            ImportError: If `filepath` is None and shared memory is
+                not supported by the Python version.
+
+        """
+        return SharedTrials(self, filepath=filepath)
+
     def is_present(self):
-        """Return a 2D Boolean array indicating a present stimulus."""
-        is_present = np.not_equal(self.stimulus_set, -1)
-        return is_present
+        """Return a 2D Boolean array indicating a present stimulus.
+
+        The array is computed once and cached as a read-only array.
+
+        """
+        return self._cached(
+            'is_present', lambda: np.not_equal(self.stimulus_set, -1)
+        )
+
+    def _cached(self, key, fn):
+        """Return a cached derived array.
+
+        Derived arrays are computed once and cached on the object. The
+        cache is cleared by methods that mutate the object (see
+        `_clear_cache`). Cached arrays are read-only so that they
+        cannot be corrupted by callers.
+
+        Arguments:
+            key: String identifying the derived array.
+            fn: A callable that computes the derived array.
+
+        Returns:
+            The (read-only) derived array.
+
+        """
+        cache = self.__dict__.setdefault('_cache', {})
+        if key not in cache:
+            arr = fn()
+            arr.setflags(write=False)
+            cache[key] = arr
+        return cache[key]
+
+    def _clear_cache(self):
+        """Clear all cached derived arrays."""
+        self.__dict__.pop('_cache', None)
+
+    def compact(self, n_stimuli=None):
+        """Convert trial variables to compact dtypes (in place).
+
+        Stimulus indices are stored using the narrowest signed integer
+        dtype that accommodates `n_stimuli` (and the placeholder value
+        -1). Compact dtypes are preserved when saving and loading and
+        are only widened inside the TensorFlow graph (see
+        `widen_dataset`).
+
+        Arguments:
+            n_stimuli (optional): Integer indicating the total number
+                of unique stimuli. By default, `n_stimuli` is inferred
+                from the largest stimulus index.
+
+        Returns:
+            self
+
+        Raises:
+            ValueError
+
+        """
+        max_stimulus_id = np.max(self.stimulus_set)
+        if n_stimuli is None:
+            n_stimuli = max_stimulus_id + 1
+        elif n_stimuli <= max_stimulus_id:
+            raise ValueError((
+                "The argument `n_stimuli` must be greater than the largest "
+                "stimulus index in `stimulus_set`."
+            ))
+        # NOTE: The dataset pipeline uses `stimulus_set + 1`, so the dtype
+        # must accommodate the value `n_stimuli`.
+        self.stimulus_set = self.stimulus_set.astype(
+            compact_dtype(n_stimuli), copy=False
+        )
+        self._clear_cache()
+        return self
 
     def _infer_n_present(self, stimulus_set):
         """Return the number of stimuli present in each trial.
@@ -201,5 +385,1173 @@ class SimilarityTrials(metaclass=ABCMeta):
                 shape = [n_trial, 1]
 
         """
-        n_present = np.sum(self.is_present(), axis=1)
+        n_present = np.sum(np.not_equal(stimulus_set, -1), axis=1)
         return n_present.astype(dtype=np.int32)
+
+
+class SubsetView(object):
+    """Mixin for a lazily materialized subset of trials.
+
+    A view holds an index array over the trial variables of a parent
+    object. A trial variable is only indexed (i.e., copied) the first
+    time it is accessed, after which it is an ordinary attribute.
+    Consequently, mutating or saving a view materializes the required
+    variables, while variables that are never accessed are never
+    copied. Pickling (or deep copying) a view materializes all
+    variables, so that the arrays of the parent are not pickled.
+
+    Notes:
+        The view references the arrays of the parent object at the
+        time the view was created. Modifying these arrays in place
+        before the corresponding variable of the view has been
+        materialized will also modify the view.
+
+    """
+
+    def _init_view(self, parent, index, var_list):
+        """Initialize view.
+
+        Arguments:
+            parent: A SimilarityTrials object. If `parent` is itself
+                a view, the view is created directly over the variables
+                of its parent that have not been materialized yet.
+            index: An integer (or Boolean) array indicating the
+                trials of `parent` that belong to the subset.
+            var_list: A list of the trial variables that are
+                materialized lazily.
+
+        """
+        index = np.arange(parent.n_trial)[index]
+        parent_var = parent.__dict__.get('_view_var', {})
+
+        view_var = {}
+        for var_name in var_list:
+            if var_name in parent_var:
+                arr, parent_index = parent_var[var_name]
+                view_var[var_name] = (arr, parent_index[index])
+            else:
+                view_var[var_name] = (getattr(parent, var_name), index)
+
+        self._view_var = view_var
+        self.n_trial = len(index)
+
+    def __getattr__(self, name):
+        """Materialize a trial variable on first access."""
+        view_var = self.__dict__.get('_view_var', {})
+        if name not in view_var:
+            raise AttributeError(
+                "'{0}' object has no attribute '{1}'".format(
+                    type(self).__name__, name
+                )
+            )
+        arr, index = view_var.pop(name)
+        value = arr[index]
+        setattr(self, name, value)
+        return value
+
+    def __getstate__(self):
+        """Return state for pickling.
+
+        All trial variables are materialized first so that only the rows
+        of the subset are pickled (rather than the arrays of the
+        parent).
+
+        """
+        for var_name in list(self.__dict__.get('_view_var', {})):
+            getattr(self, var_name)
+        state = self.__dict__.copy()
+        state.pop('_view_var', None)
+        return state
+
+
+class SharedTrials(object):
+    """A picklable handle of trials that reside in shared memory.
+
+    The numeric trial variables are copied once into a single
+    `multiprocessing.shared_memory` block (or a memory-mapped file).
+    All other attributes (e.g., the configuration table) are small
+    and pickled with the handle. A worker process rebuilds the trials
+    from the handle without copying the trial variables, so only the
+    handle and an index array need to be shipped per task.
+
+    Example:
+        handle = obs.share()
+        with multiprocessing.Pool() as pool:
+            pool.map(fit_fold, [(handle, idx) for idx in fold_list])
+        handle.unlink()
+
+    where `fit_fold` calls `handle.load(idx)`.
+
+    Methods:
+        load: Rebuild the (subset of) trials.
+        close: Close the shared memory of the creating process.
+        unlink: Release the shared memory.
+
+    """
+
+    def __init__(self, trials, filepath=None):
+        """Initialize.
+
+        Arguments:
+            trials: A SimilarityTrials object.
+            filepath (optional): See `SimilarityTrials.share`.
+
+        """
+        # Materialize all variables of a view.
+        for name in list(trials.__dict__.get('_view_var', {})):
+            getattr(trials, name)
+
+        layout = []
+        state = {}
+        nbytes = 0
+        for name, value in trials.__dict__.items():
+            if name in ('_cache', '_buffer', '_view_var', '_coverage'):
+                continue
+            if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+                layout.append((name, value.dtype.str, value.shape, nbytes))
+                # Align each variable to a cache line.
+                nbytes = nbytes + int(np.ceil(value.nbytes / 64.) * 64)
+            else:
+                state[name] = value
+
+        self.trial_class = type(trials)
+        self.filepath = filepath
+        self.name = None
+        self._layout = layout
+        self._state = state
+        self._shm = None
+        if filepath is None:
+            self._shm = _import_shared_memory().SharedMemory(
+                create=True, size=max(nbytes, 1)
+            )
+            self.name = self._shm.name
+            buffer = self._shm.buf
+        else:
+            self.filepath = str(filepath)
+            buffer = np.memmap(
+                self.filepath, dtype=np.uint8, mode='w+',
+                shape=(max(nbytes, 1),)
+            )
+        for name, dtype, shape, offset in layout:
+            arr = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            arr[...] = getattr(trials, name)
+            del arr
+        if filepath is not None:
+            buffer.flush()
+        del buffer
+
+    def __getstate__(self):
+        """Return the picklable state of the handle."""
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
+
+    def load(self, index=None):
+        """Rebuild the trials without copying the trial variables.
+
+        Arguments:
+            index (optional): An integer (or Boolean) array indicating
+                a subset of trials. If provided, a lazily materialized
+                subset is returned (see `SubsetView`).
+
+        Returns:
+            trials: A SimilarityTrials object whose trial variables are
+                read-only arrays backed by the shared memory.
+
+        """
+        if self.filepath is None:
+            buffer = _attach_shared_memory(self.name).buf
+        else:
+            buffer = np.memmap(self.filepath, dtype=np.uint8, mode='r')
+
+        trials = self.trial_class.__new__(self.trial_class)
+        trials.__dict__.update(self._state)
+        for name, dtype, shape, offset in self._layout:
+            arr = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            arr.flags.writeable = False
+            setattr(trials, name, arr)
+        if index is not None:
+            trials = trials.subset(index)
+        return trials
+
+    def close(self):
+        """Close the shared memory of the creating process."""
+        if self._shm is not None:
+            self._shm.close()
+
+    def unlink(self):
+        """Release the shared memory.
+
+        Should be called once by the creating process after all workers
+        have finished.
+
+        """
+        if self.filepath is None:
+            shm = self._shm
+            if shm is None:
+                shm = _import_shared_memory().SharedMemory(name=self.name)
+            shm.close()
+            shm.unlink()
+            self._shm = None
+        elif os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+
+# Shared memory blocks that have been attached by this process. The
+# blocks are kept open for the lifetime of the process, so that loaded
+# trials (and views of them) never outlive their buffer and repeated
+# loads in a worker are cheap.
+_ATTACHED_MEMORY = {}
+
+
+def _attach_shared_memory(name):
+    """Return an attached shared memory block.
+
+    Arguments:
+        name: String indicating the name of the block.
+
+    Returns:
+        shm: A multiprocessing.shared_memory.SharedMemory object.
+
+    """
+    if name not in _ATTACHED_MEMORY:
+        # NOTE: Only the creating process owns the block. Worker
+        # processes started by `multiprocessing` share the resource
+        # tracker of the creating process, so attaching does not
+        # transfer ownership.
+        _ATTACHED_MEMORY[name] = _import_shared_memory().SharedMemory(
+            name=name
+        )
+    return _ATTACHED_MEMORY[name]
+
+
+def _import_shared_memory():
+    """Return the `multiprocessing.shared_memory` module.
+
+    Raises:
+        ImportError: If the Python version is older than 3.8.
+
+    """
+    try:
+        from multiprocessing import shared_memory
+    except ImportError as e:
+        raise ImportError(
+            "Shared memory requires Python 3.8 or newer. On older "
+            "versions, provide a `filepath` to share the trials via a "
+            "memory-mapped file instead."
+        ) from e
+    return shared_memory
+
+
+class StimulusCoverage(object):
+    """Per-stimulus and per-pair coverage statistics of trials.
+
+    The statistics are maintained incrementally, i.e., the cost of an
+    update is proportional to the number of added trials. New
+    (query, reference) pairs are buffered and only consolidated into
+    `pair_count` when it is accessed, so the cost of consolidation is
+    proportional to the number of stored pairs, but is incurred once
+    per access rather than once per update.
+
+    Attributes:
+        n_stimuli: Integer indicating the number of stimuli covered by
+            the statistics. Grows as trials with larger stimulus
+            indices are added.
+        query_count: An integer array indicating how often each
+            stimulus served as a query.
+            shape = (n_stimuli,)
+        reference_count: An integer array indicating how often each
+            stimulus served as a reference.
+            shape = (n_stimuli,)
+        pair_count: A sparse integer matrix (CSR format) indicating how
+            often two stimuli co-occurred. Element (i, j) indicates how
+            often stimulus `j` served as a reference of query `i`.
+            shape = (n_stimuli, n_stimuli)
+
+    Methods:
+        update: Add the statistics of a stimulus set.
+        merge: Add the statistics of another StimulusCoverage object.
+        copy: Return a copy of the statistics.
+        r_priority: Return a sparse reference priority matrix.
+
+    """
+
+    def __init__(self, n_stimuli=0):
+        """Initialize.
+
+        Arguments:
+            n_stimuli (optional): Integer indicating the initial number
+                of stimuli.
+
+        """
+        self.n_stimuli = n_stimuli
+        self.query_count = np.zeros([n_stimuli], dtype=np.int64)
+        self.reference_count = np.zeros([n_stimuli], dtype=np.int64)
+        self._pair_count = sparse.csr_matrix(
+            (n_stimuli, n_stimuli), dtype=np.int64
+        )
+        # Buffered (row, column, count) arrays in COO format.
+        self._pair_buffer = []
+
+    @property
+    def pair_count(self):
+        """Return the pair counts after consolidating buffered pairs."""
+        if self._pair_buffer:
+            row, col, data = (
+                np.concatenate(x) for x in zip(*self._pair_buffer)
+            )
+            # NOTE: Duplicate (query, reference) pairs are summed when
+            # converting from COO format.
+            self._pair_count = self._pair_count + sparse.coo_matrix(
+                (data, (row, col)), shape=(self.n_stimuli, self.n_stimuli)
+            ).tocsr()
+            self._pair_buffer = []
+        return self._pair_count
+
+    def _resize(self, n_stimuli):
+        """Grow the statistics to accommodate `n_stimuli`."""
+        if n_stimuli <= self.n_stimuli:
+            return
+        n_pad = n_stimuli - self.n_stimuli
+        self.query_count = np.pad(self.query_count, (0, n_pad))
+        self.reference_count = np.pad(self.reference_count, (0, n_pad))
+        self._pair_count.resize((n_stimuli, n_stimuli))
+        self.n_stimuli = n_stimuli
+
+    def update(self, stimulus_set):
+        """Add the statistics of a stimulus set.
+
+        Arguments:
+            stimulus_set: An integer matrix where the first column
+                indicates the query stimulus and the remaining columns
+                indicate the reference stimuli. Negative values are
+                treated as placeholders.
+                shape = (n_trial, max_n_reference + 1)
+
+        Returns:
+            self
+
+        """
+        stimulus_set = np.asarray(stimulus_set)
+        if stimulus_set.shape[0] == 0:
+            return self
+        self._resize(int(np.max(stimulus_set)) + 1)
+
+        query = stimulus_set[:, 0].astype(np.int64)
+        reference = stimulus_set[:, 1:]
+        is_present = np.greater_equal(reference, 0)
+        reference = reference[is_present].astype(np.int64)
+        query_pair = np.broadcast_to(
+            np.expand_dims(query, axis=1), is_present.shape
+        )[is_present]
+
+        self.query_count += np.bincount(query, minlength=self.n_stimuli)
+        self.reference_count += np.bincount(
+            reference, minlength=self.n_stimuli
+        )
+        self._pair_buffer.append((
+            query_pair, reference, np.ones(len(reference), dtype=np.int64)
+        ))
+        return self
+
+    def merge(self, coverage):
+        """Add the statistics of another StimulusCoverage object.
+
+        Arguments:
+            coverage: A StimulusCoverage object.
+
+        Returns:
+            self
+
+        """
+        self._resize(coverage.n_stimuli)
+        n_stimuli = coverage.n_stimuli
+        self.query_count[0:n_stimuli] += coverage.query_count
+        self.reference_count[0:n_stimuli] += coverage.reference_count
+        pair_count = coverage.pair_count.tocoo()
+        self._pair_buffer.append((
+            pair_count.row.astype(np.int64), pair_count.col.astype(np.int64),
+            pair_count.data
+        ))
+        return self
+
+    def copy(self):
+        """Return a copy of the statistics."""
+        coverage = StimulusCoverage(0)
+        return coverage.merge(self)
+
+    def r_priority(self, n_stimuli=None):
+        """Return a sparse reference priority matrix.
+
+        The priority of a pair decays with the number of times the
+        pair has co-occurred, i.e., element (i, j) is
+        `1 / (1 + pair_count[i, j])`. Only pairs that have co-occurred
+        are stored. The implicit elements of the sparse matrix indicate
+        pairs that have never co-occurred and have a priority of one,
+        i.e., pass `r_priority_fill=1.` to
+        `psiz.generators.ActiveRank.generate`.
+
+        Arguments:
+            n_stimuli (optional): Integer indicating the number of
+                stimuli. Must not be smaller than `n_stimuli` of the
+                statistics.
+
+        Returns:
+            r_priority: A sparse float matrix (CSR format).
+                shape = (n_stimuli, n_stimuli)
+
+        """
+        if n_stimuli is None:
+            n_stimuli = self.n_stimuli
+        r_priority = self.pair_count.astype(np.float32)
+        r_priority.data = 1. / (1. + r_priority.data)
+        r_priority.resize((n_stimuli, n_stimuli))
+        return r_priority
+
+
+def compact_dtype(max_value):
+    """Return the narrowest signed integer dtype for a range of values.
+
+    Arguments:
+        max_value: Integer indicating the largest value that must be
+            represented.
+
+    Returns:
+        dtype: One of np.int8, np.int16, or np.int32.
+
+    """
+    for dtype in (np.int8, np.int16):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int32
+
+
+def widen_dataset(ds):
+    """Widen compact integer inputs inside the graph.
+
+    Integer model inputs narrower than 32 bits (see
+    `SimilarityTrials.compact`) are cast to int32 by the input
+    pipeline, so that the host only holds the compact arrays.
+
+    Arguments:
+        ds: A tf.data.Dataset whose first component is a dictionary of
+            model inputs.
+
+    Returns:
+        ds: A tf.data.Dataset. If no inputs need to be widened, `ds`
+            is returned unchanged.
+
+    """
+    spec = ds.element_spec
+    if isinstance(spec, tuple):
+        spec = spec[0]
+    widen_keys = [
+        key for key, value in spec.items()
+        if value.dtype.is_integer and value.dtype.size < 4
+    ]
+    if not widen_keys:
+        return ds
+
+    def _map(x, *args):
+        """Cast compact inputs."""
+        x = dict(x)
+        for key in widen_keys:
+            x[key] = tf.cast(x[key], tf.int32)
+        if args:
+            return (x,) + args
+        return x
+
+    return ds.map(_map, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+
+def subset_configurations(config_idx, df_config, index):
+    """Determine the unique trial configurations of a subset of trials.
+
+    The configurations are derived by indexing into the configuration
+    table of the parent trials rather than re-deriving them from the
+    trial variables. The result is identical to calling
+    `unique_configurations` on the subset of trial variables.
+
+    Arguments:
+        config_idx: An integer array indicating the configuration of
+            each trial of the parent.
+            shape = (n_trial,)
+        df_config: A DataFrame containing the unique trial
+            configurations of the parent.
+        index: An integer (or Boolean) array indicating the subset of
+            trials.
+
+    Returns:
+        config_idx: An integer array indicating the configuration of
+            each trial of the subset.
+            shape = (n_trial_subset,)
+        df_config: A DataFrame containing the unique trial
+            configurations of the subset in order of first occurrence.
+        idx_source: An integer array indicating the parent
+            configuration of each subset configuration.
+            shape = (n_config_subset,)
+
+    """
+    config_idx = config_idx[index]
+    n_trial = len(config_idx)
+    n_config = len(df_config)
+
+    # Determine first occurrence of each configuration. Assignments are
+    # performed in reverse, so that the first occurrence prevails.
+    idx_first = np.full([n_config], n_trial)
+    idx_first[config_idx[::-1]] = np.arange(n_trial - 1, -1, -1)
+    idx_source = np.flatnonzero(idx_first < n_trial)
+    idx_source = idx_source[np.argsort(idx_first[idx_source])]
+
+    relabel = np.zeros([n_config], dtype=np.int32)
+    relabel[idx_source] = np.arange(len(idx_source), dtype=np.int32)
+    config_idx = relabel[config_idx]
+
+    df_config = df_config.iloc[idx_source].copy()
+    df_config.index = idx_first[idx_source]
+    return config_idx, df_config, idx_source
+
+
+def unique_configurations(d):
+    """Determine the unique trial configurations.
+
+    The configuration variables are packed into a single integer key
+    so that the unique configurations (and the configuration of every
+    trial) can be determined with a single call to `np.unique`. The
+    unique configurations are returned in order of first occurrence.
+
+    Arguments:
+        d: A dictionary of configuration variables. Each value is an
+            integer (or Boolean) array.
+            shape = (n_trial,)
+
+    Returns:
+        config_idx: An integer array indicating the configuration of
+            each trial.
+            shape = (n_trial,)
+        df_config: A DataFrame containing all the unique trial
+            configurations. The index of the DataFrame indicates the
+            first trial that exhibited the configuration.
+
+    """
+    columns = [np.asarray(v) for v in d.values()]
+    packed = _pack_columns(columns)
+    if packed is None:
+        # Fall back to row-wise uniqueness if the packed key would
+        # overflow.
+        packed = np.stack(columns, axis=1).astype(np.int64)
+        _, idx_first, config_idx = np.unique(
+            packed, axis=0, return_index=True, return_inverse=True
+        )
+    else:
+        _, idx_first, config_idx = np.unique(
+            packed, return_index=True, return_inverse=True
+        )
+    config_idx = np.reshape(config_idx, [-1])
+
+    # Re-label configurations in order of first occurrence.
+    idx_sort = np.argsort(idx_first)
+    relabel = np.empty(len(idx_first), dtype=np.int32)
+    relabel[idx_sort] = np.arange(len(idx_first), dtype=np.int32)
+    config_idx = relabel[config_idx]
+    idx_first = idx_first[idx_sort]
+
+    df_config = pd.DataFrame(
+        {k: v[idx_first] for k, v in zip(d.keys(), columns)},
+        index=idx_first
+    )
+    return config_idx, df_config
+
+
+def _pack_columns(columns):
+    """Pack integer columns into a single mixed-radix integer key.
+
+    Arguments:
+        columns: A list of integer (or Boolean) arrays.
+            shape = (n_trial,)
+
+    Returns:
+        packed: An int64 array of keys, or None if the key space does
+            not fit in an int64.
+
+    """
+    ii64 = np.iinfo(np.int64)
+    packed = np.zeros(len(columns[0]), dtype=np.int64)
+    n_key = 1
+    for col in columns:
+        col = col.astype(np.int64)
+        if len(col) == 0:
+            continue
+        col_min = np.min(col)
+        n_level = int(np.max(col) - col_min) + 1
+        n_key = n_key * n_level
+        if n_key > ii64.max:
+            return None
+        packed = packed * n_level + (col - col_min)
+    return packed
+
+
+def merge_configurations(df_config, df_config_new, offset):
+    """Merge the unique trial configurations of two sets of trials.
+
+    Only the (few) unique configurations are compared, so the cost
+    does not depend on the number of trials.
+
+    Arguments:
+        df_config: A DataFrame containing the unique trial
+            configurations of the first set of trials.
+        df_config_new: A DataFrame containing the unique trial
+            configurations of the second set of trials. Must have the
+            same columns as `df_config`.
+        offset: Integer indicating the number of trials in the first
+            set. Used to shift the index (i.e., first trial) of
+            configurations that only occur in the second set.
+
+    Returns:
+        df_config: A DataFrame containing the merged unique trial
+            configurations. Configurations that only occur in the
+            second set are appended.
+        config_map: An integer array mapping the configuration index
+            of the second set to the merged configuration index.
+            shape = (n_config_new,)
+        is_new: A Boolean array indicating the configurations of the
+            second set that did not occur in the first set.
+            shape = (n_config_new,)
+
+    """
+    columns = list(df_config.columns)
+    lookup = {
+        key: idx for idx, key in enumerate(
+            df_config.itertuples(index=False, name=None)
+        )
+    }
+    n_config = len(lookup)
+
+    config_map = np.empty(len(df_config_new), dtype=np.int32)
+    is_new = np.zeros(len(df_config_new), dtype=bool)
+    for idx, key in enumerate(
+            df_config_new[columns].itertuples(index=False, name=None)):
+        if key not in lookup:
+            lookup[key] = n_config
+            n_config += 1
+            is_new[idx] = True
+        config_map[idx] = lookup[key]
+
+    if np.any(is_new):
+        df_append = df_config_new[columns][is_new]
+        df_append.index = df_append.index + offset
+        df_config = pd.concat([df_config, df_append])
+    return df_config, config_map, is_new
+
+
+def stack_configurations(df_config_list, config_idx_list):
+    """Merge the unique trial configurations of multiple sets of trials.
+
+    The configurations are merged by comparing the (few) unique
+    configurations of each set, so the configuration index of the
+    stacked trials is obtained without re-deriving it from the trial
+    variables. The result is identical to calling
+    `unique_configurations` on the stacked trial variables.
+
+    Arguments:
+        df_config_list: A list of DataFrames containing the unique
+            trial configurations of each set of trials. All DataFrames
+            must have the same columns.
+        config_idx_list: A list of integer arrays indicating the
+            configuration of each trial in each set of trials.
+
+    Returns:
+        config_idx: An integer array indicating the configuration of
+            each stacked trial.
+            shape = (n_trial,)
+        df_config: A DataFrame containing the merged unique trial
+            configurations in order of first occurrence.
+        idx_source: An integer array indicating the set (first column)
+            and the configuration within that set (second column) from
+            which each merged configuration originates.
+            shape = (n_config, 2)
+
+    """
+    columns = list(df_config_list[0].columns)
+    n_trial = np.sum([len(config_idx) for config_idx in config_idx_list])
+    config_idx = np.empty([n_trial], dtype=np.int32)
+
+    lookup = {}
+    df_append_list = []
+    idx_source = []
+    offset = 0
+    for i_set, (df_config, config_idx_set) in enumerate(
+            zip(df_config_list, config_idx_list)):
+        config_map = np.empty(len(df_config), dtype=np.int32)
+        is_new = np.zeros(len(df_config), dtype=bool)
+        key_list = zip(*[df_config[column].tolist() for column in columns])
+        for idx, key in enumerate(key_list):
+            if key not in lookup:
+                lookup[key] = len(lookup)
+                is_new[idx] = True
+                idx_source.append((i_set, idx))
+            config_map[idx] = lookup[key]
+
+        if np.any(is_new):
+            df_append = df_config[columns][is_new]
+            df_append.index = df_append.index + offset
+            df_append_list.append(df_append)
+
+        n_trial_set = len(config_idx_set)
+        config_idx[offset:offset + n_trial_set] = config_map[config_idx_set]
+        offset += n_trial_set
+
+    df_config = pd.concat(df_append_list)
+    idx_source = np.array(idx_source, dtype=np.int32)
+    return config_idx, df_config, idx_source
+
+
+def stack_stimulus_set(stimulus_set_list, n_column):
+    """Stack and pad multiple stimulus sets.
+
+    The output is allocated once and filled in place, so the cost is
+    linear in the total number of trials.
+
+    Arguments:
+        stimulus_set_list: A list of 2D integer arrays.
+        n_column: Integer indicating the number of columns of the
+            stacked array. Missing columns are filled with the
+            placeholder value -1.
+
+    Returns:
+        stimulus_set: The stacked stimulus set.
+            shape = (n_trial, n_column)
+
+    """
+    n_trial = np.sum([len(stimulus_set) for stimulus_set in stimulus_set_list])
+    dtype = np.result_type(
+        *[stimulus_set.dtype for stimulus_set in stimulus_set_list]
+    )
+    stimulus_set = np.full([n_trial, n_column], -1, dtype=dtype)
+    start = 0
+    for i_stimulus_set in stimulus_set_list:
+        stop = start + i_stimulus_set.shape[0]
+        stimulus_set[start:stop, 0:i_stimulus_set.shape[1]] = i_stimulus_set
+        start = stop
+    return stimulus_set
+
+
+def save_column(
+        f, name, data, compression=None, chunked=False, fillvalue=None):
+    """Save a trial variable to an HDF5 file.
+
+    Arguments:
+        f: An open (writable) h5py.File object.
+        name: String indicating the name of the dataset.
+        data: An array where the first axis indexes trials.
+        compression (optional): String indicating an HDF5 compression
+            filter (e.g., 'gzip' or 'lzf'). If provided, the dataset is
+            chunked along the trial axis and compressed. If None, the
+            dataset is stored contiguously, which allows it to be
+            memory-mapped when loaded.
+        chunked (optional): Boolean indicating if the dataset should
+            be chunked even if it is not compressed.
+        fillvalue (optional): The value of unwritten elements, e.g.,
+            elements added by `append_column`.
+
+    Notes:
+        Chunked datasets are resizable and can therefore be grown in
+        place using `append_column`.
+
+    """
+    data = np.asarray(data)
+    if compression is None and not chunked:
+        f.create_dataset(name, data=data, fillvalue=fillvalue)
+    else:
+        chunks = (max(1, min(data.shape[0], CHUNK_SIZE)),) + data.shape[1:]
+        chunks = tuple(max(1, n) for n in chunks)
+        f.create_dataset(
+            name, data=data, chunks=chunks, compression=compression,
+            shuffle=compression is not None, fillvalue=fillvalue,
+            maxshape=(None,) * data.ndim
+        )
+
+
+def append_column(f, name, data):
+    """Append trials to a trial variable of an HDF5 file.
+
+    The dataset is resized in place, so the cost is proportional to
+    the number of appended trials. If the appended data has more
+    columns than the dataset, the dataset is widened and the new
+    elements of existing trials assume the fill value of the dataset.
+
+    Arguments:
+        f: An open (writable) h5py.File object.
+        name: String indicating the name of the dataset.
+        data: An array where the first axis indexes trials.
+
+    Raises:
+        ValueError: If the dataset is not resizable.
+
+    """
+    data = np.asarray(data)
+    dset = f[name]
+    if dset.chunks is None:
+        raise ValueError((
+            "The dataset '{0}' cannot be appended to because it is not "
+            "chunked. Save the trials with `append=True` or with "
+            "`compression` to create an appendable file.").format(name)
+        )
+    n_old = dset.shape[0]
+    shape = (n_old + data.shape[0],) + tuple(
+        max(n_dset, n_data) for n_dset, n_data in zip(
+            dset.shape[1:], data.shape[1:]
+        )
+    )
+    dset.resize(shape)
+    idx = (slice(n_old, shape[0]),) + tuple(
+        slice(0, n_data) for n_data in data.shape[1:]
+    )
+    dset[idx] = data
+
+
+def load_column(f, name, index=None, mmap_mode=None):
+    """Load a trial variable from an HDF5 file.
+
+    Arguments:
+        f: An open h5py.File object.
+        name: String indicating the name of the dataset.
+        index (optional): An integer (or Boolean) array indicating the
+            subset of trials to load. If None, all trials are loaded.
+        mmap_mode (optional): Either 'r' (read-only) or 'c'
+            (copy-on-write). If not None, a contiguous (uncompressed)
+            dataset is memory-mapped (see `numpy.memmap`) instead of
+            being read into memory. Compressed or chunked datasets are
+            silently read into memory. Modes that write to the file
+            are not supported, since the file is also opened by h5py.
+
+    Returns:
+        data: An array (or memory-mapped array) of the requested
+            trials.
+
+    Raises:
+        ValueError: If `mmap_mode` is not None, 'r' or 'c'.
+
+    """
+    check_mmap_mode(mmap_mode)
+    dset = f[name]
+    if mmap_mode is not None and dset.chunks is None:
+        offset = dset.id.get_offset()
+        if offset is not None:
+            data = np.memmap(
+                f.filename, mode=mmap_mode, dtype=dset.dtype,
+                shape=dset.shape, offset=offset
+            )
+            if index is not None:
+                data = data[index]
+            return data
+
+    if index is None:
+        return dset[()]
+    return _load_rows(dset, index)
+
+
+def check_mmap_mode(mmap_mode):
+    """Check the argument `mmap_mode`.
+
+    Arguments:
+        mmap_mode: None, 'r' or 'c'.
+
+    Raises:
+        ValueError: If `mmap_mode` is not valid.
+
+    """
+    if mmap_mode not in (None, 'r', 'c'):
+        raise ValueError(
+            "The argument `mmap_mode` must be None, 'r' or 'c'. Received "
+            "{0!r}.".format(mmap_mode)
+        )
+
+
+def _load_rows(dset, index):
+    """Load a subset of rows from an HDF5 dataset.
+
+    The requested rows are read one block of trials at a time, so only
+    the blocks (i.e., chunks) containing requested rows are read from
+    disk.
+
+    Arguments:
+        dset: An h5py.Dataset object.
+        index: An integer (or Boolean) array of rows.
+
+    Returns:
+        data: An array of the requested rows (in the requested order).
+
+    """
+    index = np.asarray(index)
+    if index.dtype == bool:
+        index = np.flatnonzero(index)
+    index = np.where(index < 0, index + dset.shape[0], index)
+
+    if dset.chunks is None:
+        block_size = CHUNK_SIZE
+    else:
+        block_size = dset.chunks[0]
+
+    data = np.empty((len(index),) + dset.shape[1:], dtype=dset.dtype)
+    order = np.argsort(index, kind='stable')
+    index_sorted = index[order]
+    block_id = index_sorted // block_size
+    split_locs = np.flatnonzero(np.diff(block_id)) + 1
+    for locs in np.split(np.arange(len(index)), split_locs):
+        if len(locs) == 0:
+            continue
+        start = block_id[locs[0]] * block_size
+        block = dset[start:start + block_size]
+        data[order[locs]] = block[index_sorted[locs] - start]
+    return data
+
+
+def chunked_dataset(get_chunk, n_trial, chunk_size):
+    """Return a dataset that streams chunks of trials.
+
+    Chunks are only materialized when requested by the input pipeline.
+    Multiple chunks are prepared in parallel and prefetched, while
+    preserving the order of the trials. In combination with
+    memory-mapped trial variables (see `load_column`), this allows
+    iterating over data sets that do not fit in memory.
+
+    Arguments:
+        get_chunk: A callable that accepts the start and stop index
+            of a chunk of trials and returns a (nested) structure of
+            NumPy arrays where the first axis indexes trials.
+        n_trial: Integer indicating the total number of trials.
+        chunk_size: Integer indicating the number of trials per chunk.
+
+    Returns:
+        ds: A tf.data.Dataset where each element is a chunk of (at
+            most) `chunk_size` trials. Use `unbatch` to obtain a
+            dataset of trials.
+
+    """
+    n_chunk = int(np.ceil(n_trial / chunk_size))
+
+    # Infer the structure of the chunks.
+    example = get_chunk(0, min(chunk_size, n_trial))
+    output_types = tf.nest.map_structure(
+        lambda a: tf.as_dtype(a.dtype), example
+    )
+    output_shapes = tf.nest.map_structure(
+        lambda a: tf.TensorShape((None,) + a.shape[1:]), example
+    )
+
+    def _generator(i_chunk):
+        start = i_chunk * chunk_size
+        yield get_chunk(start, min(start + chunk_size, n_trial))
+
+    def _chunk_dataset(i_chunk):
+        return tf.data.Dataset.from_generator(
+            _generator, output_types=output_types,
+            output_shapes=output_shapes, args=(i_chunk,)
+        )
+
+    ds = tf.data.Dataset.range(n_chunk).interleave(
+        _chunk_dataset, cycle_length=tf.data.experimental.AUTOTUNE,
+        num_parallel_calls=tf.data.experimental.AUTOTUNE,
+        deterministic=True
+    )
+    return ds.prefetch(tf.data.experimental.AUTOTUNE)
+
+
+def cache_dataset(ds, cache, suffix=None):
+    """Cache the elements of a dataset in memory or on disk.
+
+    The elements are materialized during the first complete iteration
+    and read from the cache on every subsequent iteration (e.g., later
+    epochs and restarts). Caching should precede shuffling, otherwise
+    the order of the first iteration is frozen.
+
+    Arguments:
+        ds: A tf.data.Dataset.
+        cache: If True, the elements are cached in memory. If a
+            string, the elements are cached in files that use the
+            string as a filename prefix. If None or False, the
+            dataset is not cached.
+        suffix (optional): A string appended to the filename prefix.
+            Use distinct suffixes when caching multiple datasets with
+            the same `cache` argument.
+
+    Returns:
+        ds: A tf.data.Dataset.
+
+    """
+    if cache is None or cache is False:
+        return ds
+    if cache is True:
+        return ds.cache()
+    filename = str(cache)
+    if suffix is not None:
+        filename = filename + suffix
+    return ds.cache(filename=filename)
+
+
+def compress_trials(key_list, weight):
+    """Determine the unique trials and aggregate their weights.
+
+    Arguments:
+        key_list: A list of arrays that jointly identify a trial. The
+            first axis of every array indexes trials.
+        weight: A float array indicating the weight of each trial.
+            shape=(n_trial,)
+
+    Returns:
+        idx_unique: An integer array indicating the first occurrence
+            of every unique trial, in order of first occurrence.
+            shape=(n_unique,)
+        inverse: An integer array indicating the unique trial of every
+            trial.
+            shape=(n_trial,)
+        weight_unique: The summed weight of every unique trial.
+            shape=(n_unique,)
+
+    """
+    n_trial = len(weight)
+    key = np.hstack([
+        np.reshape(k, [n_trial, -1]).astype(np.float64) for k in key_list
+    ])
+    _, idx_first, inverse = np.unique(
+        key, axis=0, return_index=True, return_inverse=True
+    )
+    inverse = np.reshape(inverse, [-1])
+
+    # Relabel unique trials by order of first occurrence.
+    order = np.argsort(idx_first)
+    relabel = np.empty_like(order)
+    relabel[order] = np.arange(len(order))
+    idx_unique = idx_first[order]
+    inverse = relabel[inverse].astype(np.int32)
+
+    weight_unique = np.bincount(
+        inverse, weights=weight, minlength=len(idx_unique)
+    )
+    return idx_unique, inverse, weight_unique
+
+
+def expand_weight(weight, index):
+    """Split the weight of compressed trials among their copies.
+
+    Arguments:
+        weight: A float array indicating the weight of each
+            compressed trial.
+            shape=(n_unique,)
+        index: An integer array indicating the compressed trial of
+            every expanded trial.
+            shape=(n_trial,)
+
+    Returns:
+        weight: The weight of every expanded trial. The weights of the
+            copies of a compressed trial sum to its weight.
+            shape=(n_trial,)
+
+    """
+    count = np.bincount(index, minlength=len(weight))
+    return weight[index] / count[index]
+
+
+def import_pyarrow():
+    """Import the optional pyarrow dependency.
+
+    Returns:
+        pa: The pyarrow module (with the `parquet` submodule loaded).
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Arrow and Parquet support requires the optional dependency "
+            "'pyarrow'. Install it using `pip install psiz[arrow]`."
+        ) from e
+    return pa
+
+
+def arrow_table(trial_type, column_list):
+    """Return trial variables as a pyarrow.Table.
+
+    The NumPy buffers of numeric trial variables are wrapped rather
+    than copied. Boolean trial variables (e.g., `is_ranked`) are the
+    exception and are copied, since Arrow stores Booleans bit-packed.
+    Two-dimensional trial variables (e.g., the stimulus set) are stored
+    as fixed-size lists.
+
+    Arguments:
+        trial_type: String indicating the class of the trials. The
+            string is stored in the schema metadata.
+        column_list: A list of (name, data) pairs where the first axis
+            of `data` indexes trials.
+
+    Returns:
+        table: A pyarrow.Table.
+
+    """
+    pa = import_pyarrow()
+    name_list = []
+    array_list = []
+    for name, data in column_list:
+        data = np.ascontiguousarray(data)
+        if data.ndim == 2:
+            array = pa.FixedSizeListArray.from_arrays(
+                pa.array(np.reshape(data, [-1])), data.shape[1]
+            )
+        else:
+            array = pa.array(data)
+        name_list.append(name)
+        array_list.append(array)
+    return pa.Table.from_arrays(
+        array_list, names=name_list, metadata={'trial_type': trial_type}
+    )
+
+
+def arrow_columns(table):
+    """Return the trial variables of a pyarrow.Table.
+
+    Numeric columns without nulls are converted to NumPy without
+    copying if the column consists of a single chunk. Boolean columns
+    are always copied (unpacked). Fixed-size list
+    columns are reshaped into two-dimensional arrays. Variable-length
+    list columns (e.g., stimulus sets emitted by a collection backend)
+    are padded with the placeholder `-1`.
+
+    Arguments:
+        table: A pyarrow.Table (or pyarrow.RecordBatch).
+
+    Returns:
+        columns: A dictionary of NumPy arrays.
+
+    """
+    pa = import_pyarrow()
+    columns = {}
+    for name in table.column_names:
+        array = table.column(name)
+        if isinstance(array, pa.ChunkedArray):
+            if array.num_chunks == 1:
+                array = array.chunk(0)
+            else:
+                array = array.combine_chunks()
+        if pa.types.is_fixed_size_list(array.type):
+            values = array.flatten().to_numpy(zero_copy_only=False)
+            data = np.reshape(values, [len(array), array.type.list_size])
+        elif pa.types.is_list(array.type) or pa.types.is_large_list(
+                array.type):
+            values = array.flatten().to_numpy(zero_copy_only=False)
+            n_value = np.asarray(
+                array.value_lengths().fill_null(0).to_numpy(
+                    zero_copy_only=False
+                )
+            )
+            n_column = int(np.max(n_value)) if len(n_value) > 0 else 0
+            data = -np.ones([len(array), n_column], dtype=values.dtype)
+            data[np.arange(n_column) < np.expand_dims(n_value, 1)] = values
+        else:
+            data = array.to_numpy(zero_copy_only=False)
+        columns[name] = data
+    return columns
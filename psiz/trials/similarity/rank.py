@@ -26,18 +26,37 @@ Classes:
 """
 
 from abc import ABCMeta, abstractmethod
-from itertools import permutations
+from itertools import chain, combinations, permutations
 import copy
+import functools
+import os
 import warnings
 
 import h5py
 import numpy as np
-import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import backend as K
 
+from psiz.trials.similarity.base import CHUNK_SIZE
 from psiz.trials.similarity.base import SimilarityTrials
-from psiz.utils import pad_2d_array
+from psiz.trials.similarity.base import StimulusCoverage
+from psiz.trials.similarity.base import SubsetView
+from psiz.trials.similarity.base import append_column
+from psiz.trials.similarity.base import arrow_columns
+from psiz.trials.similarity.base import arrow_table
+from psiz.trials.similarity.base import cache_dataset
+from psiz.trials.similarity.base import compact_dtype
+from psiz.trials.similarity.base import compress_trials
+from psiz.trials.similarity.base import chunked_dataset
+from psiz.trials.similarity.base import expand_weight
+from psiz.trials.similarity.base import load_column
+from psiz.trials.similarity.base import merge_configurations
+from psiz.trials.similarity.base import save_column
+from psiz.trials.similarity.base import stack_configurations
+from psiz.trials.similarity.base import stack_stimulus_set
+from psiz.trials.similarity.base import subset_configurations
+from psiz.trials.similarity.base import unique_configurations
+from psiz.trials.similarity.base import widen_dataset
 
 
 class RankTrials(SimilarityTrials, metaclass=ABCMeta):
@@ -87,6 +106,53 @@ class RankTrials(SimilarityTrials, metaclass=ABCMeta):
             is_ranked = self._check_is_ranked(is_ranked)
         self.is_ranked = is_ranked
 
+    def _init_trusted(self, stimulus_set, n_select=None, is_ranked=None):
+        """Initialize from trial variables that are known to be valid.
+
+        Counterpart of `__init__` that skips all checks. See
+        `from_arrays`.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+            n_select (optional): See `__init__`.
+            is_ranked (optional): See `__init__`.
+
+        """
+        SimilarityTrials._init_trusted(self, stimulus_set)
+
+        self.n_reference = self._infer_n_reference(self.stimulus_set)
+        self.max_n_reference = np.amax(self.n_reference)
+        self.stimulus_set = self.stimulus_set[:, 0:self.max_n_reference+1]
+
+        if n_select is None:
+            n_select = np.ones((self.n_trial), dtype=np.int32)
+        self.n_select = np.asarray(n_select)
+
+        if is_ranked is None:
+            is_ranked = np.full((self.n_trial), True)
+        self.is_ranked = np.asarray(is_ranked)
+
+    def _set_known_configuration(
+            self, config_idx, config_list, outcome_idx_list=None):
+        """Set configuration data that is known to be valid.
+
+        Arguments:
+            config_idx: An integer array indicating the configuration
+                of each trial.
+                shape = (n_trial,)
+            config_list: A DataFrame of the unique configurations.
+            outcome_idx_list (optional): A list of the possible
+                outcomes for each configuration. If None, the outcomes
+                are derived from `config_list`.
+
+        """
+        if outcome_idx_list is None:
+            config_list = config_list.copy()
+            outcome_idx_list = _config_outcomes(config_list)
+        self.config_idx = np.asarray(config_idx)
+        self.config_list = config_list
+        self.outcome_idx_list = outcome_idx_list
+
     def _infer_n_reference(self, stimulus_set):
         """Return the number of references in each trial.
 
@@ -159,21 +225,15 @@ class RankTrials(SimilarityTrials, metaclass=ABCMeta):
         """
         if not (is_ranked.shape[0] == self.n_trial):
             raise ValueError((
-                "The argument `n_select` must have the same length as the "
+                "The argument `is_ranked` must have the same length as the "
                 "number of rows in the argument 'stimulus_set'."))
-        bad_locs = np.not_equal(is_ranked, True)
-        n_bad = np.sum(bad_locs)
-        if n_bad != 0:
-            raise ValueError((
-                "The unranked version is not implemented, Found {0} bad "
-                "trial(s).").format(n_bad))
-        return is_ranked
+        return is_ranked.astype(bool)
 
     def is_select(self, compress=False):
         """Indicate if a stimulus was selected.
 
         This method has two modes that return 2D arrays of different
-        shapes.
+        shapes. The (read-only) array is computed once and cached.
 
         Returns:
             is_select: A 2D Boolean array indicating the stimuli that
@@ -190,58 +250,123 @@ class RankTrials(SimilarityTrials, metaclass=ABCMeta):
                 implies the maximum number of selected references.
 
         """
-        is_select = np.zeros(self.stimulus_set.shape, dtype=bool)
-        max_n_select = np.max(self.n_select)
-        for n_select in range(1, max_n_select + 1):
-            locs = np.less_equal(n_select, self.n_select)
-            is_select[locs, n_select] = True
+        is_select = self._cached(
+            'is_select', lambda: _select_mask(
+                self.n_select, self.stimulus_set.shape[1]
+            )
+        )
 
         if compress:
+            max_n_select = np.max(self.n_select)
             is_select = is_select[:, 1:max_n_select + 1]
 
         return is_select
 
-    def all_outcomes(self):
-        """Inflate stimulus set for all possible outcomes."""
-        outcome_idx_list = self.outcome_idx_list
+    def compact(self, n_stimuli=None):
+        """Convert trial variables to compact dtypes (in place).
+
+        Extends `SimilarityTrials.compact`. The number of references
+        and selections are stored using the narrowest dtype that
+        accommodates `max_n_reference`. Selection masks (see
+        `is_select`) are derived from `n_select` and never stored.
+
+        Arguments:
+            n_stimuli (optional): See SimilarityTrials.
+
+        Returns:
+            self
+
+        """
+        SimilarityTrials.compact(self, n_stimuli)
+        dtype = compact_dtype(self.max_n_reference)
+        self.n_reference = self.n_reference.astype(dtype, copy=False)
+        self.n_select = self.n_select.astype(dtype, copy=False)
+        return self
+
+    def coverage(self):
+        """Return the coverage statistics of the stimuli.
+
+        The statistics are computed on first use and then maintained
+        incrementally by `RankObservations.append` and `stack`.
+
+        Returns:
+            coverage: A StimulusCoverage object indicating how often
+                each stimulus served as a query or reference and how
+                often each (query, reference) pair co-occurred.
+
+        """
+        coverage = self.__dict__.get('_coverage')
+        if coverage is None:
+            coverage = StimulusCoverage().update(self.stimulus_set)
+            self._coverage = coverage
+        return coverage
+
+    def outcome_table(self):
+        """Return the outcome permutations of every configuration.
+
+        Each configuration's possible outcomes are expressed as column
+        indices into a trial's stimulus set. An additional placeholder
+        column (index `max_n_reference + 1`) is assumed to follow the
+        last column of the stimulus set and is used to fill in
+        non-existent outcomes of configurations with fewer outcomes
+        than `max_n_outcome`.
+
+        Returns:
+            outcome_table: An integer array of column indices. The
+                (read-only) array is computed once and cached.
+                shape=(n_config, max_n_reference + 1, max_n_outcome)
+
+        """
+        return self._cached('outcome_table', self._outcome_table)
+
+    def _outcome_table(self):
+        """Compute the outcome permutations of every configuration."""
         n_outcome_list = self.config_list['n_outcome'].values
         max_n_outcome = np.max(n_outcome_list)
         n_config = self.config_list.shape[0]
+        placeholder_idx = self.max_n_reference + 1
 
-        stimulus_set_expand = -1 * np.ones(
-            [self.n_trial, self.max_n_reference + 1, max_n_outcome],
-            dtype=np.int32
+        outcome_table = np.full(
+            [n_config, self.max_n_reference + 1, max_n_outcome],
+            placeholder_idx, dtype=np.int32
         )
-        for i_config in range(n_config):
-            # Identify relevant trials.
-            trial_locs = self.config_idx == i_config
-            n_trial_config = np.sum(trial_locs)
-
-            config = self.config_list.iloc[i_config]
-            n_reference = config['n_reference']
-            outcome_idx = outcome_idx_list[i_config]
-            n_outcome = outcome_idx.shape[0]
-            # Add query index, increment references to accommodate query.
-            stimulus_set_idx = np.hstack(
-                [np.zeros([n_outcome, 1], dtype=int), outcome_idx + 1]
+        for i_config, outcome_idx in enumerate(self.outcome_idx_list):
+            n_outcome, n_reference = outcome_idx.shape
+            # Query index.
+            outcome_table[i_config, 0, 0:n_outcome] = 0
+            # Increment references to accommodate query.
+            outcome_table[i_config, 1:n_reference + 1, 0:n_outcome] = (
+                np.transpose(outcome_idx) + 1
             )
-            curr_stimulus_set_copy = self.stimulus_set[trial_locs, :]
-            curr_stimulus_set_expand = -1 * np.ones(
-                [n_trial_config, self.max_n_reference + 1, max_n_outcome],
-                dtype=int
+            # Placeholder references keep their position.
+            outcome_table[i_config, n_reference + 1:, 0:n_outcome] = (
+                np.expand_dims(
+                    np.arange(n_reference + 1, self.max_n_reference + 1),
+                    axis=1
+                )
             )
-            for i_outcome in range(n_outcome):
-                curr_stimulus_set_idx = stimulus_set_idx[i_outcome, :]
-                # Append placeholder indices.
-                curr_idx = np.hstack([
-                    curr_stimulus_set_idx,
-                    np.arange(
-                        np.max(curr_stimulus_set_idx) + 1,
-                        self.max_n_reference + 1
-                    )
-                ])
-                curr_stimulus_set_expand[:, :, i_outcome] = curr_stimulus_set_copy[:, curr_idx]
-            stimulus_set_expand[trial_locs] = curr_stimulus_set_expand
+        return outcome_table
+
+    def all_outcomes(self):
+        """Inflate stimulus set for all possible outcomes.
+
+        Returns:
+            stimulus_set_expand: The stimulus set of every possible
+                outcome. Non-existent outcomes are filled with the
+                placeholder value -1.
+                shape=(n_trial, max_n_reference + 1, max_n_outcome)
+
+        """
+        outcome_table = self.outcome_table()
+        # Append placeholder column referenced by non-existent outcomes.
+        stimulus_set = np.hstack([
+            self.stimulus_set,
+            -1 * np.ones([self.n_trial, 1], dtype=np.int32)
+        ])
+        idx_trial = np.arange(self.n_trial)[:, np.newaxis, np.newaxis]
+        stimulus_set_expand = stimulus_set[
+            idx_trial, outcome_table[self.config_idx]
+        ]
         return stimulus_set_expand
 
     @classmethod
@@ -249,7 +374,10 @@ class RankTrials(SimilarityTrials, metaclass=ABCMeta):
         """Return a RankTrials object containing all trials.
 
         The stimulus_set of each SimilarityTrials object is padded first to
-        match the maximum number of references of all the objects.
+        match the maximum number of references of all the objects. The
+        stacked arrays are allocated once and the configurations of
+        each object are merged, so the cost is linear in the total
+        number of trials.
 
         Arguments:
             trials_list: A tuple of RankTrials objects to be stacked.
@@ -261,51 +389,54 @@ class RankTrials(SimilarityTrials, metaclass=ABCMeta):
         # TODO remove any occurence of None from trials_list
 
         # Determine the maximum number of references.
-        max_n_reference = 0
-        for i_trials in trials_list:
-            if i_trials.max_n_reference > max_n_reference:
-                max_n_reference = i_trials.max_n_reference
-
-        # Grab relevant information from first entry in list.
-        stimulus_set = pad_2d_array(
-            trials_list[0].stimulus_set, max_n_reference + 1
-        )
-        n_select = trials_list[0].n_select
-        is_ranked = trials_list[0].is_ranked
-        is_judged = True
-        try:
-            group_id = trials_list[0].group_id
-            agent_id = trials_list[0].agent_id
-            session_id = trials_list[0].session_id
-            weight = trials_list[0].weight
-            rt_ms = trials_list[0].rt_ms
-        except AttributeError:
-            is_judged = False
-
-        for i_trials in trials_list[1:]:
-            stimulus_set = np.vstack((
-                stimulus_set,
-                pad_2d_array(i_trials.stimulus_set, max_n_reference + 1)
-            ))
-            n_select = np.hstack((n_select, i_trials.n_select))
-            is_ranked = np.hstack((is_ranked, i_trials.is_ranked))
-            if is_judged:
-                group_id = np.hstack((group_id, i_trials.group_id))
-                agent_id = np.hstack((agent_id, i_trials.agent_id))
-                session_id = np.hstack((session_id, i_trials.session_id))
-                weight = np.hstack((weight, i_trials.weight))
-                rt_ms = np.hstack((rt_ms, i_trials.rt_ms))
-
+        max_n_reference = np.amax([
+            i_trials.max_n_reference for i_trials in trials_list
+        ])
+        is_judged = isinstance(trials_list[0], RankObservations)
         if is_judged:
-            trials_stacked = RankObservations(
-                stimulus_set, n_select=n_select, is_ranked=is_ranked,
-                group_id=group_id, agent_id=agent_id, session_id=session_id,
-                weight=weight, rt_ms=rt_ms
-            )
+            trials_stacked = RankObservations.__new__(RankObservations)
+            var_list = [
+                'n_reference', 'n_select', 'is_ranked', 'group_id',
+                'agent_id', 'session_id', 'weight', 'rt_ms'
+            ]
         else:
-            trials_stacked = RankDocket(
-                stimulus_set, n_select, is_ranked
-            )
+            trials_stacked = RankDocket.__new__(RankDocket)
+            var_list = ['n_reference', 'n_select', 'is_ranked']
+
+        # Fill preallocated arrays once. The variables of each object
+        # have already been validated, so the constructor is bypassed.
+        trials_stacked.stimulus_set = stack_stimulus_set(
+            [i_trials.stimulus_set for i_trials in trials_list],
+            max_n_reference + 1
+        )
+        trials_stacked.n_trial = trials_stacked.stimulus_set.shape[0]
+        trials_stacked.max_n_reference = max_n_reference
+        for var_name in var_list:
+            setattr(trials_stacked, var_name, np.concatenate([
+                getattr(i_trials, var_name) for i_trials in trials_list
+            ]))
+
+        # Merge configurations of each object.
+        config_idx, config_list, idx_source = stack_configurations(
+            [i_trials.config_list for i_trials in trials_list],
+            [i_trials.config_idx for i_trials in trials_list]
+        )
+        trials_stacked.config_idx = config_idx
+        trials_stacked.config_list = config_list
+        trials_stacked.outcome_idx_list = [
+            trials_list[i_set].outcome_idx_list[i_config]
+            for i_set, i_config in idx_source
+        ]
+
+        # Merge coverage statistics if every object maintains them.
+        coverage_list = [
+            i_trials.__dict__.get('_coverage') for i_trials in trials_list
+        ]
+        if all(coverage is not None for coverage in coverage_list):
+            coverage = coverage_list[0].copy()
+            for i_coverage in coverage_list[1:]:
+                coverage.merge(i_coverage)
+            trials_stacked._coverage = coverage
         return trials_stacked
 
 
@@ -360,6 +491,11 @@ class RankDocket(RankTrials):
     Methods:
         save: Save the Docket object to disk.
         subset: Return a subset of unjudged trials given an index.
+        coverage: Return the coverage statistics of the stimuli.
+        compact: Convert trial variables to compact dtypes.
+        to_arrow: Return the trials as a pyarrow.Table.
+        from_arrow: Create trials from a pyarrow.Table.
+        from_arrays: Create trials from trial arrays.
 
     """
 
@@ -390,11 +526,64 @@ class RankDocket(RankTrials):
             A new RankDocket object.
 
         """
-        return RankDocket(
-            self.stimulus_set[index, :], self.n_select[index],
-            self.is_ranked[index]
+        config_idx, config_list, idx_source = subset_configurations(
+            self.config_idx, self.config_list, index
+        )
+        return RankDocket.from_arrays(
+            self.stimulus_set[index, :], n_select=self.n_select[index],
+            is_ranked=self.is_ranked[index], config_idx=config_idx,
+            config_list=config_list, outcome_idx_list=[
+                self.outcome_idx_list[i_config] for i_config in idx_source
+            ]
         )
 
+    @classmethod
+    def from_arrays(
+            cls, stimulus_set, n_select=None, is_ranked=None,
+            config_idx=None, config_list=None, outcome_idx_list=None,
+            validate=False):
+        """Create trials from trial arrays.
+
+        Unlike the constructor, the arrays are not validated (unless
+        requested) and known configuration data is reused. Use this
+        method for trials that are valid by construction, e.g., trials
+        derived from existing trials.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+            n_select (optional): See `__init__`.
+            is_ranked (optional): See `__init__`.
+            config_idx (optional): An integer array indicating the
+                known configuration of each trial. If provided,
+                `config_list` must also be provided.
+                shape = (n_trial,)
+            config_list (optional): A DataFrame of the known unique
+                configurations.
+            outcome_idx_list (optional): A list of the possible
+                outcomes of each configuration. If None, the outcomes
+                are derived from `config_list`.
+            validate (optional): Boolean indicating if the arrays
+                should be validated. If True, the regular constructor
+                is used and the configuration data is re-derived.
+
+        Returns:
+            A new RankDocket object.
+
+        """
+        if validate:
+            return cls(stimulus_set, n_select=n_select, is_ranked=is_ranked)
+        trials = cls.__new__(cls)
+        trials._init_trusted(stimulus_set, n_select, is_ranked)
+        if config_idx is None:
+            trials._set_configuration_data(
+                trials.n_reference, trials.n_select, trials.is_ranked
+            )
+        else:
+            trials._set_known_configuration(
+                config_idx, config_list, outcome_idx_list
+            )
+        return trials
+
     def _set_configuration_data(self, n_reference, n_select, is_ranked):
         """Generate a unique ID for each trial configuration.
 
@@ -422,55 +611,80 @@ class RankDocket(RankTrials):
                 trial configuration.
 
         """
-        n_trial = len(n_reference)
-
         # Determine unique display configurations.
-        n_outcome_placeholder = np.zeros(n_select.shape[0], dtype=np.int32)
         d = {
             'n_reference': n_reference, 'n_select': n_select,
-            'is_ranked': is_ranked, 'n_outcome': n_outcome_placeholder
-            }
-        df_config = pd.DataFrame(d)
-        df_config = df_config.drop_duplicates()
-        n_config = len(df_config)
-        n_out_idx = df_config.columns.get_loc("n_outcome")
-
-        # Assign display configuration ID for every observation.
-        config_idx = np.empty(n_trial, dtype=np.int32)
-        outcome_idx_list = []
-        for i_config in range(n_config):
-            # Determine number of possible outcomes for configuration.
-            outcome_idx = _possible_rank_outcomes(df_config.iloc[i_config])
-            outcome_idx_list.append(outcome_idx)
-            n_outcome = outcome_idx.shape[0]
-            df_config.iloc[i_config, n_out_idx] = n_outcome
-            # Find trials matching configuration.
-            a = (n_reference == df_config['n_reference'].iloc[i_config])
-            b = (n_select == df_config['n_select'].iloc[i_config])
-            c = (is_ranked == df_config['is_ranked'].iloc[i_config])
-            f = np.array((a, b, c))
-            display_type_locs = np.all(f, axis=0)
-            config_idx[display_type_locs] = i_config
+            'is_ranked': is_ranked
+        }
+        config_idx, df_config = unique_configurations(d)
+        outcome_idx_list = _config_outcomes(df_config)
 
         self.config_idx = config_idx
         self.config_list = df_config
         self.outcome_idx_list = outcome_idx_list
 
-    def save(self, filepath):
+    def save(self, filepath, compression=None):
         """Save the RankDocket object as an HDF5 file.
 
         Arguments:
             filepath: String specifying the path to save the data.
+            compression (optional): String indicating an HDF5
+                compression filter (e.g., 'gzip' or 'lzf'). If
+                provided, the data is chunked along the trial axis and
+                compressed. If None, the data is stored contiguously,
+                which allows it to be memory-mapped when loaded.
 
         """
         f = h5py.File(filepath, "w")
         f.create_dataset("trial_type", data="RankDocket")
-        f.create_dataset("stimulus_set", data=self.stimulus_set)
-        f.create_dataset("n_select", data=self.n_select)
-        f.create_dataset("is_ranked", data=self.is_ranked)
+        save_column(f, "stimulus_set", self.stimulus_set, compression)
+        save_column(f, "n_select", self.n_select, compression)
+        save_column(f, "is_ranked", self.is_ranked, compression)
         f.close()
 
-    def as_dataset(self, group, all_outcomes=True):
+    def to_arrow(self):
+        """Return the trials as a pyarrow.Table.
+
+        Requires the optional dependency `pyarrow`. Numeric trial
+        variables are not copied, with the exception of the Boolean
+        `is_ranked`, which Arrow stores bit-packed. See `save_parquet`.
+
+        Returns:
+            table: A pyarrow.Table.
+
+        """
+        return arrow_table("RankDocket", [
+            ("stimulus_set", self.stimulus_set),
+            ("n_select", self.n_select),
+            ("is_ranked", self.is_ranked),
+        ])
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Create trials from a pyarrow.Table.
+
+        Numeric columns are converted to NumPy without copying where
+        possible. The stimulus set may be stored as a fixed-size or a
+        variable-length list column.
+
+        Arguments:
+            table: A pyarrow.Table (or pyarrow.RecordBatch), e.g., as
+                returned by `to_arrow`.
+
+        Returns:
+            A new RankDocket object.
+
+        """
+        columns = arrow_columns(table)
+        trials = RankDocket(
+            columns["stimulus_set"], n_select=columns["n_select"],
+            is_ranked=columns["is_ranked"]
+        )
+        if columns["stimulus_set"].dtype.itemsize < 4:
+            trials.compact()
+        return trials
+
+    def as_dataset(self, group, all_outcomes=True, ragged=False):
         """Return TensorFlow dataset.
 
         Arguments:
@@ -478,7 +692,13 @@ class RankDocket(RankTrials):
                 each trial.
             all_outcomes (optional): Boolean indicating whether all
                 possible outcomes (along third dimension) should be
-                included in returned dataset.
+                included in returned dataset. The outcomes are not
+                materialized. Instead, each trial carries its
+                `stimulus_set` and an `outcome_idx` array that indexes
+                the columns of `stimulus_set`.
+            ragged (optional): Boolean indicating whether the stimulus
+                set should be encoded as a tf.RaggedTensor. See
+                `RankObservations.as_dataset`.
 
         Returns:
             x: A TensorFlow dataset.
@@ -490,17 +710,24 @@ class RankDocket(RankTrials):
         group = np.hstack([group_level_0, group])
         # Return tensorflow dataset.
         if all_outcomes:
-            stimulus_set = self.all_outcomes()
             x = {
                 'stimulus_set': tf.constant(
-                    stimulus_set + 1, dtype=tf.int32
+                    self.stimulus_set + 1, dtype=tf.int32
                 ),
+                'config_idx': tf.constant(self.config_idx, dtype=tf.int32),
                 'is_select': tf.constant(
                     np.expand_dims(self.is_select(compress=False), axis=2),
                     dtype=tf.bool
                 ),
+                'is_ranked': tf.constant(
+                    np.expand_dims(self.is_ranked, axis=1), dtype=tf.bool
+                ),
                 'group': tf.constant(group, dtype=tf.int32)
             }
+            ds = tf.data.Dataset.from_tensor_slices((x))
+            if ragged:
+                ds = ds.batch(CHUNK_SIZE)
+            ds = _map_outcome_idx(ds, self.outcome_table())
         else:
             stimulus_set = np.expand_dims(self.stimulus_set + 1, axis=2)
             x = {
@@ -509,26 +736,47 @@ class RankDocket(RankTrials):
                     np.expand_dims(self.is_select(compress=False), axis=2),
                     dtype=tf.bool
                 ),
+                'is_ranked': tf.constant(
+                    np.expand_dims(self.is_ranked, axis=1), dtype=tf.bool
+                ),
                 'group': tf.constant(group, dtype=tf.int32)
             }
-        return tf.data.Dataset.from_tensor_slices((x))
+            ds = tf.data.Dataset.from_tensor_slices((x))
+            if ragged:
+                ds = ds.batch(CHUNK_SIZE)
+        if ragged:
+            ds = _map_ragged_inputs(ds).unbatch()
+        return ds
 
     @classmethod
-    def load(cls, filepath):
+    def load(cls, filepath, index=None, mmap_mode=None):
         """Load trials.
 
         Arguments:
             filepath: The location of the hdf5 file to load.
+            index (optional): An integer (or Boolean) array indicating
+                the subset of trials to load. Only the necessary
+                (chunks of) trials are read from disk.
+            mmap_mode (optional): Either 'r' (read-only) or 'c'
+                (copy-on-write). If not None, contiguous datasets are
+                memory-mapped instead of being read into memory.
+                Datasets saved with `compression` (or chunking) are
+                read into memory regardless. See `numpy.memmap`.
+
+        Raises:
+            ValueError: If `mmap_mode` is not None, 'r' or 'c'.
 
         """
         f = h5py.File(filepath, "r")
-        stimulus_set = f["stimulus_set"][()]
-        n_select = f["n_select"][()]
-        is_ranked = f["is_ranked"][()]
+        stimulus_set = load_column(f, "stimulus_set", index, mmap_mode)
+        n_select = load_column(f, "n_select", index, mmap_mode)
+        is_ranked = load_column(f, "is_ranked", index, mmap_mode)
         f.close()
         trials = RankDocket(
             stimulus_set, n_select=n_select, is_ranked=is_ranked
         )
+        if stimulus_set.dtype.itemsize < 4:
+            trials.compact()
         return trials
 
 
@@ -604,9 +852,16 @@ class RankObservations(RankTrials):
 
     Methods:
         subset: Return a subset of judged trials given an index.
+        coverage: Return the coverage statistics of the stimuli.
         set_group_id: Override the group ID of all trials.
         set_weight: Override the weight of all trials.
         save: Save the observations data structure to disk.
+        compact: Convert trial variables to compact dtypes.
+        compress: Collapse duplicate trials into weighted trials.
+        expand: Expand compressed trials.
+        to_arrow: Return the trials as a pyarrow.Table.
+        from_arrow: Create trials from a pyarrow.Table.
+        from_arrays: Create trials from trial arrays.
 
     """
 
@@ -685,6 +940,83 @@ class RankObservations(RankTrials):
         self._set_configuration_data(
             self.n_reference, self.n_select, self.is_ranked, group_id)
 
+    @classmethod
+    def from_arrays(
+            cls, stimulus_set, n_select=None, is_ranked=None,
+            group_id=None, agent_id=None, session_id=None, weight=None,
+            rt_ms=None, config_idx=None, config_list=None,
+            outcome_idx_list=None, validate=False):
+        """Create observations from trial arrays.
+
+        Unlike the constructor, the arrays are not validated (unless
+        requested) and known configuration data is reused. Use this
+        method for observations that are valid by construction, e.g.,
+        simulated observations or observations derived from existing
+        observations.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+            n_select (optional): See `__init__`.
+            is_ranked (optional): See `__init__`.
+            group_id (optional): See `__init__`.
+            agent_id (optional): See `__init__`.
+            session_id (optional): See `__init__`.
+            weight (optional): See `__init__`.
+            rt_ms (optional): See `__init__`.
+            config_idx (optional): An integer array indicating the
+                known configuration of each trial. If provided,
+                `config_list` must also be provided.
+                shape = (n_trial,)
+            config_list (optional): A DataFrame of the known unique
+                configurations (including 'group_id' and
+                'session_id').
+            outcome_idx_list (optional): A list of the possible
+                outcomes of each configuration. If None, the outcomes
+                are derived from `config_list`.
+            validate (optional): Boolean indicating if the arrays
+                should be validated. If True, the regular constructor
+                is used and the configuration data is re-derived.
+
+        Returns:
+            A new RankObservations object.
+
+        """
+        if validate:
+            return cls(
+                stimulus_set, n_select=n_select, is_ranked=is_ranked,
+                group_id=group_id, agent_id=agent_id, session_id=session_id,
+                weight=weight, rt_ms=rt_ms
+            )
+        obs = cls.__new__(cls)
+        obs._init_trusted(stimulus_set, n_select, is_ranked)
+
+        n_trial = obs.n_trial
+        if group_id is None:
+            group_id = np.zeros((n_trial), dtype=np.int32)
+        obs.group_id = np.asarray(group_id)
+        if agent_id is None:
+            agent_id = np.zeros((n_trial), dtype=np.int32)
+        obs.agent_id = np.asarray(agent_id)
+        if session_id is None:
+            session_id = np.zeros((n_trial), dtype=np.int32)
+        obs.session_id = np.asarray(session_id)
+        if weight is None:
+            weight = np.ones((n_trial))
+        obs.weight = np.asarray(weight)
+        if rt_ms is None:
+            rt_ms = -np.ones((n_trial))
+        obs.rt_ms = np.asarray(rt_ms)
+
+        if config_idx is None:
+            obs._set_configuration_data(
+                obs.n_reference, obs.n_select, obs.is_ranked, obs.group_id
+            )
+        else:
+            obs._set_known_configuration(
+                config_idx, config_list, outcome_idx_list
+            )
+        return obs
+
     def _check_group_id(self, group_id):
         """Check the argument group_id."""
         group_id = group_id.astype(np.int32)
@@ -738,7 +1070,7 @@ class RankObservations(RankTrials):
 
     def _check_weight(self, weight):
         """Check the argument weight."""
-        weight = weight.astype(np.float)
+        weight = weight.astype(np.float64)
         # Check shape agreement.
         if not (weight.shape[0] == self.n_trial):
             raise ValueError((
@@ -748,7 +1080,7 @@ class RankObservations(RankTrials):
 
     def _check_rt(self, rt_ms):
         """Check the argument rt_ms."""
-        rt_ms = rt_ms.astype(np.float)
+        rt_ms = rt_ms.astype(np.float64)
         # Check shape agreement.
         if not (rt_ms.shape[0] == self.n_trial):
             raise ValueError((
@@ -759,6 +1091,10 @@ class RankObservations(RankTrials):
     def subset(self, index):
         """Return subset of trials as a new RankObservations object.
 
+        The subset is a lightweight view that only copies trial
+        variables when they are accessed (e.g., when the subset is
+        mutated or saved). See `SubsetView`.
+
         Arguments:
             index: The indices corresponding to the subset.
 
@@ -766,12 +1102,7 @@ class RankObservations(RankTrials):
             A new RankObservations object.
 
         """
-        return RankObservations(
-            self.stimulus_set[index, :], n_select=self.n_select[index],
-            is_ranked=self.is_ranked[index], group_id=self.group_id[index],
-            agent_id=self.agent_id[index], session_id=self.session_id[index],
-            weight=self.weight[index], rt_ms=self.rt_ms[index]
-        )
+        return _RankObservationsView(self, index)
 
     def _set_configuration_data(
                 self, n_reference, n_select, is_ranked, group_id,
@@ -819,35 +1150,13 @@ class RankObservations(RankTrials):
             session_id = np.zeros((n_trial), dtype=np.int32)
 
         # Determine unique display configurations.
-        n_outcome_placeholder = np.zeros(n_select.shape[0], dtype=np.int32)
         d = {
             'n_reference': n_reference, 'n_select': n_select,
             'is_ranked': is_ranked, 'group_id': group_id,
-            'session_id': session_id, 'n_outcome': n_outcome_placeholder
-            }
-        df_config = pd.DataFrame(d)
-        df_config = df_config.drop_duplicates()
-        n_config = len(df_config)
-        n_out_idx = df_config.columns.get_loc("n_outcome")
-
-        # Assign display configuration index for every observation.
-        config_idx = np.empty(n_trial, dtype=np.int32)
-        outcome_idx_list = []
-        for i_config in range(n_config):
-            # Determine number of possible outcomes for configuration.
-            outcome_idx = _possible_rank_outcomes(df_config.iloc[i_config])
-            outcome_idx_list.append(outcome_idx)
-            n_outcome = outcome_idx.shape[0]
-            df_config.iloc[i_config, n_out_idx] = n_outcome
-            # Find trials matching configuration.
-            a = (n_reference == df_config['n_reference'].iloc[i_config])
-            b = (n_select == df_config['n_select'].iloc[i_config])
-            c = (is_ranked == df_config['is_ranked'].iloc[i_config])
-            d = (group_id == df_config['group_id'].iloc[i_config])
-            e = (session_id == df_config['session_id'].iloc[i_config])
-            f = np.array((a, b, c, d, e))
-            display_type_locs = np.all(f, axis=0)
-            config_idx[display_type_locs] = i_config
+            'session_id': session_id
+        }
+        config_idx, df_config = unique_configurations(d)
+        outcome_idx_list = _config_outcomes(df_config)
 
         self.config_idx = config_idx
         self.config_list = df_config
@@ -866,6 +1175,7 @@ class RankObservations(RankTrials):
         else:
             group_id = self._check_group_id(group_id)
         self.group_id = copy.copy(group_id)
+        self._clear_cache()
 
         # Re-derive unique display configurations.
         self._set_configuration_data(
@@ -883,34 +1193,434 @@ class RankObservations(RankTrials):
             weight = weight * np.ones((self.n_trial), dtype=np.int32)
         else:
             weight = self._check_weight(weight)
-        self.weight = copy.copy(weight)
+        # Preserve the (possibly compact) dtype.
+        self.weight = weight.astype(self.weight.dtype)
+        self._clear_cache()
+
+    def compact(self, n_stimuli=None):
+        """Convert trial variables to compact dtypes (in place).
+
+        Extends `RankTrials.compact`. The weight and response time of
+        each trial are stored as float32.
+
+        Arguments:
+            n_stimuli (optional): See SimilarityTrials.
+
+        Returns:
+            self
+
+        """
+        RankTrials.compact(self, n_stimuli)
+        self.weight = self.weight.astype(np.float32, copy=False)
+        self.rt_ms = self.rt_ms.astype(np.float32, copy=False)
+        return self
+
+    def compress(self, return_inverse=False):
+        """Collapse duplicate trials into weighted trials.
+
+        Two trials are duplicates if they share the same query, the
+        same selected references (in the same order if the trial is
+        ranked), the same unselected references (in any order), the
+        same configuration, and the same group and agent ID. Since
+        duplicates only scale the likelihood, each set of duplicates
+        is replaced by a single trial whose weight is the summed
+        weight of the duplicates (i.e., the count if all weights are
+        one).
+
+        Arguments:
+            return_inverse (optional): Boolean indicating if the
+                compressed trial of every original trial should be
+                returned. See `expand`.
+
+        Returns:
+            obs: A new RankObservations object containing the unique
+                trials in order of first occurrence. The unselected
+                references (and the selected references of unranked
+                trials) are sorted. The session ID and response time
+                of a unique trial are taken from its first
+                occurrence.
+            inverse (optional): An integer array indicating the
+                compressed trial of every original trial.
+                shape=(n_trial,)
+
+        """
+        stimulus_set = _canonical_stimulus_set(
+            self.stimulus_set, self.n_select, self.is_ranked
+        )
+        idx_unique, inverse, weight = compress_trials(
+            [
+                stimulus_set, self.n_select, self.is_ranked, self.group_id,
+                self.agent_id
+            ], self.weight
+        )
+        obs = RankObservations.from_arrays(
+            stimulus_set[idx_unique], n_select=self.n_select[idx_unique],
+            is_ranked=self.is_ranked[idx_unique],
+            group_id=self.group_id[idx_unique],
+            agent_id=self.agent_id[idx_unique],
+            session_id=self.session_id[idx_unique], weight=weight,
+            rt_ms=self.rt_ms[idx_unique]
+        )
+        if self.stimulus_set.dtype.itemsize < 4:
+            obs.compact()
+        if return_inverse:
+            return obs, inverse
+        return obs
+
+    def expand(self, index):
+        """Expand compressed trials.
+
+        Arguments:
+            index: An integer array indicating the compressed trial of
+                every expanded trial (e.g., the `inverse` returned by
+                `compress`).
+                shape=(n_trial,)
+
+        Returns:
+            obs: A new RankObservations object. The weight of each
+                compressed trial is split evenly among its copies, so
+                expanding the compressed trials of unit-weight
+                observations restores the unit weights.
+
+        """
+        index = np.asarray(index)
+        obs = self.subset(index)
+        obs.set_weight(expand_weight(np.asarray(self.weight), index))
+        return obs
 
-    def save(self, filepath):
+    def save(self, filepath, compression=None, append=False):
         """Save the RankObservations object as an HDF5 file.
 
         Arguments:
             filepath: String specifying the path to save the data.
+            compression (optional): String indicating an HDF5
+                compression filter (e.g., 'gzip' or 'lzf'). If
+                provided, the data is chunked along the trial axis and
+                compressed. If None, the data is stored contiguously,
+                which allows it to be memory-mapped when loaded.
+            append (optional): Boolean indicating if the trials should
+                be appended to an existing file. The file must have
+                been created with `append=True` (or with
+                `compression`), in which case it grows in place. If the
+                file does not exist, an appendable file is created.
 
         """
+        if append and os.path.exists(filepath):
+            f = h5py.File(filepath, "a")
+            trial_type = f["trial_type"][()]
+            if isinstance(trial_type, bytes):
+                trial_type = trial_type.decode()
+            if trial_type != "RankObservations":
+                f.close()
+                raise ValueError((
+                    "Cannot append RankObservations to a file containing "
+                    "{0}.").format(trial_type)
+                )
+            for name, data in self._save_columns():
+                append_column(f, name, data)
+            f.close()
+            return
+
         f = h5py.File(filepath, "w")
         f.create_dataset("trial_type", data="RankObservations")
-        f.create_dataset("stimulus_set", data=self.stimulus_set)
-        f.create_dataset("n_select", data=self.n_select)
-        f.create_dataset("is_ranked", data=self.is_ranked)
-        f.create_dataset("group_id", data=self.group_id)
-        f.create_dataset("agent_id", data=self.agent_id)
-        f.create_dataset("session_id", data=self.session_id)
-        f.create_dataset("weight", data=self.weight)
-        f.create_dataset("rt_ms", data=self.rt_ms)
+        for name, data in self._save_columns():
+            save_column(
+                f, name, data, compression, chunked=append,
+                fillvalue=-1 if name == "stimulus_set" else None
+            )
         f.close()
 
-    def as_dataset(self, all_outcomes=True):
+    def _save_columns(self):
+        """Return the (name, data) pairs of the saved trial variables."""
+        return [
+            ("stimulus_set", self.stimulus_set),
+            ("n_select", self.n_select),
+            ("is_ranked", self.is_ranked),
+            ("group_id", self.group_id),
+            ("agent_id", self.agent_id),
+            ("session_id", self.session_id),
+            ("weight", self.weight),
+            ("rt_ms", self.rt_ms),
+        ]
+
+    def to_arrow(self):
+        """Return the trials as a pyarrow.Table.
+
+        Requires the optional dependency `pyarrow`. Numeric trial
+        variables are not copied, with the exception of the Boolean
+        `is_ranked`, which Arrow stores bit-packed. See `save_parquet`.
+
+        Returns:
+            table: A pyarrow.Table.
+
+        """
+        return arrow_table("RankObservations", self._save_columns())
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Create trials from a pyarrow.Table.
+
+        Numeric columns are converted to NumPy without copying where
+        possible. The stimulus set may be stored as a fixed-size or a
+        variable-length list column.
+
+        Arguments:
+            table: A pyarrow.Table (or pyarrow.RecordBatch), e.g., as
+                returned by `to_arrow`.
+
+        Returns:
+            A new RankObservations object.
+
+        """
+        columns = arrow_columns(table)
+        trials = RankObservations(
+            columns["stimulus_set"], n_select=columns["n_select"],
+            is_ranked=columns["is_ranked"],
+            group_id=columns.get("group_id"),
+            agent_id=columns.get("agent_id"),
+            session_id=columns.get("session_id"),
+            weight=columns.get("weight"), rt_ms=columns.get("rt_ms")
+        )
+        if columns["stimulus_set"].dtype.itemsize < 4:
+            trials.compact()
+        return trials
+
+    def append(self, obs):
+        """Append judged trials in place.
+
+        The trial variables are backed by buffers whose capacity grows
+        geometrically, so the amortized cost of an append is
+        proportional to the number of appended trials rather than the
+        total number of trials. The configuration index is updated
+        incrementally by comparing the (few) unique configurations of
+        the appended trials with the existing configurations.
+
+        Arguments:
+            obs: A RankObservations object containing the trials to
+                append.
+
+        Returns:
+            self
+
+        """
+        n_old = self.n_trial
+        n_trial = n_old + obs.n_trial
+        max_n_reference = max(self.max_n_reference, obs.max_n_reference)
+
+        # Merge configurations.
+        df_config, config_map, is_new = merge_configurations(
+            self.config_list.drop(columns='n_outcome'),
+            obs.config_list.drop(columns='n_outcome'), n_old
+        )
+        n_outcome = np.hstack([
+            self.config_list['n_outcome'].values,
+            obs.config_list['n_outcome'].values[is_new]
+        ]).astype(np.int32)
+        df_config['n_outcome'] = n_outcome
+        self.outcome_idx_list = self.outcome_idx_list + [
+            outcome_idx for outcome_idx, i_new in zip(
+                obs.outcome_idx_list, is_new
+            ) if i_new
+        ]
+        self.config_list = df_config
+
+        if not hasattr(self, '_buffer'):
+            self._buffer = {}
+        column_list = [
+            ('stimulus_set', obs.stimulus_set),
+            ('n_reference', obs.n_reference),
+            ('n_select', obs.n_select),
+            ('is_ranked', obs.is_ranked),
+            ('group_id', obs.group_id),
+            ('agent_id', obs.agent_id),
+            ('session_id', obs.session_id),
+            ('weight', obs.weight),
+            ('rt_ms', obs.rt_ms),
+            ('config_idx', config_map[obs.config_idx]),
+        ]
+        for name, data in column_list:
+            setattr(self, name, _append_buffer(
+                self._buffer, name, getattr(self, name), data,
+                max_n_reference + 1
+            ))
+
+        # Update coverage statistics if they are maintained.
+        coverage = self.__dict__.get('_coverage')
+        if coverage is not None:
+            obs_coverage = obs.__dict__.get('_coverage')
+            if obs_coverage is None:
+                coverage.update(obs.stimulus_set)
+            else:
+                coverage.merge(obs_coverage)
+
+        self.n_trial = n_trial
+        self.max_n_reference = max_n_reference
+        self._clear_cache()
+        return self
+
+    def as_dataset(
+            self, all_outcomes=True, chunk_size=None, bucket_size=None,
+            shuffle=False, ragged=False, seed=None, cache=None):
         """Format necessary data as Tensorflow.data.Dataset object.
 
+        Arguments:
+            all_outcomes (optional): Boolean indicating whether all
+                possible outcomes (along third dimension) should be
+                included in returned dataset. The outcomes are not
+                materialized. Instead, each trial carries its
+                `stimulus_set` and an `outcome_idx` array that indexes
+                the columns of `stimulus_set`. If False, only the
+                observed outcome is included and the model returns the
+                probability of the observed ranking directly. This is
+                considerably cheaper for trials with many possible
+                outcomes, but requires a loss that does not
+                renormalize the predictions (e.g.,
+                psiz.keras.losses.NegLogLikelihood).
+            chunk_size (optional): Integer indicating the number of
+                trials per chunk. If provided, the dataset is streamed
+                one chunk of trials at a time (rather than embedding
+                all trials in the graph), which bounds the memory
+                footprint when the trials are memory-mapped (see
+                `load`).
+            bucket_size (optional): Integer indicating the maximum
+                number of trials per batch. If provided, trials are
+                bucketed by configuration and the returned dataset is
+                already batched. Each batch only contains trials that
+                share the same number of references (and outcomes), so
+                a batch is padded to its own configuration's shape
+                rather than the maximum shape of all trials.
+            shuffle (optional): Boolean indicating whether the trials
+                within each bucket and the order of the batches should
+                be shuffled on each iteration. Only used if
+                `bucket_size` is provided.
+            ragged (optional): Boolean indicating whether the stimulus
+                set should be encoded as a tf.RaggedTensor that only
+                contains the stimuli that are present. A model then
+                never embeds (or computes the similarity of)
+                placeholder references. The remaining inputs keep
+                their padded shape.
+            seed (optional): Integer used to seed the shuffling of
+                bucketed trials. See `shuffle`.
+            cache (optional): If True, the formatted trials are cached
+                in memory. If a string, the formatted trials are
+                cached in files that use the string as a filename
+                prefix. The cache precedes any shuffling, so the
+                trials are only formatted during the first iteration.
+
         Returns:
             ds_obs: The data necessary for inference, formatted as a
             tf.data.Dataset object.
 
+        """
+        if bucket_size is not None:
+            return self._bucketed_dataset(
+                all_outcomes, chunk_size, bucket_size, shuffle, ragged,
+                seed, cache
+            )
+
+        if chunk_size is None and not ragged:
+            x, y, w = self._dataset_arrays(0, self.n_trial, all_outcomes)
+            ds_obs = widen_dataset(
+                tf.data.Dataset.from_tensor_slices((x, y, w))
+            )
+            if all_outcomes:
+                ds_obs = _map_outcome_idx(ds_obs, self.outcome_table())
+        else:
+            if chunk_size is None:
+                # NOTE: Ragged rows only survive `unbatch`, so in-memory
+                # trials are also encoded one chunk at a time.
+                x, y, w = self._dataset_arrays(0, self.n_trial, all_outcomes)
+                ds_obs = tf.data.Dataset.from_tensor_slices(
+                    (x, y, w)
+                ).batch(CHUNK_SIZE)
+            else:
+                ds_obs = chunked_dataset(
+                    lambda start, stop: self._dataset_arrays(
+                        start, stop, all_outcomes
+                    ), self.n_trial, chunk_size
+                )
+            ds_obs = widen_dataset(ds_obs)
+            # Inflate outcomes once per chunk.
+            if all_outcomes:
+                ds_obs = _map_outcome_idx(ds_obs, self.outcome_table())
+            if ragged:
+                ds_obs = _map_ragged_inputs(ds_obs)
+            ds_obs = ds_obs.unbatch()
+        return cache_dataset(ds_obs, cache)
+
+    def _bucketed_dataset(
+            self, all_outcomes, chunk_size, bucket_size, shuffle, ragged,
+            seed, cache):
+        """Return a dataset that is batched by configuration.
+
+        Arguments:
+            all_outcomes: See `as_dataset`.
+            chunk_size: See `as_dataset`.
+            bucket_size: See `as_dataset`.
+            shuffle: See `as_dataset`.
+            ragged: See `as_dataset`.
+            seed: See `as_dataset`.
+            cache: See `as_dataset`. Each bucket is cached
+                separately.
+
+        Returns:
+            ds_obs: A batched tf.data.Dataset object.
+
+        """
+        # Configurations that share the same padded shape are assigned to
+        # the same bucket.
+        bucket_var = ['n_reference']
+        if all_outcomes:
+            bucket_var.append('n_outcome')
+        _, bucket_idx = np.unique(
+            self.config_list[bucket_var].values, axis=0, return_inverse=True
+        )
+        bucket_idx = np.reshape(bucket_idx, [-1])[self.config_idx]
+
+        ds_list = []
+        n_batch = []
+        for i_bucket in range(np.max(bucket_idx) + 1):
+            obs_bucket = self.subset(np.flatnonzero(bucket_idx == i_bucket))
+            ds_bucket = obs_bucket.as_dataset(
+                all_outcomes=all_outcomes, chunk_size=chunk_size,
+                ragged=ragged
+            )
+            ds_bucket = cache_dataset(
+                ds_bucket, cache, suffix='_{0}'.format(i_bucket)
+            )
+            if shuffle:
+                ds_bucket = ds_bucket.shuffle(
+                    obs_bucket.n_trial, seed=seed,
+                    reshuffle_each_iteration=True
+                )
+            ds_list.append(ds_bucket.batch(bucket_size, drop_remainder=False))
+            n_batch.append(np.ceil(obs_bucket.n_trial / bucket_size))
+
+        if shuffle and len(ds_list) > 1:
+            # Interleave batches of different buckets at random.
+            weights = np.array(n_batch) / np.sum(n_batch)
+            ds_obs = tf.data.experimental.sample_from_datasets(
+                ds_list, weights=weights.tolist(), seed=seed
+            )
+        else:
+            ds_obs = ds_list[0]
+            for ds_bucket in ds_list[1:]:
+                ds_obs = ds_obs.concatenate(ds_bucket)
+        return ds_obs
+
+    def _dataset_arrays(self, start, stop, all_outcomes):
+        """Return the dataset arrays of a contiguous range of trials.
+
+        Arguments:
+            start: Integer indicating the first trial.
+            stop: Integer indicating the (exclusive) last trial.
+            all_outcomes: See `as_dataset`.
+
+        Returns:
+            x: A dictionary of model inputs.
+            y: The model outputs.
+            w: The observation weights.
+
         """
         # NOTE: Should not use single dimension inputs. Add a singleton
         # dimensions if necessary, because restoring a SavedModel adds
@@ -922,74 +1632,88 @@ class RankObservations(RankTrials):
         # NOTE: The dimensions of inputs are expanded to have an additional
         # singleton third dimension to indicate that there is only one outcome
         # that we are interested for each trial.
-        group_level_0 = np.zeros([self.group_id.shape[0]], dtype=np.int32)
+        stimulus_set = np.asarray(self.stimulus_set[start:stop])
+        n_trial = stimulus_set.shape[0]
+        is_select = _select_mask(
+            self.n_select[start:stop], stimulus_set.shape[1]
+        )
+        group_id = self.group_id[start:stop]
+        group_level_0 = np.zeros([n_trial], dtype=np.int32)
+        group = np.stack(
+            (group_level_0, group_id, self.agent_id[start:stop]), axis=-1
+        ).astype(np.int32)
         if all_outcomes:
-            stimulus_set = self.all_outcomes()
             x = {
                 'stimulus_set': stimulus_set + 1,
-                'is_select': np.expand_dims(
-                    self.is_select(compress=False), axis=2
+                'config_idx': self.config_idx[start:stop],
+                'is_select': np.expand_dims(is_select, axis=2),
+                'is_ranked': np.expand_dims(
+                    self.is_ranked[start:stop], axis=1
                 ),
-                'group': np.stack(
-                    (group_level_0, self.group_id, self.agent_id), axis=-1
-                )
+                'group': group
             }
             # NOTE: The outputs `y` indicate a one-hot encoding of the outcome
             # that occurred.
-            y = np.zeros([self.n_trial, stimulus_set.shape[2]])
+            max_n_outcome = np.max(self.config_list['n_outcome'].values)
+            y = np.zeros([n_trial, max_n_outcome], dtype=K.floatx())
             y[:, 0] = 1
         else:
             x = {
-                'stimulus_set': np.expand_dims(self.stimulus_set + 1, axis=2),
-                'is_select': np.expand_dims(
-                    self.is_select(compress=False), axis=2
+                'stimulus_set': np.expand_dims(stimulus_set + 1, axis=2),
+                'is_select': np.expand_dims(is_select, axis=2),
+                'is_ranked': np.expand_dims(
+                    self.is_ranked[start:stop], axis=1
                 ),
-                'group': np.stack(
-                    (group_level_0, self.group_id, self.agent_id), axis=-1
-                )
+                'group': group
             }
-            # NOTE: The outputs `y` indicate a sparse encoding of the outcome
-            # that occurred.
-            y = np.zeros([self.n_trial])
-
-        y = tf.constant(y, dtype=K.floatx())
+            # NOTE: The outputs `y` indicate a one-hot encoding of the
+            # only (observed) outcome.
+            y = np.ones([n_trial, 1], dtype=K.floatx())
 
         # Observation weight.
-        w = tf.constant(self.weight, dtype=K.floatx())
-
-        # Create dataset.
-        ds_obs = tf.data.Dataset.from_tensor_slices((x, y, w))
-        return ds_obs
+        w = np.asarray(self.weight[start:stop], dtype=K.floatx())
+        return x, y, w
 
     @classmethod
-    def load(cls, filepath):
+    def load(cls, filepath, index=None, mmap_mode=None):
         """Load trials.
 
         Arguments:
             filepath: The location of the hdf5 file to load.
+            index (optional): An integer (or Boolean) array indicating
+                the subset of trials to load. Only the necessary
+                (chunks of) trials are read from disk.
+            mmap_mode (optional): Either 'r' (read-only) or 'c'
+                (copy-on-write). If not None, contiguous datasets are
+                memory-mapped instead of being read into memory.
+                Datasets saved with `compression` (or chunking) are
+                read into memory regardless. See `numpy.memmap`.
+
+        Raises:
+            ValueError: If `mmap_mode` is not None, 'r' or 'c'.
 
         """
         f = h5py.File(filepath, "r")
-        stimulus_set = f["stimulus_set"][()]
-        n_select = f["n_select"][()]
-        is_ranked = f["is_ranked"][()]
-        group_id = f["group_id"][()]
+        stimulus_set = load_column(f, "stimulus_set", index, mmap_mode)
+        n_select = load_column(f, "n_select", index, mmap_mode)
+        is_ranked = load_column(f, "is_ranked", index, mmap_mode)
+        group_id = load_column(f, "group_id", index, mmap_mode)
 
         # For backwards compatability.
         if "weight" in f:
-            weight = f["weight"][()]
+            weight = load_column(f, "weight", index, mmap_mode)
         else:
             weight = np.ones((len(n_select)))
         if "rt_ms" in f:
-            rt_ms = f["rt_ms"][()]
+            rt_ms = load_column(f, "rt_ms", index, mmap_mode)
         else:
             rt_ms = -np.ones((len(n_select)))
         if "agent_id" in f:
-            agent_id = f["agent_id"][()]
+            agent_id = load_column(f, "agent_id", index, mmap_mode)
         else:
             agent_id = np.zeros((len(n_select)))
         if "session_id" in f:
-            session_id = f["session_id"][()]
+            session_id = load_column(f, "session_id", index, mmap_mode)
         else:
             session_id = np.zeros((len(n_select)))
         f.close()
@@ -999,14 +1723,269 @@ class RankObservations(RankTrials):
             group_id=group_id, agent_id=agent_id, session_id=session_id,
             weight=weight, rt_ms=rt_ms
         )
+        if stimulus_set.dtype.itemsize < 4:
+            trials.compact()
         return trials
 
 
+class _RankObservationsView(SubsetView, RankObservations):
+    """A lazily materialized subset of RankObservations."""
+
+    def __init__(self, parent, index):
+        """Initialize.
+
+        Arguments:
+            parent: A RankObservations object.
+            index: The indices corresponding to the subset.
+
+        """
+        self._init_view(parent, index, [
+            'stimulus_set', 'n_reference', 'n_select', 'is_ranked',
+            'group_id', 'agent_id', 'session_id', 'weight', 'rt_ms'
+        ])
+
+        # Derive configurations from the configuration table of parent.
+        config_idx, config_list, idx_source = subset_configurations(
+            parent.config_idx, parent.config_list, index
+        )
+        self.config_idx = config_idx
+        self.config_list = config_list
+        self.outcome_idx_list = [
+            parent.outcome_idx_list[i_config] for i_config in idx_source
+        ]
+
+        # Trim trailing placeholder columns of the stimulus set (without
+        # a copy).
+        self.max_n_reference = np.amax(config_list['n_reference'].values)
+        arr, arr_index = self._view_var['stimulus_set']
+        self._view_var['stimulus_set'] = (
+            arr[:, 0:self.max_n_reference + 1], arr_index
+        )
+
+
+def _append_buffer(buffer, name, current, data, n_column):
+    """Append rows to an array backed by a growable buffer.
+
+    Arguments:
+        buffer: A dictionary of buffers (modified in place).
+        name: String indicating the name of the array.
+        current: The current array. If `current` is not a view of the
+            corresponding buffer (e.g., because the attribute was
+            replaced), a new buffer is allocated.
+        data: The rows to append.
+        n_column: Integer indicating the number of columns of a 2D
+            array (i.e., the stimulus set). Ignored for 1D arrays.
+
+    Returns:
+        A view of the first `len(current) + len(data)` rows of the
+            buffer.
+
+    """
+    n_old = current.shape[0]
+    n_new = n_old + data.shape[0]
+    buf = buffer.get(name)
+
+    is_valid = (
+        buf is not None and current.base is buf and
+        buf.shape[0] >= n_new and
+        (current.ndim == 1 or buf.shape[1] >= n_column)
+    )
+    if not is_valid:
+        # Allocate a new buffer with spare capacity.
+        capacity = max(n_new, 2 * n_old)
+        dtype = np.result_type(current.dtype, data.dtype)
+        if current.ndim == 1:
+            buf = np.empty([capacity], dtype=dtype)
+            buf[0:n_old] = current
+        else:
+            buf = np.full([capacity, n_column], -1, dtype=dtype)
+            buf[0:n_old, 0:current.shape[1]] = current
+        buffer[name] = buf
+
+    if current.ndim == 1:
+        buf[n_old:n_new] = data
+        return buf[0:n_new]
+
+    buf[n_old:n_new, 0:data.shape[1]] = data
+    buf[n_old:n_new, data.shape[1]:] = -1
+    return buf[0:n_new, 0:n_column]
+
+
+def _canonical_stimulus_set(stimulus_set, n_select, is_ranked):
+    """Return stimulus sets whose interchangeable references are sorted.
+
+    The order of the unselected references does not affect the
+    likelihood of a trial, nor does the order of the selected
+    references of an unranked trial. Sorting them yields a canonical
+    stimulus set for identifying duplicate trials.
+
+    Arguments:
+        stimulus_set: An integer array of stimulus sets.
+            shape=(n_trial, max_n_reference + 1)
+        n_select: An integer array indicating the number of selected
+            references of each trial.
+            shape=(n_trial,)
+        is_ranked: A Boolean array indicating which trials are ranked.
+            shape=(n_trial,)
+
+    Returns:
+        stimulus_set: The canonical stimulus sets.
+            shape=(n_trial, max_n_reference + 1)
+
+    """
+    n_column = stimulus_set.shape[1]
+    column = np.arange(n_column)[np.newaxis, :]
+    n_select = np.expand_dims(n_select, axis=1)
+
+    # Columns that share a block are sorted by stimulus index. Each
+    # selected reference of a ranked trial is its own block.
+    block = np.where(np.less_equal(column, n_select), column, n_select + 1)
+    is_selected_unranked = np.logical_and(
+        np.logical_not(np.expand_dims(is_ranked, axis=1)),
+        np.logical_and(np.greater(column, 0), np.less_equal(column, n_select))
+    )
+    block = np.where(is_selected_unranked, 1, block)
+    block = np.where(np.less(stimulus_set, 0), n_column + 1, block)
+
+    order = np.lexsort((stimulus_set, block), axis=-1)
+    return np.take_along_axis(stimulus_set, order, axis=1)
+
+
+def _select_mask(n_select, n_column):
+    """Return a Boolean mask indicating selected stimuli.
+
+    Arguments:
+        n_select: An integer array indicating the number of selected
+            references of each trial.
+            shape=(n_trial,)
+        n_column: Integer indicating the number of columns of the
+            stimulus set (i.e., query and references).
+
+    Returns:
+        is_select: A 2D Boolean array.
+            shape=(n_trial, n_column)
+
+    """
+    column = np.arange(n_column)
+    is_select = np.logical_and(
+        np.greater(column, 0),
+        np.less_equal(column, np.expand_dims(n_select, axis=1))
+    )
+    return is_select
+
+
+def _map_ragged_inputs(ds):
+    """Encode the stimulus set of batched trials as a RaggedTensor.
+
+    Placeholder stimuli always trail the present stimuli of a trial,
+    so stripping the trailing zeros of each row preserves the column
+    of every present stimulus.
+
+    Arguments:
+        ds: A tf.data.Dataset whose first component is a dictionary
+            with the key 'stimulus_set'. The elements must be batches
+            of trials, where "0" indicates a placeholder.
+            shape=(batch_size, n_max_reference + 1[, 1])
+
+    Returns:
+        ds: A tf.data.Dataset where the stimulus set is a
+            RaggedTensor. Use `unbatch` to obtain individual trials
+            whose stimulus sets retain their length.
+            shape=(batch_size, [n_reference + 1])
+
+    """
+    def _map(x, *args):
+        x = dict(x)
+        stimulus_set = x['stimulus_set']
+        if stimulus_set.shape.rank == 3:
+            stimulus_set = stimulus_set[:, :, 0]
+        x['stimulus_set'] = tf.RaggedTensor.from_tensor(
+            stimulus_set, padding=0
+        )
+        if args:
+            return (x,) + args
+        return x
+
+    return ds.map(_map, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+
+def _map_outcome_idx(ds, outcome_table):
+    """Map configuration indices to outcome permutation indices.
+
+    The (small) outcome table is captured by the input pipeline so
+    that the stimulus set of every possible outcome never needs to be
+    materialized on the host. The model uses the per-trial
+    `outcome_idx` to permute the embedded stimulus set.
+
+    Arguments:
+        ds: A tf.data.Dataset whose first component is a dictionary
+            with the key 'config_idx'. The elements may be individual
+            trials or batches of trials.
+        outcome_table: An integer array of outcome permutations. See
+            RankTrials.outcome_table.
+            shape=(n_config, max_n_reference + 1, max_n_outcome)
+
+    Returns:
+        ds: A tf.data.Dataset where the key 'config_idx' has been
+            replaced by the key 'outcome_idx'.
+            shape=([batch_size,] max_n_reference + 1, max_n_outcome)
+
+    """
+    outcome_table = tf.constant(outcome_table, dtype=tf.int32)
+
+    def _map(x, *args):
+        x = dict(x)
+        x['outcome_idx'] = tf.gather(outcome_table, x.pop('config_idx'))
+        if args:
+            return (x,) + args
+        return x
+
+    return ds.map(_map, num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+
+def _config_outcomes(df_config):
+    """Return the possible outcomes of every trial configuration.
+
+    Arguments:
+        df_config: A DataFrame of unique trial configurations. Must
+            contain the columns 'n_reference', 'n_select', and
+            'is_ranked'. A column 'n_outcome' is added in place.
+
+    Returns:
+        outcome_idx_list: A list of the possible outcomes for each
+            trial configuration.
+
+    """
+    n_reference = df_config['n_reference'].values
+    n_select = df_config['n_select'].values
+    is_ranked = df_config['is_ranked'].values
+
+    outcome_idx_list = []
+    n_outcome = np.empty(len(df_config), dtype=np.int32)
+    for i_config in range(len(df_config)):
+        outcome_idx = _cached_rank_outcomes(
+            int(n_reference[i_config]), int(n_select[i_config]),
+            bool(is_ranked[i_config])
+        )
+        outcome_idx_list.append(outcome_idx)
+        n_outcome[i_config] = outcome_idx.shape[0]
+    df_config['n_outcome'] = n_outcome
+    return outcome_idx_list
+
+
 def _possible_rank_outcomes(trial_configuration):
-    """Return the possible outcomes of a ranked trial configuration.
+    """Return the possible outcomes of a rank trial configuration.
+
+    If the trial configuration is ranked, every ordered selection
+    (i.e., permutation) is a distinct outcome. If the trial
+    configuration is unranked, only the unordered selections (i.e.,
+    combinations) are distinct outcomes. In both cases, the selected
+    references come first.
 
     Arguments:
-        trial_configuration: A trial configuration Pandas Series.
+        trial_configuration: A trial configuration Pandas Series (or
+            dictionary) with the keys 'n_reference' and 'n_select'.
+            The key 'is_ranked' is optional.
 
     Returns:
         An 2D array indicating all possible outcomes where the values
@@ -1016,28 +1995,57 @@ def _possible_rank_outcomes(trial_configuration):
             query. Also note that the unpermuted index is returned
             first.
 
+    Notes:
+        The returned array is shared by all callers (see
+        `_cached_rank_outcomes`) and is therefore read-only.
+
     """
-    n_reference = int(trial_configuration['n_reference'])
-    n_select = int(trial_configuration['n_select'])
+    return _cached_rank_outcomes(
+        int(trial_configuration['n_reference']),
+        int(trial_configuration['n_select']),
+        bool(trial_configuration.get('is_ranked', True))
+    )
 
-    reference_list = range(n_reference)
 
-    # Get all permutations of length n_select.
-    perm = permutations(reference_list, n_select)
+@functools.lru_cache(maxsize=None)
+def _cached_rank_outcomes(n_reference, n_select, is_ranked):
+    """Return the (memoized) possible outcomes of a configuration.
 
-    selection = list(perm)
-    n_outcome = len(selection)
+    The outcomes only depend on the structure of a trial, so they are
+    enumerated once per process and shared by all trial objects.
 
-    outcomes = np.empty((n_outcome, n_reference), dtype=np.int32)
-    for i_outcome in range(n_outcome):
-        # Fill in selections.
-        outcomes[i_outcome, 0:n_select] = selection[i_outcome]
-        # Fill in unselected.
-        dummy_idx = np.arange(n_reference)
-        for i_selected in range(n_select):
-            loc = dummy_idx != outcomes[i_outcome, i_selected]
-            dummy_idx = dummy_idx[loc]
+    Arguments:
+        n_reference: Integer indicating the number of references.
+        n_select: Integer indicating the number of selections.
+        is_ranked: Boolean indicating if selections are ranked.
 
-        outcomes[i_outcome, n_select:] = dummy_idx
+    Returns:
+        outcomes: A read-only 2D array of outcomes. See
+            `_possible_rank_outcomes`.
+            shape=(n_outcome, n_reference)
 
+    """
+    if is_ranked:
+        # Get all permutations of length n_select.
+        selection = permutations(range(n_reference), n_select)
+    else:
+        # The order of the selections is not informative, so only the
+        # combinations of length n_select are distinct outcomes.
+        selection = combinations(range(n_reference), n_select)
+    selection = np.fromiter(
+        chain.from_iterable(selection), dtype=np.int32
+    ).reshape([-1, n_select])
+    n_outcome = selection.shape[0]
+
+    # Fill in unselected references (in ascending order).
+    is_unselected = np.ones([n_outcome, n_reference], dtype=bool)
+    is_unselected[
+        np.expand_dims(np.arange(n_outcome), axis=1), selection
+    ] = False
+    unselected = np.nonzero(is_unselected)[1].astype(np.int32).reshape(
+        [n_outcome, n_reference - n_select]
+    )
+
+    outcomes = np.hstack([selection, unselected])
+    outcomes.flags.writeable = False
     return outcomes
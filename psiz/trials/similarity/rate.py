@@ -31,12 +31,24 @@ import warnings
 
 import h5py
 import numpy as np
-import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import backend as K
 
 from psiz.trials.similarity.base import SimilarityTrials
-from psiz.utils import pad_2d_array
+from psiz.trials.similarity.base import SubsetView
+from psiz.trials.similarity.base import arrow_columns
+from psiz.trials.similarity.base import arrow_table
+from psiz.trials.similarity.base import chunked_dataset
+from psiz.trials.similarity.base import compact_dtype
+from psiz.trials.similarity.base import compress_trials
+from psiz.trials.similarity.base import expand_weight
+from psiz.trials.similarity.base import load_column
+from psiz.trials.similarity.base import save_column
+from psiz.trials.similarity.base import stack_configurations
+from psiz.trials.similarity.base import stack_stimulus_set
+from psiz.trials.similarity.base import subset_configurations
+from psiz.trials.similarity.base import unique_configurations
+from psiz.trials.similarity.base import widen_dataset
 
 
 class RateTrials(SimilarityTrials, metaclass=ABCMeta):
@@ -65,6 +77,35 @@ class RateTrials(SimilarityTrials, metaclass=ABCMeta):
         self.max_n_present = np.amax(self.n_present)
         self.stimulus_set = self.stimulus_set[:, 0:self.max_n_present]
 
+    def _init_trusted(self, stimulus_set):
+        """Initialize from a stimulus set that is known to be valid.
+
+        Counterpart of `__init__` that skips all checks. See
+        `from_arrays`.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+
+        """
+        SimilarityTrials._init_trusted(self, stimulus_set)
+
+        self.n_present = self._infer_n_present(self.stimulus_set)
+        self.max_n_present = np.amax(self.n_present)
+        self.stimulus_set = self.stimulus_set[:, 0:self.max_n_present]
+
+    def _set_known_configuration(self, config_idx, config_list):
+        """Set configuration data that is known to be valid.
+
+        Arguments:
+            config_idx: An integer array indicating the configuration
+                of each trial.
+                shape = (n_trial,)
+            config_list: A DataFrame of the unique configurations.
+
+        """
+        self.config_idx = np.asarray(config_idx)
+        self.config_list = config_list
+
     def _check_n_present(self, n_present):
         """Check the argument `n_present`.
 
@@ -79,6 +120,26 @@ class RateTrials(SimilarityTrials, metaclass=ABCMeta):
                 "two stimuli per trial."))
         return n_present
 
+    def compact(self, n_stimuli=None):
+        """Convert trial variables to compact dtypes (in place).
+
+        Extends `SimilarityTrials.compact`. The number of present
+        stimuli is stored using the narrowest dtype that accommodates
+        `max_n_present`.
+
+        Arguments:
+            n_stimuli (optional): See SimilarityTrials.
+
+        Returns:
+            self
+
+        """
+        SimilarityTrials.compact(self, n_stimuli)
+        self.n_present = self.n_present.astype(
+            compact_dtype(self.max_n_present), copy=False
+        )
+        return self
+
 
 class RateDocket(RateTrials):
     """Object that encapsulates unseen trials.
@@ -108,6 +169,10 @@ class RateDocket(RateTrials):
     Methods:
         save: Save the Docket object to disk.
         subset: Return a subset of unjudged trials given an index.
+        compact: Convert trial variables to compact dtypes.
+        to_arrow: Return the trials as a pyarrow.Table.
+        from_arrow: Create trials from a pyarrow.Table.
+        from_arrays: Create trials from trial arrays.
 
     """
 
@@ -135,7 +200,50 @@ class RateDocket(RateTrials):
             A new RateDocket object.
 
         """
-        return RateDocket(self.stimulus_set[index, :])
+        config_idx, config_list, _ = subset_configurations(
+            self.config_idx, self.config_list, index
+        )
+        return RateDocket.from_arrays(
+            self.stimulus_set[index, :], config_idx=config_idx,
+            config_list=config_list
+        )
+
+    @classmethod
+    def from_arrays(
+            cls, stimulus_set, config_idx=None, config_list=None,
+            validate=False):
+        """Create trials from trial arrays.
+
+        Unlike the constructor, the arrays are not validated (unless
+        requested) and known configuration data is reused. Use this
+        method for trials that are valid by construction, e.g., trials
+        derived from existing trials.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+            config_idx (optional): An integer array indicating the
+                known configuration of each trial. If provided,
+                `config_list` must also be provided.
+                shape = (n_trial,)
+            config_list (optional): A DataFrame of the known unique
+                configurations.
+            validate (optional): Boolean indicating if the arrays
+                should be validated. If True, the regular constructor
+                is used and the configuration data is re-derived.
+
+        Returns:
+            A new RateDocket object.
+
+        """
+        if validate:
+            return cls(stimulus_set)
+        trials = cls.__new__(cls)
+        trials._init_trusted(stimulus_set)
+        if config_idx is None:
+            trials._set_configuration_data(trials.n_present)
+        else:
+            trials._set_known_configuration(config_idx, config_list)
+        return trials
 
     def _set_configuration_data(self, n_present):
         """Generate a unique ID for each trial configuration.
@@ -156,38 +264,66 @@ class RateDocket(RateTrials):
                 trial configurations.
 
         """
-        n_trial = len(n_present)
-
         # Determine unique display configurations.
         d = {'n_present': n_present}
-        df_config = pd.DataFrame(d)
-        df_config = df_config.drop_duplicates()
-        n_config = len(df_config)
-
-        # Assign display configuration ID for every observation.
-        config_idx = np.empty(n_trial, dtype=np.int32)
-        for i_config in range(n_config):
-            # Find trials matching configuration.
-            a = (n_present == df_config['n_present'].iloc[i_config])
-            f = np.array((a))
-            display_type_locs = np.all(f, axis=0)
-            config_idx[display_type_locs] = i_config
+        config_idx, df_config = unique_configurations(d)
 
         self.config_idx = config_idx
         self.config_list = df_config
 
-    def save(self, filepath):
+    def save(self, filepath, compression=None):
         """Save the RateDocket object as an HDF5 file.
 
         Arguments:
             filepath: String specifying the path to save the data.
+            compression (optional): String indicating an HDF5
+                compression filter (e.g., 'gzip' or 'lzf'). If
+                provided, the data is chunked along the trial axis and
+                compressed. If None, the data is stored contiguously,
+                which allows it to be memory-mapped when loaded.
 
         """
         f = h5py.File(filepath, "w")
         f.create_dataset("trial_type", data="RateDocket")
-        f.create_dataset("stimulus_set", data=self.stimulus_set)
+        save_column(f, "stimulus_set", self.stimulus_set, compression)
         f.close()
 
+    def to_arrow(self):
+        """Return the trials as a pyarrow.Table.
+
+        Requires the optional dependency `pyarrow`. Numeric trial
+        variables are not copied. See `save_parquet`.
+
+        Returns:
+            table: A pyarrow.Table.
+
+        """
+        return arrow_table(
+            "RateDocket", [("stimulus_set", self.stimulus_set)]
+        )
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Create trials from a pyarrow.Table.
+
+        Numeric columns are converted to NumPy without copying where
+        possible. The stimulus set may be stored as a fixed-size or a
+        variable-length list column.
+
+        Arguments:
+            table: A pyarrow.Table (or pyarrow.RecordBatch), e.g., as
+                returned by `to_arrow`.
+
+        Returns:
+            A new RateDocket object.
+
+        """
+        columns = arrow_columns(table)
+        trials = RateDocket(columns["stimulus_set"])
+        if columns["stimulus_set"].dtype.itemsize < 4:
+            trials.compact()
+        return trials
+
     def as_dataset(self, group=None):
         """Return TensorFlow dataset.
 
@@ -219,7 +355,8 @@ class RateDocket(RateTrials):
 
         The stimulus_set of each SimilarityTrials object is padded
         first to match the maximum number of stimuli across all the
-        objects.
+        objects. The stacked arrays are allocated once, so the cost is
+        linear in the total number of trials.
 
         Arguments:
             trials_list: A tuple of RateTrials objects to be stacked.
@@ -229,37 +366,41 @@ class RateDocket(RateTrials):
 
         """
         # Determine the maximum number of stimuli present.
-        max_n_present = 0
-        for i_trials in trials_list:
-            if i_trials.max_n_present > max_n_present:
-                max_n_present = i_trials.max_n_present
-
-        # Grab relevant information from first entry in list.
-        stimulus_set = pad_2d_array(
-            trials_list[0].stimulus_set, max_n_present
-        )
-
-        for i_trials in trials_list[1:]:
-            stimulus_set = np.vstack((
-                stimulus_set,
-                pad_2d_array(i_trials.stimulus_set, max_n_present)
-            ))
-
-        trials_stacked = RateDocket(stimulus_set)
+        max_n_present = np.amax([
+            i_trials.max_n_present for i_trials in trials_list
+        ])
+
+        # Fill preallocated arrays once. The variables of each object
+        # have already been validated, so the constructor is bypassed.
+        trials_stacked = RateDocket.__new__(RateDocket)
+        _stack_trials(trials_stacked, trials_list, max_n_present, [])
         return trials_stacked
 
     @classmethod
-    def load(cls, filepath):
+    def load(cls, filepath, index=None, mmap_mode=None):
         """Load trials.
 
         Arguments:
             filepath: The location of the hdf5 file to load.
+            index (optional): An integer (or Boolean) array indicating
+                the subset of trials to load. Only the necessary
+                (chunks of) trials are read from disk.
+            mmap_mode (optional): Either 'r' (read-only) or 'c'
+                (copy-on-write). If not None, contiguous datasets are
+                memory-mapped instead of being read into memory.
+                Datasets saved with `compression` (or chunking) are
+                read into memory regardless. See `numpy.memmap`.
+
+        Raises:
+            ValueError: If `mmap_mode` is not None, 'r' or 'c'.
 
         """
         f = h5py.File(filepath, "r")
-        stimulus_set = f["stimulus_set"][()]
+        stimulus_set = load_column(f, "stimulus_set", index, mmap_mode)
         f.close()
         trials = RateDocket(stimulus_set)
+        if stimulus_set.dtype.itemsize < 4:
+            trials.compact()
         return trials
 
 
@@ -314,6 +455,12 @@ class RateObservations(RateTrials):
         set_group_id: Override the group ID of all trials.
         set_weight: Override the weight of all trials.
         save: Save the observations data structure to disk.
+        compact: Convert trial variables to compact dtypes.
+        compress: Collapse duplicate trials into weighted trials.
+        expand: Expand compressed trials.
+        to_arrow: Return the trials as a pyarrow.Table.
+        from_arrow: Create trials from a pyarrow.Table.
+        from_arrays: Create trials from trial arrays.
 
     """
 
@@ -388,6 +535,74 @@ class RateObservations(RateTrials):
         # Determine unique display configurations.
         self._set_configuration_data(self.n_present, group_id)
 
+    @classmethod
+    def from_arrays(
+            cls, stimulus_set, rating, group_id=None, agent_id=None,
+            session_id=None, weight=None, rt_ms=None, config_idx=None,
+            config_list=None, validate=False):
+        """Create observations from trial arrays.
+
+        Unlike the constructor, the arrays are not validated (unless
+        requested) and known configuration data is reused. Use this
+        method for observations that are valid by construction, e.g.,
+        simulated observations or observations derived from existing
+        observations.
+
+        Arguments:
+            stimulus_set: See `__init__`.
+            rating: See `__init__`.
+            group_id (optional): See `__init__`.
+            agent_id (optional): See `__init__`.
+            session_id (optional): See `__init__`.
+            weight (optional): See `__init__`.
+            rt_ms (optional): See `__init__`.
+            config_idx (optional): An integer array indicating the
+                known configuration of each trial. If provided,
+                `config_list` must also be provided.
+                shape = (n_trial,)
+            config_list (optional): A DataFrame of the known unique
+                configurations (including 'group_id' and
+                'session_id').
+            validate (optional): Boolean indicating if the arrays
+                should be validated. If True, the regular constructor
+                is used and the configuration data is re-derived.
+
+        Returns:
+            A new RateObservations object.
+
+        """
+        if validate:
+            return cls(
+                stimulus_set, rating, group_id=group_id, agent_id=agent_id,
+                session_id=session_id, weight=weight, rt_ms=rt_ms
+            )
+        obs = cls.__new__(cls)
+        obs._init_trusted(stimulus_set)
+        obs.rating = np.asarray(rating, dtype=np.float32)
+
+        n_trial = obs.n_trial
+        if group_id is None:
+            group_id = np.zeros((n_trial), dtype=np.int32)
+        obs.group_id = np.asarray(group_id)
+        if agent_id is None:
+            agent_id = np.zeros((n_trial), dtype=np.int32)
+        obs.agent_id = np.asarray(agent_id)
+        if session_id is None:
+            session_id = np.zeros((n_trial), dtype=np.int32)
+        obs.session_id = np.asarray(session_id)
+        if weight is None:
+            weight = np.ones((n_trial))
+        obs.weight = np.asarray(weight)
+        if rt_ms is None:
+            rt_ms = -np.ones((n_trial))
+        obs.rt_ms = np.asarray(rt_ms)
+
+        if config_idx is None:
+            obs._set_configuration_data(obs.n_present, obs.group_id)
+        else:
+            obs._set_known_configuration(config_idx, config_list)
+        return obs
+
     def _check_group_id(self, group_id):
         """Check the argument group_id."""
         group_id = group_id.astype(np.int32)
@@ -441,7 +656,7 @@ class RateObservations(RateTrials):
 
     def _check_weight(self, weight):
         """Check the argument weight."""
-        weight = weight.astype(np.float)
+        weight = weight.astype(np.float64)
         # Check shape agreement.
         if not (weight.shape[0] == self.n_trial):
             raise ValueError((
@@ -451,7 +666,7 @@ class RateObservations(RateTrials):
 
     def _check_rt(self, rt_ms):
         """Check the argument rt_ms."""
-        rt_ms = rt_ms.astype(np.float)
+        rt_ms = rt_ms.astype(np.float64)
         # Check shape agreement.
         if not (rt_ms.shape[0] == self.n_trial):
             raise ValueError((
@@ -460,21 +675,20 @@ class RateObservations(RateTrials):
         return rt_ms
 
     def subset(self, index):
-        """Return subset of trials as a new RateObservatiosn object.
+        """Return subset of trials as a new RateObservations object.
+
+        The subset is a lightweight view that only copies trial
+        variables when they are accessed (e.g., when the subset is
+        mutated or saved). See `SubsetView`.
 
         Arguments:
             index: The indices corresponding to the subset.
 
         Returns:
-            A new RateObservatiosn object.
+            A new RateObservations object.
 
         """
-        return RateObservatiosn(
-            self.stimulus_set[index, :], self.rating[index, :],
-            group_id=self.group_id[index], agent_id=self.agent_id[index],
-            session_id=self.session_id[index], weight=self.weight[index],
-            rt_ms=self.rt_ms[index]
-        )
+        return _RateObservationsView(self, index)
 
     def _set_configuration_data(self, n_present, group_id, session_id=None):
         """Generate a unique ID for each trial configuration.
@@ -515,21 +729,8 @@ class RateObservations(RateTrials):
         d = {
             'n_present': n_present, 'group_id': group_id,
             'session_id': session_id
-            }
-        df_config = pd.DataFrame(d)
-        df_config = df_config.drop_duplicates()
-        n_config = len(df_config)
-
-        # Assign display configuration index for every observation.
-        config_idx = np.empty(n_trial, dtype=np.int32)
-        for i_config in range(n_config):
-            # Find trials matching configuration.
-            a = (n_present == df_config['n_present'].iloc[i_config])
-            d = (group_id == df_config['group_id'].iloc[i_config])
-            e = (session_id == df_config['session_id'].iloc[i_config])
-            f = np.array((a, d, e))
-            display_type_locs = np.all(f, axis=0)
-            config_idx[display_type_locs] = i_config
+        }
+        config_idx, df_config = unique_configurations(d)
 
         self.config_idx = config_idx
         self.config_list = df_config
@@ -547,9 +748,10 @@ class RateObservations(RateTrials):
         else:
             group_id = self._check_group_id(group_id)
         self.group_id = copy.copy(group_id)
+        self._clear_cache()
 
         # Re-derive unique display configurations.
-        self._set_configuration_data(self.m_present, group_id)
+        self._set_configuration_data(self.n_present, group_id)
 
     def set_weight(self, weight):
         """Override the existing group_ids.
@@ -563,33 +765,205 @@ class RateObservations(RateTrials):
             weight = weight * np.ones((self.n_trial), dtype=np.int32)
         else:
             weight = self._check_weight(weight)
-        self.weight = copy.copy(weight)
+        # Preserve the (possibly compact) dtype.
+        self.weight = weight.astype(self.weight.dtype)
+        self._clear_cache()
+
+    def compact(self, n_stimuli=None):
+        """Convert trial variables to compact dtypes (in place).
+
+        Extends `RateTrials.compact`. The weight and response time of
+        each trial are stored as float32.
+
+        Arguments:
+            n_stimuli (optional): See SimilarityTrials.
+
+        Returns:
+            self
+
+        """
+        RateTrials.compact(self, n_stimuli)
+        self.weight = self.weight.astype(np.float32, copy=False)
+        self.rt_ms = self.rt_ms.astype(np.float32, copy=False)
+        return self
+
+    def compress(self, return_inverse=False):
+        """Collapse duplicate trials into weighted trials.
+
+        Two trials are duplicates if they share the same stimuli (in
+        any order), the same rating, and the same group and agent ID.
+        Each set of duplicates is replaced by a single trial whose
+        weight is the summed weight of the duplicates.
+
+        Arguments:
+            return_inverse (optional): Boolean indicating if the
+                compressed trial of every original trial should be
+                returned. See `expand`.
+
+        Returns:
+            obs: A new RateObservations object containing the unique
+                trials in order of first occurrence. The stimuli of
+                each trial are sorted. The session ID and response
+                time of a unique trial are taken from its first
+                occurrence.
+            inverse (optional): An integer array indicating the
+                compressed trial of every original trial.
+                shape=(n_trial,)
+
+        """
+        # Sort present stimuli, keeping placeholders last.
+        stimulus_set = np.asarray(self.stimulus_set)
+        order = np.lexsort(
+            (stimulus_set, np.less(stimulus_set, 0)), axis=-1
+        )
+        stimulus_set = np.take_along_axis(stimulus_set, order, axis=1)
+
+        idx_unique, inverse, weight = compress_trials(
+            [stimulus_set, self.rating, self.group_id, self.agent_id],
+            self.weight
+        )
+        obs = RateObservations.from_arrays(
+            stimulus_set[idx_unique], self.rating[idx_unique],
+            group_id=self.group_id[idx_unique],
+            agent_id=self.agent_id[idx_unique],
+            session_id=self.session_id[idx_unique], weight=weight,
+            rt_ms=self.rt_ms[idx_unique]
+        )
+        if self.stimulus_set.dtype.itemsize < 4:
+            obs.compact()
+        if return_inverse:
+            return obs, inverse
+        return obs
 
-    def save(self, filepath):
-        """Save the RateObservatiosn object as an HDF5 file.
+    def expand(self, index):
+        """Expand compressed trials.
+
+        Arguments:
+            index: An integer array indicating the compressed trial of
+                every expanded trial (e.g., the `inverse` returned by
+                `compress`).
+                shape=(n_trial,)
+
+        Returns:
+            obs: A new RateObservations object. The weight of each
+                compressed trial is split evenly among its copies.
+
+        """
+        index = np.asarray(index)
+        obs = self.subset(index)
+        obs.set_weight(expand_weight(np.asarray(self.weight), index))
+        return obs
+
+    def save(self, filepath, compression=None):
+        """Save the RateObservations object as an HDF5 file.
 
         Arguments:
             filepath: String specifying the path to save the data.
+            compression (optional): String indicating an HDF5
+                compression filter (e.g., 'gzip' or 'lzf'). If
+                provided, the data is chunked along the trial axis and
+                compressed. If None, the data is stored contiguously,
+                which allows it to be memory-mapped when loaded.
 
         """
         f = h5py.File(filepath, "w")
-        f.create_dataset("trial_type", data="RateObservatiosn")
-        f.create_dataset("stimulus_set", data=self.stimulus_set)
-        f.create_dataset("rating", data=self.rating)
-        f.create_dataset("group_id", data=self.group_id)
-        f.create_dataset("agent_id", data=self.agent_id)
-        f.create_dataset("session_id", data=self.session_id)
-        f.create_dataset("weight", data=self.weight)
-        f.create_dataset("rt_ms", data=self.rt_ms)
+        f.create_dataset("trial_type", data="RateObservations")
+        save_column(f, "stimulus_set", self.stimulus_set, compression)
+        save_column(f, "rating", self.rating, compression)
+        save_column(f, "group_id", self.group_id, compression)
+        save_column(f, "agent_id", self.agent_id, compression)
+        save_column(f, "session_id", self.session_id, compression)
+        save_column(f, "weight", self.weight, compression)
+        save_column(f, "rt_ms", self.rt_ms, compression)
         f.close()
 
-    def as_dataset(self):
+    def to_arrow(self):
+        """Return the trials as a pyarrow.Table.
+
+        Requires the optional dependency `pyarrow`. Numeric trial
+        variables are not copied. See `save_parquet`.
+
+        Returns:
+            table: A pyarrow.Table.
+
+        """
+        return arrow_table("RateObservations", [
+            ("stimulus_set", self.stimulus_set),
+            ("rating", self.rating),
+            ("group_id", self.group_id),
+            ("agent_id", self.agent_id),
+            ("session_id", self.session_id),
+            ("weight", self.weight),
+            ("rt_ms", self.rt_ms),
+        ])
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Create trials from a pyarrow.Table.
+
+        Numeric columns are converted to NumPy without copying where
+        possible. The stimulus set may be stored as a fixed-size or a
+        variable-length list column.
+
+        Arguments:
+            table: A pyarrow.Table (or pyarrow.RecordBatch), e.g., as
+                returned by `to_arrow`.
+
+        Returns:
+            A new RateObservations object.
+
+        """
+        columns = arrow_columns(table)
+        trials = RateObservations(
+            columns["stimulus_set"], columns["rating"],
+            group_id=columns.get("group_id"),
+            agent_id=columns.get("agent_id"),
+            session_id=columns.get("session_id"),
+            weight=columns.get("weight"), rt_ms=columns.get("rt_ms")
+        )
+        if columns["stimulus_set"].dtype.itemsize < 4:
+            trials.compact()
+        return trials
+
+    def as_dataset(self, chunk_size=None):
         """Format necessary data as Tensorflow.data.Dataset object.
 
+        Arguments:
+            chunk_size (optional): Integer indicating the number of
+                trials per chunk. If provided, the dataset is streamed
+                one chunk of trials at a time (rather than embedding
+                all trials in the graph), which bounds the memory
+                footprint when the trials are memory-mapped (see
+                `load`).
+
         Returns:
             ds_obs: The data necessary for inference, formatted as a
             tf.data.Dataset object.
 
+        """
+        if chunk_size is None:
+            x, y, w = self._dataset_arrays(0, self.n_trial)
+            ds_obs = widen_dataset(
+                tf.data.Dataset.from_tensor_slices((x, y, w))
+            )
+        else:
+            ds_obs = widen_dataset(chunked_dataset(
+                self._dataset_arrays, self.n_trial, chunk_size
+            )).unbatch()
+        return ds_obs
+
+    def _dataset_arrays(self, start, stop):
+        """Return the dataset arrays of a contiguous range of trials.
+
+        Arguments:
+            start: Integer indicating the first trial.
+            stop: Integer indicating the (exclusive) last trial.
+
+        Returns:
+            x: A dictionary of model inputs.
+            y: The model outputs.
+            w: The observation weights.
+
         """
         # NOTE: Should not use single dimension inputs. Add a singleton
         # dimensions if necessary, because restoring a SavedModel adds
@@ -598,25 +972,22 @@ class RateObservations(RateTrials):
         # problem.
         # NOTE: We use stimulus_set + 1, since TensorFlow requires "0", not
         # "-1" to indicate a masked value.
-        # NOTE: The dimensions of inputs are expanded to have an additional
-        # singleton third dimension to indicate that there is only one outcome
-        # that we are interested for each trial.
-        group_level_0 = np.zeros([self.group_id.shape[0]], dtype=np.int32)
-        
+        stimulus_set = np.asarray(self.stimulus_set[start:stop])
+        group_level_0 = np.zeros([stimulus_set.shape[0]], dtype=np.int32)
         x = {
-            'stimulus_set': self.stimulus_set + 1,
+            'stimulus_set': stimulus_set + 1,
             'group': np.stack(
-                (group_level_0, self.group_id, self.agent_id), axis=-1
-            )
+                (
+                    group_level_0, self.group_id[start:stop],
+                    self.agent_id[start:stop]
+                ), axis=-1
+            ).astype(np.int32)
         }
-        y = tf.constant(self.rating, dtype=K.floatx())
+        y = np.asarray(self.rating[start:stop], dtype=K.floatx())
 
         # Observation weight.
-        w = tf.constant(self.weight, dtype=K.floatx())
-
-        # Create dataset.
-        ds_obs = tf.data.Dataset.from_tensor_slices((x, y, w))
-        return ds_obs
+        w = np.asarray(self.weight[start:stop], dtype=K.floatx())
+        return x, y, w
 
     @classmethod
     def stack(cls, trials_list):
@@ -624,7 +995,8 @@ class RateObservations(RateTrials):
 
         The stimulus_set of each SimilarityTrials object is padded
         first to match the maximum number of present stimuli across all
-        the objects.
+        the objects. The stacked arrays are allocated once, so the cost
+        is linear in the total number of trials.
 
         Arguments:
             trials_list: A tuple of RateTrials objects to be stacked.
@@ -634,75 +1006,132 @@ class RateObservations(RateTrials):
 
         """
         # Determine the maximum number of stimuli present.
-        max_n_present = 0
-        for i_trials in trials_list:
-            if i_trials.max_n_present > max_n_present:
-                max_n_present = i_trials.max_n_present
-
-        # Grab relevant information from first entry in list.
-        stimulus_set = pad_2d_array(
-            trials_list[0].stimulus_set, max_n_present
-        )
-        rating = trials_list[0].rating
-        group_id = trials_list[0].group_id
-        agent_id = trials_list[0].agent_id
-        session_id = trials_list[0].session_id
-        weight = trials_list[0].weight
-        rt_ms = trials_list[0].rt_ms
-
-        for i_trials in trials_list[1:]:
-            stimulus_set = np.vstack((
-                stimulus_set,
-                pad_2d_array(i_trials.stimulus_set, max_n_present)
-            ))
-            rating = np.hstack((rating, i_trials.rating))
-            group_id = np.hstack((group_id, i_trials.group_id))
-            agent_id = np.hstack((agent_id, i_trials.agent_id))
-            session_id = np.hstack((session_id, i_trials.session_id))
-            weight = np.hstack((weight, i_trials.weight))
-            rt_ms = np.hstack((rt_ms, i_trials.rt_ms))
-
-        
-        trials_stacked = RateObservations(
-            stimulus_set, rating, group_id=group_id, agent_id=agent_id,
-            session_id=session_id, weight=weight, rt_ms=rt_ms
+        max_n_present = np.amax([
+            i_trials.max_n_present for i_trials in trials_list
+        ])
+
+        # Fill preallocated arrays once. The variables of each object
+        # have already been validated, so the constructor is bypassed.
+        trials_stacked = RateObservations.__new__(RateObservations)
+        _stack_trials(
+            trials_stacked, trials_list, max_n_present, [
+                'rating', 'group_id', 'agent_id', 'session_id', 'weight',
+                'rt_ms'
+            ]
         )
         return trials_stacked
 
     @classmethod
-    def load(cls, filepath):
+    def load(cls, filepath, index=None, mmap_mode=None):
         """Load trials.
 
         Arguments:
             filepath: The location of the hdf5 file to load.
+            index (optional): An integer (or Boolean) array indicating
+                the subset of trials to load. Only the necessary
+                (chunks of) trials are read from disk.
+            mmap_mode (optional): Either 'r' (read-only) or 'c'
+                (copy-on-write). If not None, contiguous datasets are
+                memory-mapped instead of being read into memory.
+                Datasets saved with `compression` (or chunking) are
+                read into memory regardless. See `numpy.memmap`.
+
+        Raises:
+            ValueError: If `mmap_mode` is not None, 'r' or 'c'.
 
         """
         f = h5py.File(filepath, "r")
-        stimulus_set = f["stimulus_set"][()]
-        rating = f["rating"][()]
-        group_id = f["group_id"][()]
+        stimulus_set = load_column(f, "stimulus_set", index, mmap_mode)
+        rating = load_column(f, "rating", index, mmap_mode)
+        group_id = load_column(f, "group_id", index, mmap_mode)
 
         # For backwards compatability.
         if "weight" in f:
-            weight = f["weight"][()]
+            weight = load_column(f, "weight", index, mmap_mode)
         else:
-            weight = np.ones((len(n_select)))
+            weight = np.ones((len(rating)))
         if "rt_ms" in f:
-            rt_ms = f["rt_ms"][()]
+            rt_ms = load_column(f, "rt_ms", index, mmap_mode)
         else:
-            rt_ms = -np.ones((len(n_select)))
+            rt_ms = -np.ones((len(rating)))
         if "agent_id" in f:
-            agent_id = f["agent_id"][()]
+            agent_id = load_column(f, "agent_id", index, mmap_mode)
         else:
-            agent_id = np.zeros((len(n_select)))
+            agent_id = np.zeros((len(rating)))
         if "session_id" in f:
-            session_id = f["session_id"][()]
+            session_id = load_column(f, "session_id", index, mmap_mode)
         else:
-            session_id = np.zeros((len(n_select)))
+            session_id = np.zeros((len(rating)))
         f.close()
 
         trials = RateObservations(
-            stimulus_set, group_id=group_id, agent_id=agent_id,
+            stimulus_set, rating, group_id=group_id, agent_id=agent_id,
             session_id=session_id, weight=weight, rt_ms=rt_ms
         )
+        if stimulus_set.dtype.itemsize < 4:
+            trials.compact()
         return trials
+
+
+class _RateObservationsView(SubsetView, RateObservations):
+    """A lazily materialized subset of RateObservations."""
+
+    def __init__(self, parent, index):
+        """Initialize.
+
+        Arguments:
+            parent: A RateObservations object.
+            index: The indices corresponding to the subset.
+
+        """
+        self._init_view(parent, index, [
+            'stimulus_set', 'n_present', 'rating', 'group_id', 'agent_id',
+            'session_id', 'weight', 'rt_ms'
+        ])
+
+        # Derive configurations from the configuration table of parent.
+        config_idx, config_list, _ = subset_configurations(
+            parent.config_idx, parent.config_list, index
+        )
+        self.config_idx = config_idx
+        self.config_list = config_list
+        self.outcome_idx_list = None
+
+        # Trim trailing placeholder columns of the stimulus set (without
+        # a copy).
+        self.max_n_present = np.amax(config_list['n_present'].values)
+        arr, arr_index = self._view_var['stimulus_set']
+        self._view_var['stimulus_set'] = (
+            arr[:, 0:self.max_n_present], arr_index
+        )
+
+
+def _stack_trials(trials_stacked, trials_list, max_n_present, var_list):
+    """Populate a stacked trials object.
+
+    Arguments:
+        trials_stacked: An uninitialized RateTrials object (modified
+            in place).
+        trials_list: A tuple of RateTrials objects to be stacked.
+        max_n_present: Integer indicating the maximum number of stimuli
+            present across all objects.
+        var_list: A list of additional 1D trial variables to stack.
+
+    """
+    trials_stacked.stimulus_set = stack_stimulus_set(
+        [i_trials.stimulus_set for i_trials in trials_list], max_n_present
+    )
+    trials_stacked.n_trial = trials_stacked.stimulus_set.shape[0]
+    trials_stacked.max_n_present = max_n_present
+    for var_name in ['n_present'] + var_list:
+        setattr(trials_stacked, var_name, np.concatenate([
+            getattr(i_trials, var_name) for i_trials in trials_list
+        ]))
+
+    # Merge configurations of each object.
+    config_idx, config_list, _ = stack_configurations(
+        [i_trials.config_list for i_trials in trials_list],
+        [i_trials.config_idx for i_trials in trials_list]
+    )
+    trials_stacked.config_idx = config_idx
+    trials_stacked.config_list = config_list
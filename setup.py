@@ -20,8 +20,11 @@ setuptools.setup(
     python_requires='>=3, <3.9',
     install_requires=[
         'tensorflow==2.3.1', 'tensorflow-probability==0.11.0', 'pandas',
-        'scikit-learn', 'matplotlib', 'pillow', 'imageio'
+        'scipy', 'scikit-learn', 'matplotlib', 'pillow', 'imageio'
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
     include_package_data=True,
     url='https://github.com/roads/psiz',
     download_url='https://github.com/roads/psiz/archive/v0.4.1.tar.gz'
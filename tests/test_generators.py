@@ -23,6 +23,7 @@ Todo:
 
 import numpy as np
 import pytest
+from scipy import sparse
 import tensorflow as tf
 import tensorflow_probability as tfp
 
@@ -336,3 +337,26 @@ def test_choice_wo_replace():
 #         n_trial_desired, n_stimuli_desired)
 #     unjudged_trials = psiz.trials.stack((unjudged_trials_0, unjudged_trials_1))
 #     return unjudged_trials
+
+
+def test_sparse_r_priority():
+    """Test the implicit elements of a sparse reference priority."""
+    from psiz.generators.similarity.rank.active_rank import _priority_row
+
+    r_priority = np.array(((0., .5, 0.), (.25, 0., 0.), (0., 0., 0.)))
+    r_priority_sparse = sparse.csr_matrix(r_priority)
+
+    # Implicit elements are zero by default.
+    for query_idx in range(3):
+        np.testing.assert_array_equal(
+            _priority_row(r_priority_sparse, query_idx, 0.),
+            r_priority[query_idx]
+        )
+
+    # Implicit elements of coverage-based priorities are one.
+    stimulus_set = np.array(((0, 1, 2), (0, 1, -1), (1, 0, 2)))
+    coverage = psiz.trials.similarity.base.StimulusCoverage().update(
+        stimulus_set
+    )
+    r_priority_q = _priority_row(coverage.r_priority(4), 0, 1.)
+    np.testing.assert_allclose(r_priority_q, (1., 1. / 3., .5, 1.))
@@ -121,6 +121,666 @@ def test_propogation_properties(rank_1g_vi):
     #     emb.mu = 0
 
 
+@pytest.fixture(scope="module")
+def rank_1g_mle_det():
+    n_stimuli = 10
+    n_dim = 2
+
+    embedding = tf.keras.layers.Embedding(
+        n_stimuli+1, n_dim, mask_zero=True
+    )
+    embedding.build([None, None, None])
+    np.random.seed(252)
+    z = np.random.normal(size=[n_stimuli + 1, n_dim]).astype(np.float32)
+    embedding.embeddings.assign(z)
+    stimuli = psiz.keras.layers.Stimuli(embedding=embedding)
+
+    kernel = psiz.keras.layers.Kernel(
+        distance=psiz.keras.layers.WeightedMinkowski(
+            rho_initializer=tf.keras.initializers.Constant(2.),
+            trainable=False,
+        ),
+        similarity=psiz.keras.layers.ExponentialSimilarity(
+            fit_tau=False, fit_gamma=False, fit_beta=False,
+            tau_initializer=tf.keras.initializers.Constant(1.),
+            gamma_initializer=tf.keras.initializers.Constant(0.),
+            beta_initializer=tf.keras.initializers.Constant(1.),
+        )
+    )
+
+    model = psiz.models.Rank(stimuli=stimuli, kernel=kernel)
+    return model
+
+
+@pytest.fixture(scope="module")
+def obs_mixed():
+    """Return judged trials with a mix of configurations."""
+    stimulus_set = np.array((
+        (0, 1, 2, 7, 3),
+        (3, 4, 5, 9, 1),
+        (1, 8, 9, 2, -1),
+        (7, 3, 2, 8, -1),
+        (6, 7, 5, 0, -1),
+        (2, 1, 0, 6, -1),
+        (3, 0, 2, -1, -1),
+    ))
+    n_select = np.array((2, 2, 2, 1, 1, 1, 1), dtype=np.int32)
+    obs = psiz.trials.RankObservations(stimulus_set, n_select=n_select)
+    return obs
+
+
+def test_observed_outcome_only(rank_1g_mle_det, obs_mixed):
+    """Test that observed-only inputs yield the observed probability."""
+    model = rank_1g_mle_det
+
+    x_all, _, _ = next(iter(
+        obs_mixed.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    ))
+    prob_all = model(x_all, training=False).numpy()
+
+    x_obs, y_obs, _ = next(iter(
+        obs_mixed.as_dataset(all_outcomes=False).batch(obs_mixed.n_trial)
+    ))
+    prob_obs = model(x_obs, training=False).numpy()
+
+    assert prob_obs.shape == (1, obs_mixed.n_trial, 1)
+    assert y_obs.shape == (obs_mixed.n_trial, 1)
+    np.testing.assert_allclose(
+        prob_obs[:, :, 0], prob_all[:, :, 0], rtol=1e-5
+    )
+    # Sanity check that the probability is not trivially one.
+    assert np.all(prob_obs < 1.)
+
+
+def test_bucketed_dataset(rank_1g_mle_det, obs_mixed):
+    """Test that bucketed batches are padded to their own shape."""
+    model = rank_1g_mle_det
+
+    x, _, _ = next(iter(
+        obs_mixed.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    ))
+    prob = model(x, training=False).numpy()
+
+    ds = obs_mixed.as_dataset(all_outcomes=True, bucket_size=2)
+    shape_list = []
+    prob_bucket = []
+    for x_bucket, y_bucket, _ in ds:
+        shape_list.append(tuple(x_bucket['outcome_idx'].shape))
+        assert y_bucket.shape[1] == x_bucket['outcome_idx'].shape[2]
+        prob_bucket.append(model(x_bucket, training=False).numpy()[0])
+    assert shape_list == [
+        (1, 3, 2), (2, 4, 3), (1, 4, 3), (1, 4, 6), (2, 5, 12)
+    ]
+
+    # Buckets are ordered by shape and preserve the trial order within a
+    # bucket.
+    trial_order = np.array((6, 3, 4, 5, 2, 0, 1))
+    np.testing.assert_allclose(
+        np.hstack([p[:, 0] for p in prob_bucket]), prob[0, trial_order, 0],
+        rtol=1e-5
+    )
+    for p in prob_bucket:
+        np.testing.assert_allclose(np.sum(p, axis=1), 1., rtol=1e-5)
+
+
+def test_ragged_dataset(rank_1g_mle_det, obs_mixed):
+    """Test that ragged stimulus sets match padded stimulus sets."""
+    model = rank_1g_mle_det
+
+    for all_outcomes in [True, False]:
+        x, _, _ = next(iter(
+            obs_mixed.as_dataset(all_outcomes=all_outcomes).batch(
+                obs_mixed.n_trial
+            )
+        ))
+        prob = model(x, training=False).numpy()
+
+        ds = obs_mixed.as_dataset(all_outcomes=all_outcomes, ragged=True)
+        x_ragged, _, _ = next(iter(ds.batch(obs_mixed.n_trial)))
+        assert isinstance(x_ragged['stimulus_set'], tf.RaggedTensor)
+        np.testing.assert_array_equal(
+            x_ragged['stimulus_set'].row_lengths().numpy(),
+            obs_mixed.n_reference + 1
+        )
+        prob_ragged = model(x_ragged, training=False).numpy()
+        np.testing.assert_allclose(prob_ragged, prob, rtol=1e-5, atol=1e-7)
+
+        # Chunked pipelines yield the same batches.
+        ds = obs_mixed.as_dataset(
+            all_outcomes=all_outcomes, chunk_size=3, ragged=True
+        )
+        x_chunk, _, _ = next(iter(ds.batch(obs_mixed.n_trial)))
+        prob_chunk = model(x_chunk, training=False).numpy()
+        np.testing.assert_allclose(prob_chunk, prob, rtol=1e-5, atol=1e-7)
+
+    # Ragged batches of a bucketed dataset.
+    ds = obs_mixed.as_dataset(bucket_size=2, ragged=True)
+    for x_bucket, _, _ in ds:
+        prob_bucket = model(x_bucket, training=False).numpy()
+        np.testing.assert_allclose(
+            np.sum(prob_bucket, axis=2), 1., rtol=1e-5
+        )
+
+
+def test_fit_pipeline(rank_1g_mle_det, obs_mixed, tmp_path):
+    """Test cached and seeded input pipeline of `Proxy.fit`."""
+    # Seeded bucket shuffling is reproducible.
+    stimulus_set_list = []
+    for _ in range(2):
+        ds = obs_mixed.as_dataset(
+            bucket_size=2, shuffle=True, seed=252, cache=True
+        )
+        stimulus_set_list.append(
+            np.hstack([x['stimulus_set'][:, 0].numpy() for x, _, _ in ds])
+        )
+    np.testing.assert_array_equal(
+        stimulus_set_list[0], stimulus_set_list[1]
+    )
+
+    compile_kwargs = {
+        'loss': tf.keras.losses.CategoricalCrossentropy(),
+        'optimizer': tf.keras.optimizers.Adam(learning_rate=.001),
+    }
+    for bucket_by_config in [False, True]:
+        proxy = psiz.models.Proxy(model=rank_1g_mle_det)
+        restart_record = proxy.fit(
+            obs_mixed, batch_size=4, validation_data=obs_mixed,
+            n_restart=2, epochs=2, compile_kwargs=dict(compile_kwargs),
+            bucket_by_config=bucket_by_config, seed=252, cache=True
+        )
+        assert np.all(restart_record.record['trials_per_s'] > 0.)
+        assert np.all(np.isfinite(restart_record.record['val_loss']))
+
+    # File caches are keyed by the data, so different observations do
+    # not reuse the same cache files.
+    cache = str(tmp_path / 'obs')
+    obs_subset = obs_mixed.subset(np.arange(obs_mixed.n_trial - 1))
+    prefix_list = [
+        psiz.models.base._cache_prefix(cache, 'train', obs, {})
+        for obs in [obs_mixed, obs_subset, obs_mixed]
+    ]
+    assert prefix_list[0] != prefix_list[1]
+    assert prefix_list[0] == prefix_list[2]
+    assert psiz.models.base._cache_prefix(
+        cache, 'train', obs_mixed, {'all_outcomes': False}
+    ) != prefix_list[0]
+    proxy = psiz.models.Proxy(model=rank_1g_mle_det)
+    for obs in [obs_mixed, obs_subset]:
+        proxy.fit(
+            obs, batch_size=4, n_restart=1, epochs=1, verbose=0, cache=cache,
+            compile_kwargs=dict(compile_kwargs)
+        )
+        assert np.all(np.isfinite(proxy.evaluate(obs, verbose=0, cache=cache)))
+
+
+def test_jit_compile(rank_1g_mle_det, obs_mixed):
+    """Test that XLA-compiled steps match the default steps."""
+    model = rank_1g_mle_det
+    model.compile(
+        loss=tf.keras.losses.CategoricalCrossentropy(),
+        optimizer=tf.keras.optimizers.SGD(learning_rate=0.)
+    )
+    ds = obs_mixed.as_dataset(all_outcomes=True).batch(3)
+    prob = model.predict(ds)
+    loss = model.evaluate(ds, verbose=0)
+
+    model.jit_compile = True
+    try:
+        assert model.get_config()['jit_compile']
+        np.testing.assert_allclose(model.predict(ds), prob, rtol=1e-5)
+        np.testing.assert_allclose(
+            model.evaluate(ds, verbose=0), loss, rtol=1e-5
+        )
+        # Batches of different size reuse the compiled functions.
+        model.fit(ds, epochs=1, verbose=0)
+        assert len(model._step_functions) == 3
+    finally:
+        model.jit_compile = False
+
+
+def test_jit_compile_shapes(rank_1g_mle_det, obs_mixed):
+    """Test XLA-compiled steps on datasets of different shape."""
+    model = rank_1g_mle_det
+    model.compile(
+        loss=tf.keras.losses.CategoricalCrossentropy(),
+        optimizer=tf.keras.optimizers.SGD(learning_rate=0.)
+    )
+    obs_small = psiz.trials.RankObservations(
+        np.array(((0, 1, 2, 7), (3, 4, 5, 9), (6, 7, 5, 0))),
+        n_select=np.array((2, 1, 1), dtype=np.int32)
+    )
+    assert obs_small.max_n_reference != obs_mixed.max_n_reference
+    ds_list = [
+        obs_mixed.as_dataset(all_outcomes=True).batch(3),
+        obs_small.as_dataset(all_outcomes=True).batch(3),
+    ]
+    loss_list = [model.evaluate(ds, verbose=0) for ds in ds_list]
+
+    model.jit_compile = True
+    try:
+        model.fit(ds_list[0], validation_data=ds_list[1], verbose=0)
+        for ds, loss in zip(ds_list, loss_list):
+            np.testing.assert_allclose(
+                model.evaluate(ds, verbose=0), loss, rtol=1e-5
+            )
+    finally:
+        model.jit_compile = False
+
+
+def _build_rank(
+        n_stimuli, n_dim, embeddings_constraint=None, centered=True,
+        **kwargs):
+    """Return a Rank model with a fixed initial embedding."""
+    embedding = tf.keras.layers.Embedding(
+        n_stimuli+1, n_dim, mask_zero=True,
+        embeddings_constraint=embeddings_constraint
+    )
+    embedding.build([None, None, None])
+    np.random.seed(252)
+    z = np.random.normal(size=[n_stimuli + 1, n_dim]).astype(np.float32)
+    if centered:
+        z = z - np.mean(z, axis=0, keepdims=True)
+    embedding.embeddings.assign(z)
+    stimuli = psiz.keras.layers.Stimuli(embedding=embedding)
+    kernel = psiz.keras.layers.Kernel(
+        similarity=psiz.keras.layers.ExponentialSimilarity()
+    )
+    return psiz.models.Rank(stimuli=stimuli, kernel=kernel, **kwargs)
+
+
+def test_sparse_update(obs_mixed):
+    """Test sparse embedding updates."""
+    n_stimuli = 20
+    n_dim = 3
+    ds = obs_mixed.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    loss = tf.keras.losses.CategoricalCrossentropy()
+
+    # Plain SGD yields the same update as the dense path.
+    z_list = []
+    for sparse_update in [False, True]:
+        model = _build_rank(n_stimuli, n_dim, sparse_update=sparse_update)
+        model.compile(
+            loss=loss, optimizer=tf.keras.optimizers.SGD(learning_rate=.1)
+        )
+        model.fit(ds, epochs=2, verbose=0)
+        z_list.append(model.stimuli.embeddings.numpy())
+    np.testing.assert_allclose(z_list[1], z_list[0], rtol=1e-5, atol=1e-6)
+
+    # Row-wise constraints and lazy optimizer slots only touch the rows
+    # of the batch.
+    model = _build_rank(
+        n_stimuli, n_dim,
+        embeddings_constraint=psiz.keras.constraints.Center(axis=0),
+        sparse_update=True
+    )
+    model.compile(
+        loss=loss, optimizer=psiz.keras.optimizers.LazyAdam(learning_rate=.1)
+    )
+    z_0 = model.stimuli.embeddings.numpy()
+    model.fit(ds, epochs=2, verbose=0)
+    z_1 = model.stimuli.embeddings.numpy()
+    idx_untouched = np.setdiff1d(
+        np.arange(n_stimuli + 1), obs_mixed.stimulus_set + 1
+    )
+    np.testing.assert_array_equal(z_1[idx_untouched], z_0[idx_untouched])
+    assert not np.allclose(z_1, z_0)
+    np.testing.assert_allclose(np.mean(z_1, axis=0), 0., atol=1e-6)
+
+    # An embedding that is not centered initially is centered at the
+    # start of `fit`.
+    model = _build_rank(
+        n_stimuli, n_dim,
+        embeddings_constraint=psiz.keras.constraints.Center(axis=-2),
+        centered=False, sparse_update=True
+    )
+    model.compile(
+        loss=loss, optimizer=tf.keras.optimizers.SGD(learning_rate=.1)
+    )
+    assert np.any(
+        np.abs(np.mean(model.stimuli.embeddings.numpy(), axis=0)) > 1e-3
+    )
+    model.fit(ds, epochs=2, verbose=0)
+    np.testing.assert_allclose(
+        np.mean(model.stimuli.embeddings.numpy(), axis=0), 0., atol=1e-6
+    )
+
+
+def test_rowwise_constraints():
+    """Test row-wise application of constraints."""
+    w_old = np.random.uniform(-1., 1., size=[4, 3]).astype(np.float32)
+    w = np.random.uniform(-1.5, 1.5, size=[4, 3]).astype(np.float32)
+    for constraint in [
+        psiz.keras.constraints.MinMax(-1., 1.),
+        psiz.keras.constraints.NonNegNorm(axis=1),
+        psiz.keras.constraints.NonNegNorm(axis=-1),
+    ]:
+        assert constraint.is_rowwise(2)
+        np.testing.assert_allclose(
+            constraint.call_rows(w, w_old).numpy(), constraint(w).numpy()
+        )
+    assert not psiz.keras.constraints.NonNegNorm(axis=0).is_rowwise(2)
+    assert not psiz.keras.constraints.NonNegNorm(axis=-2).is_rowwise(2)
+
+    for axis in [0, -2]:
+        constraint = psiz.keras.constraints.Center(axis=axis)
+        rows = constraint.call_rows(w, w_old).numpy()
+        np.testing.assert_allclose(
+            np.sum(rows, axis=0), np.sum(w_old, axis=0), atol=1e-5
+        )
+
+
+def test_mixed_precision(rank_1g_mle_det, obs_mixed):
+    """Test that a reduced precision kernel yields the same loss."""
+    model = rank_1g_mle_det
+    model.compile(
+        loss=tf.keras.losses.CategoricalCrossentropy(),
+        optimizer=tf.keras.optimizers.SGD(learning_rate=0.)
+    )
+    ds = obs_mixed.as_dataset(all_outcomes=True).batch(3)
+    loss = model.evaluate(ds, verbose=0)
+
+    policy = tf.keras.mixed_precision.experimental.Policy('mixed_bfloat16')
+    kernel = psiz.keras.layers.Kernel(
+        distance=psiz.keras.layers.WeightedMinkowski(
+            rho_initializer=tf.keras.initializers.Constant(2.),
+            trainable=False, dtype=policy
+        ),
+        similarity=psiz.keras.layers.ExponentialSimilarity(
+            fit_tau=False, fit_gamma=False, fit_beta=False,
+            tau_initializer=tf.keras.initializers.Constant(1.),
+            gamma_initializer=tf.keras.initializers.Constant(0.),
+            beta_initializer=tf.keras.initializers.Constant(1.),
+            dtype=policy
+        ),
+        dtype=policy
+    )
+    model_mixed = psiz.models.Rank(stimuli=model.stimuli, kernel=kernel)
+    model_mixed.compile(
+        loss=tf.keras.losses.CategoricalCrossentropy(),
+        optimizer=tf.keras.optimizers.SGD(learning_rate=0.)
+    )
+    assert model_mixed.behavior.dtype == tf.keras.backend.floatx()
+
+    x, _, _ = next(iter(ds))
+    prob = model_mixed(x)
+    assert prob.dtype == tf.keras.backend.floatx()
+    np.testing.assert_allclose(
+        model_mixed.evaluate(ds, verbose=0), loss, rtol=1e-2
+    )
+    model_mixed.fit(ds, epochs=1, verbose=0)
+    assert kernel.distance.rho.dtype == tf.keras.backend.floatx()
+
+
+def _rank_log_prob_reference(
+        z_q, z_r, w, rho, tau, beta, gamma, is_present, is_select):
+    """Return the log-probability of ranked selections using autodiff."""
+    eps = tf.keras.backend.epsilon()
+    d_qr = tf.pow(
+        tf.reduce_sum(w * tf.pow(tf.abs(z_q - z_r), rho), axis=-1),
+        1. / rho
+    )
+    sim_qr = (tf.exp(-beta * tf.pow(d_qr, tau)) + gamma) * is_present
+    denom = tf.cumsum(sim_qr, axis=2, reverse=True)
+    log_prob = (
+        tf.math.log(tf.maximum(sim_qr, eps)) -
+        tf.math.log(tf.maximum(denom, eps))
+    )
+    return tf.reduce_sum(is_select * log_prob, axis=2)
+
+
+def test_exponential_rank_log_prob():
+    """Test the fused op against an autodiff reference."""
+    np.random.seed(252)
+    sample_size = 2
+    batch_size = 3
+    n_reference = 4
+    n_outcome = 2
+    n_dim = 3
+    z_q = tf.constant(np.random.normal(
+        size=[sample_size, batch_size, 1, n_outcome, n_dim]
+    ))
+    z_r = tf.constant(np.random.normal(
+        size=[sample_size, batch_size, n_reference, n_outcome, n_dim]
+    ))
+    w = tf.constant(np.random.uniform(
+        .5, 1.5, size=[sample_size, batch_size, 1, 1, n_dim]
+    ))
+    theta = [
+        tf.constant(1.7, dtype=tf.float64),  # rho
+        tf.constant(1.3, dtype=tf.float64),  # tau
+        tf.constant(2., dtype=tf.float64),  # beta
+        tf.constant(.01, dtype=tf.float64),  # gamma
+    ]
+    is_present = np.ones([batch_size, n_reference, n_outcome])
+    is_present[1, 3, :] = 0.
+    is_select = np.zeros([batch_size, n_reference, n_outcome])
+    is_select[:, 0, :] = 1.
+    is_select[0, 1, :] = 1.
+    masks = [tf.constant(is_present), tf.constant(is_select)]
+
+    value_list = []
+    grad_list = []
+    for fn in [
+        psiz.keras.layers.ops.core.exponential_rank_log_prob,
+        _rank_log_prob_reference
+    ]:
+        args = [z_q, z_r, w] + theta
+        with tf.GradientTape() as tape:
+            tape.watch(args)
+            seq_log_prob = fn(*(args + masks))
+            loss = tf.reduce_sum(seq_log_prob * np.arange(1., n_outcome + 1))
+        value_list.append(seq_log_prob.numpy())
+        grad_list.append([grad.numpy() for grad in tape.gradient(loss, args)])
+    np.testing.assert_allclose(value_list[0], value_list[1], rtol=1e-6)
+    for grad, grad_desired in zip(grad_list[0], grad_list[1]):
+        np.testing.assert_allclose(grad, grad_desired, rtol=1e-4, atol=1e-6)
+
+
+def test_fused(obs_mixed, monkeypatch):
+    """Test that the fused op matches the unfused computation."""
+    n_call = [0]
+    fused_op = psiz.models.rank.exponential_rank_log_prob
+
+    def _counted_op(*args):
+        n_call[0] += 1
+        return fused_op(*args)
+
+    monkeypatch.setattr(
+        psiz.models.rank, 'exponential_rank_log_prob', _counted_op
+    )
+
+    is_ranked = np.ones([obs_mixed.n_trial], dtype=bool)
+    is_ranked[[0, 2]] = False
+    obs_unranked = psiz.trials.RankObservations(
+        obs_mixed.stimulus_set, n_select=obs_mixed.n_select,
+        is_ranked=is_ranked
+    )
+
+    model = _build_rank(20, 3)
+    for obs, all_outcomes, is_fused in [
+            (obs_mixed, True, True), (obs_mixed, False, True),
+            (obs_unranked, True, False)]:
+        x, y, _ = next(iter(
+            obs.as_dataset(all_outcomes=all_outcomes).batch(obs.n_trial)
+        ))
+        assert 'is_ranked' in x
+        prob_list = []
+        grad_list = []
+        for fused in [False, True]:
+            model.fused = fused
+            n_call[0] = 0
+            with tf.GradientTape() as tape:
+                prob = model(x)
+                loss = -tf.reduce_sum(
+                    y * tf.math.log(tf.reduce_mean(prob, axis=0))
+                )
+            # The fused op only runs for batches of ranked trials.
+            assert n_call[0] == int(fused and is_fused)
+            prob_list.append(prob.numpy())
+            grad_list.append([
+                tf.convert_to_tensor(grad).numpy() for grad in
+                tape.gradient(loss, model.trainable_variables)
+            ])
+        np.testing.assert_allclose(prob_list[1], prob_list[0], rtol=1e-5)
+        for grad_fused, grad in zip(grad_list[1], grad_list[0]):
+            np.testing.assert_allclose(
+                grad_fused, grad, rtol=1e-4, atol=1e-6
+            )
+    assert model.get_config()['fused']
+    model.fused = False
+
+    with pytest.raises(ValueError):
+        psiz.models.Rank(
+            stimuli=model.stimuli,
+            kernel=psiz.keras.layers.Kernel(
+                similarity=psiz.keras.layers.InverseSimilarity()
+            ),
+            fused=True
+        )
+
+
+def test_minkowski_fast_paths():
+    """Test that fixed-rho distances match the general computation."""
+    np.random.seed(252)
+    z = tf.constant(np.random.normal(size=[1, 2, 5, 3]), dtype=tf.float32)
+    w = tf.constant(
+        np.random.uniform(.5, 1.5, size=[1, 2, 1, 1, 3]), dtype=tf.float32
+    )
+    # All pairs (pairwise) and element-wise pairs (broadcast).
+    input_list = [
+        [tf.expand_dims(z, axis=3), tf.expand_dims(z, axis=2)],
+        [tf.expand_dims(z, axis=3), tf.expand_dims(z[:, :, ::-1], axis=3)],
+    ]
+    for rho in [1., 2.]:
+        initializer = tf.keras.initializers.Constant(rho)
+        distance = psiz.keras.layers.WeightedMinkowski(
+            rho_initializer=initializer
+        )
+        distance_fixed = psiz.keras.layers.WeightedMinkowski(
+            rho_initializer=initializer, trainable=False
+        )
+        for z_0, z_1 in input_list:
+            d_list = []
+            grad_list = []
+            for layer in [distance, distance_fixed]:
+                with tf.GradientTape() as tape:
+                    tape.watch([z_0, z_1])
+                    d_qr = layer([z_0, z_1, w])
+                    loss = tf.reduce_sum(d_qr**2)
+                d_list.append(d_qr.numpy())
+                grad_list.append(tape.gradient(loss, [z_0, z_1]))
+            # NOTE: The matrix multiplication expansion is less accurate
+            # for (near) identical vectors.
+            np.testing.assert_allclose(
+                d_list[1], d_list[0], rtol=1e-5, atol=1e-3
+            )
+            for grad_fixed, grad in zip(grad_list[1], grad_list[0]):
+                np.testing.assert_allclose(
+                    grad_fixed.numpy(), grad.numpy(), rtol=1e-4, atol=1e-4
+                )
+
+    # A non-trainable `rho` other than one or two uses the general op.
+    distance_fixed.rho.assign(3.)
+    distance.rho.assign(3.)
+    z_0, z_1 = input_list[0]
+    np.testing.assert_allclose(
+        distance_fixed([z_0, z_1, w]).numpy(),
+        distance([z_0, z_1, w]).numpy(), rtol=1e-5
+    )
+
+
+def test_fit_frozen_rho(obs_mixed):
+    """Test fitting a model with a non-trainable rho."""
+    for rho in [1., 2., 3.]:
+        kernel = psiz.keras.layers.Kernel(
+            distance=psiz.keras.layers.WeightedMinkowski(
+                rho_initializer=tf.keras.initializers.Constant(rho),
+                trainable=False,
+            ),
+            similarity=psiz.keras.layers.ExponentialSimilarity(
+                fit_tau=False, fit_gamma=False, fit_beta=False,
+                tau_initializer=tf.keras.initializers.Constant(1.),
+                gamma_initializer=tf.keras.initializers.Constant(0.),
+                beta_initializer=tf.keras.initializers.Constant(1.),
+            )
+        )
+        stimuli = psiz.keras.layers.Stimuli(
+            embedding=tf.keras.layers.Embedding(11, 2, mask_zero=True)
+        )
+        model = psiz.models.Rank(stimuli=stimuli, kernel=kernel)
+        model.compile(
+            loss=tf.keras.losses.CategoricalCrossentropy(),
+            optimizer=tf.keras.optimizers.Adam(learning_rate=.001)
+        )
+        ds = obs_mixed.as_dataset(all_outcomes=True).batch(4)
+        history = model.fit(ds, epochs=2, verbose=0)
+        assert np.all(np.isfinite(history.history['loss']))
+
+
+def test_outcome_idx(rank_1g_mle_det, obs_mixed):
+    """Test that permuted outcomes match materialized outcomes."""
+    model = rank_1g_mle_det
+
+    x, _, _ = next(iter(
+        obs_mixed.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    ))
+    assert x['stimulus_set'].shape == (obs_mixed.n_trial, 5)
+    assert x['outcome_idx'].shape == (obs_mixed.n_trial, 5, 12)
+    prob = model(x, training=False).numpy()
+
+    x_inflate = {
+        'stimulus_set': tf.constant(
+            obs_mixed.all_outcomes() + 1, dtype=tf.int32
+        ),
+        'is_select': x['is_select'],
+        'group': x['group']
+    }
+    prob_inflate = model(x_inflate, training=False).numpy()
+
+    np.testing.assert_allclose(prob, prob_inflate, rtol=1e-6)
+    # Non-existent outcomes have zero probability.
+    np.testing.assert_array_equal(prob[0, 3:, 3:], 0.)
+
+
+def test_unranked_probability(rank_1g_mle_det, obs_mixed):
+    """Test that unranked probabilities sum over all orderings."""
+    model = rank_1g_mle_det
+
+    x, _, _ = next(iter(
+        obs_mixed.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    ))
+    prob_ranked = model(x, training=False).numpy()
+
+    obs_unranked = psiz.trials.RankObservations(
+        obs_mixed.stimulus_set, n_select=obs_mixed.n_select,
+        is_ranked=np.zeros([obs_mixed.n_trial], dtype=bool)
+    )
+    x, _, _ = next(iter(
+        obs_unranked.as_dataset(all_outcomes=True).batch(obs_mixed.n_trial)
+    ))
+    # Unranked 4 choose 2 and 3 choose 2 trials have fewer outcomes.
+    assert x['outcome_idx'].shape == (obs_mixed.n_trial, 5, 6)
+    prob_unranked = model(x, training=False).numpy()
+
+    # Selecting {0, 1} is either (0, 1) or (1, 0).
+    np.testing.assert_allclose(
+        prob_unranked[0, 0:2, 0],
+        prob_ranked[0, 0:2, 0] + prob_ranked[0, 0:2, 3],
+        rtol=1e-5
+    )
+    np.testing.assert_allclose(
+        prob_unranked[0, 2, 0], prob_ranked[0, 2, 0] + prob_ranked[0, 2, 2],
+        rtol=1e-5
+    )
+    # A single selection is unaffected by ranking.
+    np.testing.assert_allclose(
+        prob_unranked[0, 3:, 0], prob_ranked[0, 3:, 0], rtol=1e-5
+    )
+    np.testing.assert_allclose(
+        np.sum(prob_unranked, axis=2), 1., rtol=1e-5
+    )
+
+
 # @pytest.fixture(scope="module")
 # def docket_0():
 #     """Return a docket of unjudged trials."""
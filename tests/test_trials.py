@@ -29,6 +29,10 @@ Todo:
 
 """
 
+import pickle
+import sys
+
+import h5py
 import pytest
 import numpy as np
 import pandas as pd
@@ -258,9 +262,10 @@ class TestSimilarityTrials:
         with pytest.raises(Exception) as e_info:
             docket = trials.RankDocket(stimulus_set, is_ranked=is_ranked)
 
+        # Unranked trials are supported.
         is_ranked = np.array((True, False, True, False))
-        with pytest.raises(Exception) as e_info:
-            docket = trials.RankDocket(stimulus_set, is_ranked=is_ranked)
+        docket = trials.RankDocket(stimulus_set, is_ranked=is_ranked)
+        np.testing.assert_array_equal(docket.is_ranked, is_ranked)
 
 
 class TestDocket:
@@ -517,6 +522,59 @@ class TestObservations:
         np.testing.assert_array_equal(
             trials_subset.config_idx, desired_config_idx)
 
+    def test_subset_view(self, setup_obs_1):
+        """Test that subset is a lazily materialized view."""
+        obs = setup_obs_1['obs']
+        index = np.array((3, 1, 0))
+        obs_subset = obs.subset(index)
+        obs_desired = trials.RankObservations(
+            obs.stimulus_set[index], n_select=obs.n_select[index],
+            group_id=obs.group_id[index]
+        )
+
+        assert isinstance(obs_subset, trials.RankObservations)
+        # Trial variables are not copied until accessed.
+        assert 'weight' not in obs_subset.__dict__
+        np.testing.assert_array_equal(
+            obs_subset.stimulus_set, obs_desired.stimulus_set
+        )
+        np.testing.assert_array_equal(
+            obs_subset.n_reference, obs_desired.n_reference
+        )
+        assert obs_subset.max_n_reference == obs_desired.max_n_reference
+        np.testing.assert_array_equal(
+            obs_subset.config_idx, obs_desired.config_idx
+        )
+        pd.testing.assert_frame_equal(
+            obs_subset.config_list, obs_desired.config_list
+        )
+
+        # Subset of a subset.
+        obs_subset_2 = obs_subset.subset(np.array((False, True, True)))
+        np.testing.assert_array_equal(
+            obs_subset_2.stimulus_set, obs_desired.stimulus_set[1:, 0:3]
+        )
+        np.testing.assert_array_equal(
+            obs_subset_2.group_id, obs_desired.group_id[1:]
+        )
+
+        # Mutating the view does not affect the parent.
+        obs_subset.set_weight(.5)
+        np.testing.assert_array_equal(obs_subset.weight, .5)
+        np.testing.assert_array_equal(obs.weight, 1.)
+
+        # Pickling a view only pickles the rows of the subset.
+        obs_subset_3 = obs.subset(index)
+        obs_loaded = pickle.loads(pickle.dumps(obs_subset_3))
+        assert '_view_var' not in obs_loaded.__dict__
+        np.testing.assert_array_equal(
+            obs_loaded.stimulus_set, obs_desired.stimulus_set
+        )
+        np.testing.assert_array_equal(
+            obs_loaded.group_id, obs_desired.group_id
+        )
+        assert obs_loaded.n_trial == 3
+
     def test_stack_config_idx(self):
         """Test if config_idx is updated correctly after stack."""
         stimulus_set = np.array((
@@ -545,6 +603,27 @@ class TestObservations:
         np.testing.assert_array_equal(
             trials_stack.config_idx, desired_config_idx)
 
+    def test_config_idx_interleaved(self):
+        """Test config_idx when configurations are interleaved."""
+        stimulus_set = np.array((
+            (3, 4, 5, 6, 7),
+            (0, 1, 2, -1, -1),
+            (3, 4, 2, 6, 7),
+            (9, 12, 7, -1, -1),
+            (3, 4, 5, 6, 7)))
+        group_id = np.array((1, 0, 0, 0, 1))
+
+        obs = trials.RankObservations(stimulus_set, group_id=group_id)
+        desired_config_idx = np.array((0, 1, 2, 1, 0))
+        np.testing.assert_array_equal(obs.config_idx, desired_config_idx)
+        np.testing.assert_array_equal(
+            obs.config_list.index.values, np.array((0, 1, 2))
+        )
+        np.testing.assert_array_equal(
+            obs.config_list['n_outcome'].values, np.array((4, 2, 4))
+        )
+        assert len(obs.outcome_idx_list) == 3
+
     def test_n_trial_0(self, setup_obs_0):
         assert setup_obs_0['n_trial'] == setup_obs_0['obs'].n_trial
 
@@ -651,6 +730,413 @@ class TestObservations:
             loaded_obs.config_idx)
         # TODO test _possible_rank_outcomes
 
+    def test_save_load_compressed(self, setup_obs_0, tmpdir):
+        """Test saving compressed and loading a subset."""
+        fn = tmpdir.join('obs_test.hdf5')
+        setup_obs_0['obs'].save(fn, compression='gzip')
+        with h5py.File(fn, "r") as f:
+            assert f["stimulus_set"].compression == 'gzip'
+
+        index = np.array([3, 0, 2])
+        loaded_obs = trials.load_trials(fn, index=index)
+        desired_obs = setup_obs_0['obs'].subset(index)
+        assert loaded_obs.n_trial == 3
+        np.testing.assert_array_equal(
+            desired_obs.stimulus_set, loaded_obs.stimulus_set)
+        np.testing.assert_array_equal(
+            desired_obs.n_select, loaded_obs.n_select)
+        np.testing.assert_array_equal(
+            desired_obs.group_id, loaded_obs.group_id)
+        np.testing.assert_array_equal(
+            desired_obs.config_idx, loaded_obs.config_idx)
+
+    def test_load_mmap(self, setup_obs_0, tmpdir):
+        """Test loading memory-mapped observations."""
+        fn = tmpdir.join('obs_test.hdf5')
+        setup_obs_0['obs'].save(fn)
+        loaded_obs = trials.load_trials(fn, mmap_mode='r')
+        assert isinstance(loaded_obs.stimulus_set, np.memmap)
+        np.testing.assert_array_equal(
+            setup_obs_0['stimulus_set'], loaded_obs.stimulus_set)
+        np.testing.assert_array_equal(
+            setup_obs_0['configuration_id'], loaded_obs.config_idx)
+
+        # Subset materializes the requested trials.
+        obs_sub = loaded_obs.subset(np.array([1, 2]))
+        np.testing.assert_array_equal(
+            setup_obs_0['stimulus_set'][1:3, 0:5], obs_sub.stimulus_set)
+
+        # Modes that write to the file are rejected.
+        for mmap_mode in ['r+', 'w+']:
+            with pytest.raises(ValueError):
+                trials.load_trials(fn, mmap_mode=mmap_mode)
+        loaded_obs = trials.load_trials(fn, mmap_mode='c')
+        np.testing.assert_array_equal(
+            setup_obs_0['stimulus_set'], loaded_obs.stimulus_set)
+
+    def test_as_dataset_chunked(self, setup_obs_1, tmpdir):
+        """Test streaming dataset matches in-memory dataset."""
+        fn = tmpdir.join('obs_test.hdf5')
+        setup_obs_1['obs'].save(fn)
+        obs = trials.load_trials(fn, mmap_mode='r')
+        n_trial = obs.n_trial
+
+        for all_outcomes in [True, False]:
+            x, y, w = next(iter(
+                obs.as_dataset(all_outcomes=all_outcomes).batch(n_trial)
+            ))
+            x_c, y_c, w_c = next(iter(
+                obs.as_dataset(
+                    all_outcomes=all_outcomes, chunk_size=3
+                ).batch(n_trial)
+            ))
+            assert x.keys() == x_c.keys()
+            for key in x:
+                np.testing.assert_array_equal(x[key], x_c[key])
+            np.testing.assert_array_equal(y, y_c)
+            np.testing.assert_array_equal(w, w_c)
+
+    def test_cached_derived_arrays(self, setup_obs_1):
+        """Test derived arrays are cached and invalidated."""
+        obs = setup_obs_1['obs'].subset(np.arange(4))
+        desired_is_select = np.zeros(obs.stimulus_set.shape, dtype=bool)
+        desired_is_select[0:3, 1] = True
+        desired_is_select[3, 1:3] = True
+        np.testing.assert_array_equal(obs.is_select(), desired_is_select)
+        np.testing.assert_array_equal(
+            obs.is_select(compress=True), desired_is_select[:, 1:3]
+        )
+
+        # Derived arrays are computed once and are read-only.
+        is_select = obs.is_select()
+        outcome_table = obs.outcome_table()
+        assert obs.is_select() is is_select
+        assert obs.outcome_table() is outcome_table
+        assert not is_select.flags.writeable
+
+        # Mutating methods invalidate the cache.
+        obs.set_group_id(0)
+        assert obs.outcome_table() is not outcome_table
+        np.testing.assert_array_equal(obs.outcome_table(), outcome_table)
+
+    def test_compact(self, setup_obs_1, tmpdir):
+        """Test compact dtypes are preserved and widened in the graph."""
+        obs = setup_obs_1['obs']
+        obs_compact = obs.subset(np.arange(obs.n_trial)).compact(
+            n_stimuli=20
+        )
+        assert obs_compact.stimulus_set.dtype == np.int8
+        assert obs_compact.n_select.dtype == np.int8
+        assert obs_compact.weight.dtype == np.float32
+        np.testing.assert_array_equal(
+            obs_compact.stimulus_set, obs.stimulus_set
+        )
+
+        # Compact dtypes survive a save/load round trip.
+        fn = tmpdir.join('obs_test.hdf5')
+        obs_compact.save(fn)
+        loaded_obs = trials.load_trials(fn)
+        assert loaded_obs.stimulus_set.dtype == np.int8
+        assert loaded_obs.weight.dtype == np.float32
+        np.testing.assert_array_equal(
+            loaded_obs.config_idx, obs.config_idx
+        )
+
+        # Dataset inputs are identical to the non-compact inputs.
+        x, y, w = next(iter(obs.as_dataset().batch(obs.n_trial)))
+        x_c, y_c, w_c = next(iter(
+            loaded_obs.as_dataset().batch(obs.n_trial)
+        ))
+        for key in x:
+            assert x[key].dtype == x_c[key].dtype
+            np.testing.assert_array_equal(x[key], x_c[key])
+        np.testing.assert_array_equal(w, w_c)
+
+        with pytest.raises(Exception) as e_info:
+            obs.subset(np.arange(obs.n_trial)).compact(n_stimuli=10)
+        assert e_info.type == ValueError
+
+    def test_compress(self):
+        """Test collapsing duplicate trials."""
+        stimulus_set = np.array((
+            (0, 1, 2, 3, 4),
+            (0, 1, 2, 4, 3),
+            (0, 2, 1, 3, 4),
+            (0, 2, 1, 4, 3),
+            (0, 1, 2, 3, 4),
+            (5, 3, 1, -1, -1),
+            (5, 3, 1, -1, -1)
+        ))
+        n_select = np.array((1, 1, 2, 2, 1, 1, 1))
+        is_ranked = np.array((1, 1, 0, 0, 1, 1, 1), dtype=bool)
+        group_id = np.array((0, 0, 0, 0, 0, 0, 1))
+        obs = trials.RankObservations(
+            stimulus_set, n_select=n_select, is_ranked=is_ranked,
+            group_id=group_id
+        )
+
+        obs_compressed, inverse = obs.compress(return_inverse=True)
+        np.testing.assert_array_equal(
+            obs_compressed.stimulus_set, np.array((
+                (0, 1, 2, 3, 4),
+                (0, 1, 2, 3, 4),
+                (5, 3, 1, -1, -1),
+                (5, 3, 1, -1, -1)
+            ))
+        )
+        np.testing.assert_array_equal(obs_compressed.weight, [3, 2, 1, 1])
+        np.testing.assert_array_equal(obs_compressed.n_select, [1, 2, 1, 1])
+        np.testing.assert_array_equal(
+            obs_compressed.group_id, [0, 0, 0, 1]
+        )
+        np.testing.assert_array_equal(inverse, [0, 0, 1, 1, 0, 2, 3])
+
+        obs_expanded = obs_compressed.expand(inverse)
+        assert obs_expanded.n_trial == obs.n_trial
+        np.testing.assert_array_equal(obs_expanded.weight, obs.weight)
+        np.testing.assert_array_equal(
+            obs_expanded.stimulus_set[:, 0], obs.stimulus_set[:, 0]
+        )
+
+        # Rate trials ignore stimulus order.
+        obs = trials.RateObservations(
+            np.array(((1, 2), (2, 1), (3, 4), (1, 2))),
+            np.array((.5, .5, .2, .4))
+        )
+        obs_compressed, inverse = obs.compress(return_inverse=True)
+        np.testing.assert_array_equal(
+            obs_compressed.stimulus_set, np.array(((1, 2), (3, 4), (1, 2)))
+        )
+        np.testing.assert_array_equal(obs_compressed.weight, [2, 1, 1])
+        np.testing.assert_array_equal(
+            obs_compressed.expand(inverse).weight, obs.weight
+        )
+
+    def test_from_arrays(self, setup_obs_1):
+        """Test trusted construction from trial arrays."""
+        obs = setup_obs_1['obs']
+        obs_fast = trials.RankObservations.from_arrays(
+            obs.stimulus_set, n_select=obs.n_select,
+            is_ranked=obs.is_ranked, group_id=obs.group_id
+        )
+        np.testing.assert_array_equal(obs_fast.config_idx, obs.config_idx)
+        pd.testing.assert_frame_equal(obs_fast.config_list, obs.config_list)
+        np.testing.assert_array_equal(obs_fast.stimulus_set, obs.stimulus_set)
+
+        # Known configuration data is reused.
+        obs_fast = trials.RankObservations.from_arrays(
+            obs.stimulus_set, n_select=obs.n_select,
+            is_ranked=obs.is_ranked, group_id=obs.group_id,
+            config_idx=obs.config_idx, config_list=obs.config_list,
+            outcome_idx_list=obs.outcome_idx_list
+        )
+        assert obs_fast.config_list is obs.config_list
+
+        # Invalid arrays are only caught if validation is requested.
+        stimulus_set = np.array(((0, 1, 2), (3, 4, 5)))
+        n_select = np.array((1, 2))
+        trials.RankObservations.from_arrays(stimulus_set, n_select=n_select)
+        with pytest.raises(ValueError):
+            trials.RankObservations.from_arrays(
+                stimulus_set, n_select=n_select, validate=True
+            )
+
+        # Subsets of a docket reuse the configuration data.
+        docket = trials.RankDocket(
+            obs.stimulus_set, n_select=obs.n_select, is_ranked=obs.is_ranked
+        )
+        docket_sub = docket.subset(np.array((3, 0, 1)))
+        docket_desired = trials.RankDocket(
+            obs.stimulus_set[[3, 0, 1]], n_select=obs.n_select[[3, 0, 1]],
+            is_ranked=obs.is_ranked[[3, 0, 1]]
+        )
+        np.testing.assert_array_equal(
+            docket_sub.stimulus_set, docket_desired.stimulus_set
+        )
+        np.testing.assert_array_equal(
+            docket_sub.config_idx, docket_desired.config_idx
+        )
+        np.testing.assert_array_equal(
+            docket_sub.all_outcomes(), docket_desired.all_outcomes()
+        )
+
+        # Rate trials.
+        stimulus_set = np.array(((1, 2, -1), (2, 1, 3)))
+        rating = np.array((.5, .2))
+        obs = trials.RateObservations.from_arrays(stimulus_set, rating)
+        obs_desired = trials.RateObservations(stimulus_set, rating)
+        np.testing.assert_array_equal(obs.config_idx, obs_desired.config_idx)
+        np.testing.assert_array_equal(obs.n_present, obs_desired.n_present)
+
+    def test_coverage(self, setup_obs_0, setup_obs_1):
+        """Test incrementally maintained coverage statistics."""
+        obs_0 = setup_obs_0['obs']
+        obs_1 = setup_obs_1['obs']
+        obs_all = trials.RankObservations.stack((obs_0, obs_1))
+        desired = obs_all.coverage()
+
+        n_stimuli = desired.n_stimuli
+        stimulus_set = obs_all.stimulus_set
+        np.testing.assert_array_equal(
+            desired.query_count,
+            np.bincount(stimulus_set[:, 0], minlength=n_stimuli)
+        )
+        reference = stimulus_set[:, 1:]
+        np.testing.assert_array_equal(
+            desired.reference_count,
+            np.bincount(reference[reference >= 0], minlength=n_stimuli)
+        )
+        pair_count = np.zeros([n_stimuli, n_stimuli], dtype=np.int64)
+        for row in stimulus_set:
+            for ref in row[1:]:
+                if ref >= 0:
+                    pair_count[row[0], ref] += 1
+        np.testing.assert_array_equal(
+            desired.pair_count.toarray(), pair_count
+        )
+
+        # Statistics are merged by stack.
+        obs_0.coverage()
+        obs_1.coverage()
+        obs_stacked = trials.RankObservations.stack((obs_0, obs_1))
+        assert '_coverage' in obs_stacked.__dict__
+        np.testing.assert_array_equal(
+            obs_stacked.coverage().pair_count.toarray(), pair_count
+        )
+
+        # Statistics are updated by append. Pairs are buffered until
+        # `pair_count` is accessed.
+        obs = obs_0.subset(np.arange(obs_0.n_trial))
+        obs.coverage().pair_count
+        obs.append(obs_1)
+        assert len(obs.coverage()._pair_buffer) == 1
+        np.testing.assert_array_equal(
+            obs.coverage().query_count, desired.query_count
+        )
+        np.testing.assert_array_equal(
+            obs.coverage().pair_count.toarray(), pair_count
+        )
+
+        # Export as reference priority.
+        r_priority = desired.r_priority(n_stimuli + 2)
+        assert r_priority.shape == (n_stimuli + 2, n_stimuli + 2)
+        np.testing.assert_allclose(
+            r_priority.toarray()[0:n_stimuli, 0:n_stimuli][pair_count > 0],
+            1. / (1. + pair_count[pair_count > 0])
+        )
+
+    def test_save_load_parquet(self, setup_obs_1, tmpdir):
+        """Test Parquet round trip and row group streaming."""
+        pa = pytest.importorskip('pyarrow')
+        obs = setup_obs_1['obs']
+        fn = tmpdir.join('obs_test.parquet')
+        obs.save_parquet(fn, row_group_size=2)
+
+        loaded_obs = trials.load_trials(fn)
+        assert isinstance(loaded_obs, trials.RankObservations)
+        for name in [
+                'stimulus_set', 'n_select', 'is_ranked', 'group_id',
+                'agent_id', 'session_id', 'weight', 'rt_ms', 'config_idx']:
+            np.testing.assert_array_equal(
+                getattr(loaded_obs, name), getattr(obs, name)
+            )
+        pd.testing.assert_frame_equal(
+            loaded_obs.config_list, obs.config_list
+        )
+
+        obs_list = list(trials.iter_trials(fn))
+        assert [o.n_trial for o in obs_list] == [2, 2]
+        np.testing.assert_array_equal(
+            obs_list[1].stimulus_set[:, 0], obs.stimulus_set[2:, 0]
+        )
+
+        # Variable-length stimulus sets are padded.
+        table = pa.table({
+            'stimulus_set': pa.array([[1, 2, 3], [4, 5, 6, 7, 8]]),
+            'n_select': [1, 2],
+            'is_ranked': [True, True],
+        })
+        obs = trials.RankObservations.from_arrow(table)
+        np.testing.assert_array_equal(
+            obs.stimulus_set, np.array(((1, 2, 3, -1, -1), (4, 5, 6, 7, 8)))
+        )
+        np.testing.assert_array_equal(obs.n_reference, [2, 4])
+
+    def test_share(self, setup_obs_1, tmpdir):
+        """Test rebuilding observations from a shared memory handle."""
+        obs = setup_obs_1['obs']
+        filepath_list = [tmpdir.join('obs_test.bin')]
+        if sys.version_info >= (3, 8):
+            filepath_list.append(None)
+        for filepath in filepath_list:
+            handle = obs.share(filepath=filepath)
+            # Handles are shipped to workers by pickling.
+            handle = pickle.loads(pickle.dumps(handle))
+
+            shared_obs = handle.load()
+            assert isinstance(shared_obs, trials.RankObservations)
+            assert not shared_obs.stimulus_set.flags.writeable
+            for name in [
+                    'stimulus_set', 'n_select', 'is_ranked', 'group_id',
+                    'weight', 'config_idx']:
+                np.testing.assert_array_equal(
+                    getattr(shared_obs, name), getattr(obs, name)
+                )
+            pd.testing.assert_frame_equal(
+                shared_obs.config_list, obs.config_list
+            )
+
+            shared_subset = handle.load(np.array([3, 0]))
+            np.testing.assert_array_equal(
+                shared_subset.stimulus_set[:, 0], obs.stimulus_set[[3, 0], 0]
+            )
+            handle.unlink()
+
+    def test_append(self, setup_obs_0, setup_obs_1):
+        """Test in-place append matches stack."""
+        obs_0 = setup_obs_0['obs']
+        obs_1 = setup_obs_1['obs'].subset(np.array([0, 2]))
+
+        obs = obs_1.subset(np.arange(obs_1.n_trial))
+        obs_desired = trials.stack((obs_1, obs_0, obs_1))
+        obs.append(obs_0)
+        obs.append(obs_1)
+
+        assert obs.n_trial == obs_desired.n_trial
+        assert obs.max_n_reference == obs_desired.max_n_reference
+        np.testing.assert_array_equal(
+            obs.stimulus_set, obs_desired.stimulus_set)
+        np.testing.assert_array_equal(obs.n_select, obs_desired.n_select)
+        np.testing.assert_array_equal(obs.group_id, obs_desired.group_id)
+        np.testing.assert_array_equal(
+            obs.config_idx, obs_desired.config_idx)
+        pd.testing.assert_frame_equal(
+            obs.config_list, obs_desired.config_list)
+        assert len(obs.outcome_idx_list) == len(obs_desired.outcome_idx_list)
+
+    def test_save_append(self, setup_obs_0, setup_obs_1, tmpdir):
+        """Test appending observations to a file."""
+        fn = tmpdir.join('obs_test.hdf5')
+        obs_0 = setup_obs_0['obs']
+        obs_1 = setup_obs_1['obs'].subset(np.array([0, 1]))
+        obs_1.save(fn, append=True)
+        obs_0.save(fn, append=True)
+
+        loaded_obs = trials.load_trials(fn)
+        obs_desired = trials.stack((obs_1, obs_0))
+        np.testing.assert_array_equal(
+            loaded_obs.stimulus_set, obs_desired.stimulus_set)
+        np.testing.assert_array_equal(
+            loaded_obs.group_id, obs_desired.group_id)
+        np.testing.assert_array_equal(
+            loaded_obs.config_idx, obs_desired.config_idx)
+
+        # A contiguous file cannot grow in place.
+        fn = tmpdir.join('obs_test_contiguous.hdf5')
+        obs_0.save(fn)
+        with pytest.raises(ValueError):
+            obs_1.save(fn, append=True)
+
 
 class TestStack:
     """Test stack static method."""
@@ -751,6 +1237,35 @@ class TestStack:
             trials_all.n_reference, desired_n_reference
         )
 
+    def test_stack_many(self):
+        """Test stacking many objects matches direct initialization."""
+        n_stimuli = 20
+        n_trial = 3
+
+        trials_list = []
+        for n_reference in [2, 4, 8, 4, 2, 6] * 10:
+            generator = RandomRank(
+                n_stimuli, n_reference=n_reference, n_select=1
+            )
+            trials_list.append(generator.generate(n_trial))
+        trials_all = trials.stack(trials_list)
+        docket = trials.RankDocket(
+            trials_all.stimulus_set, n_select=trials_all.n_select,
+            is_ranked=trials_all.is_ranked
+        )
+
+        assert trials_all.n_trial == 60 * n_trial
+        assert trials_all.max_n_reference == 8
+        np.testing.assert_array_equal(
+            trials_all.config_idx, docket.config_idx
+        )
+        pd.testing.assert_frame_equal(
+            trials_all.config_list, docket.config_list
+        )
+        for outcome_idx, outcome_idx_desired in zip(
+                trials_all.outcome_idx_list, docket.outcome_idx_list):
+            np.testing.assert_array_equal(outcome_idx, outcome_idx_desired)
+
     def test_padding(self):
         """Test padding values when using stack and subset method."""
         n_stimuli = 20
@@ -874,3 +1389,50 @@ class TestPossibleOutcomes:
             (6, 0, 1, 2, 3, 4, 5, 7),
             (7, 0, 1, 2, 3, 4, 5, 6)))
         np.testing.assert_array_equal(po, correct)
+
+    def test_possible_outcomes_3c2_unranked(self):
+        """Test outcomes 3 choose 2 unranked trial."""
+        stimulus_set = np.array(((0, 1, 2, 3), (33, 9, 12, 7)))
+        n_select = 2 * np.ones((2))
+        is_ranked = np.array((False, False))
+        tasks = trials.RankDocket(
+            stimulus_set, n_select=n_select, is_ranked=is_ranked
+        )
+
+        po = _possible_rank_outcomes(tasks.config_list.iloc[0])
+
+        correct = np.array(((0, 1, 2), (0, 2, 1), (1, 2, 0)))
+        np.testing.assert_array_equal(po, correct)
+        np.testing.assert_array_equal(tasks.config_list['n_outcome'], [3])
+
+    def test_possible_outcomes_8c2_unranked(self):
+        """Test outcomes 8 choose 2 unranked trial."""
+        stimulus_set = np.array((
+            (0, 1, 2, 3, 4, 5, 6, 7, 8),
+            (45, 33, 9, 12, 7, 2, 5, 4, 3)))
+        n_select = 2 * np.ones((2))
+        is_ranked = np.array((True, False))
+        tasks = trials.RankDocket(
+            stimulus_set, n_select=n_select, is_ranked=is_ranked
+        )
+
+        np.testing.assert_array_equal(
+            tasks.config_list['n_outcome'], [56, 28]
+        )
+        po = tasks.outcome_idx_list[1]
+        np.testing.assert_array_equal(po[0], np.arange(8))
+        np.testing.assert_array_equal(po[-1], (6, 7, 0, 1, 2, 3, 4, 5))
+
+    def test_possible_outcomes_cached(self):
+        """Test outcomes are shared across trial objects."""
+        stimulus_set = np.array(((0, 1, 2, 3, 4), (45, 33, 9, 12, 7)))
+        n_select = 2 * np.ones((2))
+        tasks_0 = trials.RankDocket(stimulus_set, n_select=n_select)
+        tasks_1 = tasks_0.subset(np.array([1]))
+
+        po_0 = _possible_rank_outcomes(tasks_0.config_list.iloc[0])
+        po_1 = _possible_rank_outcomes(tasks_1.config_list.iloc[0])
+
+        assert po_0 is po_1
+        assert tasks_0.outcome_idx_list[0] is tasks_1.outcome_idx_list[0]
+        assert not po_0.flags.writeable